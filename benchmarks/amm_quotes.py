@@ -0,0 +1,56 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/amm_quotes.py
+# Benchmark of local AMM quotes, one intent at a time and a whole batch at once.
+#
+# SOL/USDC is traded by a constant-product pool and by a concentrated-liquidity pool
+# with POSITIONS overlapping positions around the price. Intents of random amounts are
+# quoted on both pools, keeping the best output, as a batch would be.
+#
+# Usage: poetry run python -m benchmarks.amm_quotes
+
+import random
+import numpy as np
+
+from benchmarks.p2p_matching import timed
+from src.liquidity.amm import AmmSimulator, ConcentratedLiquidityPool, ConstantProductPool
+from src.orders.intent import IntentData
+
+
+SIZES = [100, 1_000, 10_000]
+POSITIONS = 200
+
+
+def make_simulator(rng: random.Random) -> AmmSimulator:
+    sqrt_price = np.sqrt(150e-3)
+    tick = int(np.log(150e-3) / np.log(1.0001))
+    ticks, nets = [], []
+    for _ in range(POSITIONS):
+        width, liquidity = rng.randint(10, 5000), rng.randint(10**9, 10**11)
+        ticks += [tick - width, tick + width]
+        nets += [liquidity, -liquidity]
+    return AmmSimulator([
+        ConstantProductPool('CP', 'SOL_MINT', 'USDC_MINT', 10**14, 15 * 10**12),
+        ConcentratedLiquidityPool('CL', 'SOL_MINT', 'USDC_MINT', sqrt_price, sum(nets[::2]), ticks, nets),
+    ])
+
+
+def make_intents(size: int, rng: random.Random) -> list:
+    return [IntentData(str(i), 'SOL', 'SOL_MINT', 'Wallet', rng.randint(10**6, 10**13), 'USDC', 'USDC_MINT',
+                       'Wallet', 0, False, 0, 'pending', 9, 6) for i in range(size)]
+
+
+def main() -> None:
+    rng = random.Random(0)
+    simulator = make_simulator(rng)
+    print(f'{"intents":>10} {"one by one":>14} {"batch":>14} {"speedup":>10}')
+    for size in SIZES:
+        intents = make_intents(size, rng)
+        single, single_time = timed(lambda: [simulator.quote(intent) for intent in intents])
+        batch, batch_time = timed(simulator.quotes, intents)
+        assert [quote['outAmount'] for quote in single] == [quote['outAmount'] for quote in batch]
+        print(f'{size:>10} {single_time / size * 1e6:>11.1f}µs {batch_time / size * 1e6:>11.1f}µs '
+              f'{single_time / batch_time:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
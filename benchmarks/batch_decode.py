@@ -0,0 +1,87 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/batch_decode.py
+# Benchmark of fetching a batch as the HTML page against negotiating its raw JSON, end to end.
+#
+# Usage: poetry run python -m benchmarks.batch_decode
+
+import os
+import ujson
+import asyncio
+import tempfile
+
+import httpx
+
+from src.protocol_server import _server
+from src.protocol_server.utils.file_operations import save_data
+from src.utils.network import html_to_json
+from benchmarks.order_models import make_orders
+from benchmarks.p2p_matching import timed
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+
+SIZES = [10**3, 10**4, 10**5]
+ROUNDS = 3
+
+# BeautifulSoup builds a tree of the whole page, so it is only run on small batches
+SOUP_SIZE = 10**4
+
+HTML = {'Accept': 'text/html'}
+JSON = {'Accept': 'application/json'}
+
+
+def soup_to_json(response: httpx.Response) -> dict:
+    """The former HTML path: scrape the code block with BeautifulSoup, then decode it."""
+    return ujson.loads(BeautifulSoup(response.text, 'html.parser').find('code').get_text(strip=True))
+
+
+async def fetch(client: httpx.AsyncClient, headers: dict, decode) -> dict:
+    """Fetch the batch from the orderbook and decode it, as the agents do."""
+    response = await client.get('/batches', headers=headers)
+    return decode(response)
+
+
+def run(headers: dict, decode) -> dict:
+    async def rounds():
+        transport = httpx.ASGITransport(app=_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://orderbook') as client:
+            for _ in range(ROUNDS):
+                data = await fetch(client, headers, decode)
+        return data
+    return asyncio.run(rounds())
+
+
+def main() -> None:
+    paths = [
+        ('html + BeautifulSoup', HTML, soup_to_json),
+        ('html + code block', HTML, html_to_json),
+        ('json + response.json', JSON, lambda response: response.json()),
+        ('json + ujson', JSON, html_to_json),
+    ]
+    print(f'Fetch and decode a batch from the orderbook app (seconds per batch, over {ROUNDS} rounds)')
+    print(f'{"intents":>9} ' + ' '.join(f'{name:>21}' for name, _, _ in paths))
+
+    with tempfile.TemporaryDirectory() as directory:
+        _server.BATCHES_FILE_PATH = os.path.join(directory, 'batch.json')
+
+        for size in SIZES:
+            data = {'batch_id': 1, 'orders': {order['intent_id']: order for order in make_orders(size)}}
+            save_data(_server.BATCHES_FILE_PATH, data)
+
+            times = []
+            for name, headers, decode in paths:
+                if decode is soup_to_json and (BeautifulSoup is None or size > SOUP_SIZE):
+                    times.append(None)
+                    continue
+                result, elapsed = timed(run, headers, decode)
+                assert result == data, f'{name} disagrees with the batch'
+                times.append(elapsed / ROUNDS)
+
+            print(f'{size:>9} ' + ' '.join(f'{t:>20.4f}s' if t is not None else f'{"-":>21}' for t in times))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/batch_stream.py
+# Benchmark of the streaming batch parser against decoding the whole body: peak memory and time.
+#
+# Usage: poetry run python -m benchmarks.batch_stream
+
+import gc
+import html
+import time
+import ujson
+import asyncio
+import tracemalloc
+
+import httpx
+
+from src.orders.batch import BatchData
+from src.utils.network import html_to_json
+from benchmarks.order_models import make_orders
+
+
+SIZES = [10**4, 10**5, 10**6]
+CHUNK_SIZE = 64 * 1024
+HTML_SIZE = 10**4
+
+
+def peak(function, *args) -> tuple:
+    """Run a function and return its result, the peak bytes it allocated on top of the result, and its time."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    retained, size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size - retained, elapsed
+
+
+def body_chunks(body: bytes):
+    """The body as received from the network, one chunk at a time."""
+    for start in range(0, len(body), CHUNK_SIZE):
+        yield body[start:start + CHUNK_SIZE]
+
+
+def parse_whole(body: bytes, content_type: str) -> BatchData:
+    """Read the whole body, decode it, and parse the intents (the path of `BatchPoller.get`)."""
+    response = httpx.Response(200, headers={'Content-Type': content_type}, content=b''.join(body_chunks(body)))
+    batch = BatchData()
+    batch.parse_intent_instance(html_to_json(response))
+    return batch
+
+
+def parse_stream(body: bytes, html_page: bool = False) -> BatchData:
+    """Parse the intents while the body arrives (the path of `BatchPoller.get_batch`)."""
+    async def chunks():
+        for chunk in body_chunks(body):
+            yield chunk.decode()
+
+    batch = BatchData()
+    asyncio.run(batch.parse_intent_stream(chunks(), html=html_page))
+    return batch
+
+
+def compare(name: str, size: int, body: bytes, content_type: str) -> None:
+    """Print the peak memory (besides the intents themselves) and time of both paths on the same body."""
+    html_page = 'text/html' in content_type
+    whole, whole_peak, whole_time = peak(parse_whole, body, content_type)
+    del whole
+    streamed, stream_peak, stream_time = peak(parse_stream, body, html_page)
+    assert len(streamed.intents) == size and not streamed.quarantined, 'Stream disagrees with the batch'
+    del streamed
+
+    print(f'{size:>9} {name:>5} {len(body) / 1e6:>9.1f} {whole_peak / 1e6:>11.1f} {stream_peak / 1e6:>11.1f} '
+          f'{whole_peak / stream_peak:>7.0f}x {whole_time:>9.3f}s {stream_time:>9.3f}s')
+
+
+def main() -> None:
+    print(f'{"intents":>9} {"body":>5} {"size (MB)":>9} {"whole (MB)":>11} {"stream (MB)":>11} {"memory":>8} '
+          f'{"whole":>10} {"stream":>10}')
+
+    for size in SIZES:
+        orders = make_orders(size)
+        body = ujson.dumps({'batch_id': 1, 'orders': {order['intent_id']: order for order in orders}}).encode()
+        del orders
+        compare('json', size, body, 'application/json')
+
+        # The HTML page is only a fallback for older orderbooks, so it is only run on small batches
+        if size <= HTML_SIZE:
+            page = f'<html><body><pre><code>{html.escape(body.decode())}</code></pre></body></html>'.encode()
+            compare('html', size, page, 'text/html')
+        del body
+        gc.collect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/intent_columns.py
+# Benchmark of the columnar IntentBatch against the list of IntentData: memory and speed.
+#
+# Usage: poetry run python -m benchmarks.intent_columns
+
+import gc
+import tracemalloc
+
+from dataclasses import asdict
+from types import SimpleNamespace
+
+from src.p2p.level_one import LevelOne
+from src.orders.batch import BatchData
+from src.orders.columnar import IntentBatch
+from benchmarks.p2p_matching import make_intents, timed
+
+
+SIZE = 10**5
+MIN_AMOUNT = 10**8
+
+
+def allocated(function, *args) -> tuple:
+    """Run a function and return its result and the bytes it still holds allocated."""
+    gc.collect()
+    tracemalloc.start()
+    result = function(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def parse_list(orders: dict) -> list:
+    batch = BatchData()
+    batch.parse_intent_instance(orders)
+    return batch.intents
+
+
+def filter_list(intents: list) -> list:
+    return [intent for intent in intents if intent.partial_fill and intent.source_amount >= MIN_AMOUNT]
+
+
+def filter_columns(columns: IntentBatch) -> IntentBatch:
+    return columns.where(columns.partial_fill & (columns.source_amount >= MIN_AMOUNT))
+
+
+def prices_list(intents: list) -> list:
+    return [intent.min_receive_amount / intent.source_amount for intent in intents]
+
+
+def main() -> None:
+    intents = make_intents(SIZE)
+    for i, intent in enumerate(intents):
+        intent.partial_fill = i % 2 == 0
+    orders = {'orders': {intent.intent_id: asdict(intent) for intent in intents}}
+    del intents
+
+    listed, list_bytes = allocated(parse_list, orders)
+    columns, column_bytes = allocated(IntentBatch.from_orders, orders)
+    assert columns.to_intents() == listed, 'Columns disagree with the parsed intents'
+
+    print(f'{SIZE} intents')
+    print(f'{"":>18} {"list":>12} {"columnar":>12} {"ratio":>8}')
+    print(f'{"memory (MB)":>18} {list_bytes / 1e6:>12.1f} {column_bytes / 1e6:>12.1f} '
+          f'{list_bytes / column_bytes:>7.1f}x')
+
+    rows = [
+        ('parse (s)', (parse_list, orders), (IntentBatch.from_orders, orders)),
+        ('filter (s)', (filter_list, listed), (filter_columns, columns)),
+        ('limit prices (s)', (prices_list, listed), (columns.limit_prices,)),
+        ('1-hop search (s)', (LevelOne().run, SimpleNamespace(batch=SimpleNamespace(intents=listed))),
+                             (LevelOne.match_columns, columns)),
+    ]
+    for name, (list_function, *list_args), (column_function, *column_args) in rows:
+        list_result, list_time = timed(list_function, *list_args)
+        column_result, column_time = timed(column_function, *column_args)
+        if name == '1-hop search (s)':
+            assert [[a.intent_id, b.intent_id] for a, b in list_result] == \
+                [[columns.intent_id[a], columns.intent_id[b]] for a, b in zip(*column_result)]
+        print(f'{name:>18} {list_time:>12.4f} {column_time:>12.4f} {list_time / column_time:>7.1f}x')
+
+    # Conversions between the two representations
+    _, to_columns = timed(IntentBatch.from_intents, listed)
+    _, to_list = timed(columns.to_intents)
+    print(f'\nlist -> columnar: {to_columns:.4f}s, columnar -> list: {to_list:.4f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/order_models.py
+# Benchmark of the slotted order models against the same models with a per-instance __dict__.
+#
+# Usage: poetry run python -m benchmarks.order_models
+
+import gc
+import random
+import tracemalloc
+
+from src.orders.intent import IntentData
+from src.orders.quote import QuoteData
+from src.orders.solution import SolutionData
+from benchmarks.p2p_matching import timed
+
+
+SIZES = [10**4, 10**5, 10**6]
+NUMBER_OF_TOKENS = 20
+
+
+def unslotted(cls: type) -> type:
+    """A copy of a slotted model keeping its attributes in a per-instance __dict__, as before slots."""
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in cls.__slots__ and key not in ('__slots__', '__dict__', '__weakref__')}
+    return type(cls.__name__, cls.__bases__, namespace)
+
+
+def allocated(function, *args) -> tuple:
+    """Run a function and return its result and the bytes it still holds allocated."""
+    gc.collect()
+    tracemalloc.start()
+    result = function(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def make_orders(size: int, seed: int = 42) -> list:
+    """Generate decoded orders, as read from the JSON of a batch."""
+    rng = random.Random(seed)
+    orders = []
+    for i in range(size):
+        source, destination = rng.sample(range(NUMBER_OF_TOKENS), 2)
+        orders.append({
+            'intent_id': str(i),
+            'source_token': f'T{source}',
+            'source_mint_address': f'Mint{source}',
+            'source_address': f'Wallet{i}',
+            'source_amount': rng.randrange(10**6, 10**9),
+            'destination_token': f'T{destination}',
+            'destination_mint_address': f'Mint{destination}',
+            'destination_address': f'Wallet{i}',
+            'min_receive_amount': rng.randrange(10**6, 10**9),
+            'partial_fill': False,
+            'expiration': 3600,
+            'status': 'pending',
+            'source_token_decimals': 9,
+            'destination_token_decimals': 9,
+        })
+    return orders
+
+
+def make_quotes(intents: list) -> list:
+    """Generate decoded Jupiter quotes, one per intent."""
+    return [{
+        'inputMint': intent.source_mint_address,
+        'inAmount': str(intent.source_amount),
+        'outputMint': intent.destination_mint_address,
+        'outAmount': str(intent.min_receive_amount),
+        'otherAmountThreshold': str(intent.min_receive_amount),
+        'swapMode': 'ExactIn',
+        'slippageBps': 50,
+        'platformFee': None,
+        'priceImpactPct': '0',
+        'routePlan': [],
+        'contextSlot': 1,
+        'timeTaken': 0.01,
+    } for intent in intents]
+
+
+def compare(name: str, size: int, build, slotted_build, serialize, slotted_serialize) -> None:
+    """Print the memory per object and the build/serialization times of both variants."""
+    objects, before = allocated(build)
+    slotted_objects, after = allocated(slotted_build)
+
+    # Time the code itself, not the garbage collections triggered by the allocations
+    gc.collect()
+    gc.disable()
+    _, build_time = timed(build)
+    _, slotted_build_time = timed(slotted_build)
+    _, serialize_time = timed(serialize, objects)
+    _, slotted_serialize_time = timed(slotted_serialize, slotted_objects)
+    gc.enable()
+
+    print(f'{size:>9} {name:>10} {before / size:>9.0f}B {after / size:>9.0f}B {before / after:>7.2f}x '
+          f'{build_time:>9.3f}s {slotted_build_time:>9.3f}s {serialize_time:>9.3f}s {slotted_serialize_time:>9.3f}s')
+
+
+def main() -> None:
+    DictIntent, DictQuote, DictSolution = unslotted(IntentData), unslotted(QuoteData), unslotted(SolutionData)
+    to_dicts = lambda objects: [item.to_dict() for item in objects]
+
+    print(f'{"objects":>9} {"model":>10} {"__dict__":>10} {"slots":>10} {"memory":>8} '
+          f'{"build":>10} {"(slots)":>10} {"to_dict":>10} {"(slots)":>10}')
+
+    for size in SIZES:
+        orders = make_orders(size)
+        intents = IntentData.from_orders(orders)
+        quotes = make_quotes(intents)
+
+        compare('intent', size,
+                lambda: [DictIntent(**order) for order in orders],
+                lambda: IntentData.from_orders(orders),
+                to_dicts, to_dicts)
+        compare('quote', size,
+                lambda: [DictQuote.from_dict(quote) for quote in quotes],
+                lambda: [QuoteData.from_dict(quote) for quote in quotes],
+                to_dicts, to_dicts)
+        compare('solution', size,
+                lambda: [DictSolution.from_fill(intent, intent.source_amount, intent.min_receive_amount)
+                         for intent in intents],
+                lambda: [SolutionData.from_fill(intent, intent.source_amount, intent.min_receive_amount)
+                         for intent in intents],
+                to_dicts, to_dicts)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/p2p_auction.py
+# Benchmark of the batch auction against the volume-maximizing partial-fill books.
+#
+# Usage: poetry run python -m benchmarks.p2p_auction
+
+import random
+
+from types import SimpleNamespace
+
+from src.p2p.auction import BatchAuction
+from src.p2p.partial_fill import PartialFill
+from src.orders.batch import BatchData
+from benchmarks.p2p_matching import make_intents, timed
+
+
+SIZES = [10**3, 5 * 10**3, 10**4]
+
+
+def surplus(fills: list) -> float:
+    """Surplus of the fills, in units of the min_receive_amount of each intent (so tokens add up)."""
+    return sum((received - intent.min_receive_amount * given / intent.source_amount) / intent.min_receive_amount
+               for intent, given, received in fills if intent.min_receive_amount)
+
+
+def filled_share(fills: list, size: int) -> float:
+    """Mean share of the source amount of the intents filled."""
+    return sum(given / intent.source_amount for intent, given, _ in fills) / size
+
+
+def main() -> None:
+    print(f'{"intents":>10} {"engine":>14} {"filled":>8} {"surplus":>10} {"time (s)":>10}')
+
+    for size in SIZES:
+        rng = random.Random(size)
+        intents = make_intents(size)
+        for intent in intents:
+            intent.partial_fill = rng.random() < 0.5
+
+        batch = BatchData()
+        batch.intents = intents
+        agent = SimpleNamespace(batch=batch)
+
+        for name, engine in (('books', PartialFill()), ('auction', BatchAuction())):
+            fills, elapsed = timed(engine.run, agent)
+            print(f'{size:>10} {name:>14} {filled_share(fills, size):>8.1%} {surplus(fills):>10.2f} {elapsed:>10.4f}')
+
+
+if __name__ == '__main__':
+    main()
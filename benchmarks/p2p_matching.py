@@ -0,0 +1,92 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/p2p_matching.py
+# Benchmark of the p2p 1-hop search: naive all-pairs scan vs. hash-indexed LevelOne.
+#
+# Usage: poetry run python -m benchmarks.p2p_matching
+
+import time
+import random
+
+from types import SimpleNamespace
+
+from src.p2p.level_one import LevelOne
+from src.orders.batch import BatchData
+from src.orders.intent import IntentData
+
+
+SIZES = [10**2, 10**3, 10**4, 10**5]
+NAIVE_MAX_SIZE = 10**4
+NUMBER_OF_TOKENS = 20
+
+
+def make_intents(size: int, number_of_tokens: int = NUMBER_OF_TOKENS, seed: int = 42) -> list:
+    """Generate a batch of random intents priced around a random reference price per token."""
+    rng = random.Random(seed)
+    prices = [10 ** rng.uniform(-2, 3) for _ in range(number_of_tokens)]
+
+    intents = []
+    for i in range(size):
+        source, destination = rng.sample(range(number_of_tokens), 2)
+        source_amount = int(10 ** rng.uniform(6, 9))
+        fair_amount = source_amount * prices[source] / prices[destination]
+        intents.append(IntentData(
+            intent_id=str(i),
+            source_token=f'T{source}',
+            source_mint_address=f'Mint{source}',
+            source_address=f'Wallet{i}',
+            source_amount=source_amount,
+            destination_token=f'T{destination}',
+            destination_mint_address=f'Mint{destination}',
+            destination_address=f'Wallet{i}',
+            min_receive_amount=int(fair_amount * rng.uniform(0.95, 1.01)),
+            partial_fill=False,
+            expiration=3600,
+            status='pending',
+            source_token_decimals=9,
+            destination_token_decimals=9,
+        ))
+    return intents
+
+
+def naive_run(intents: list) -> list:
+    """The original all-pairs 1-hop search."""
+    p2p_matches = []
+    for i, intent_1 in enumerate(intents):
+        for intent_2 in intents[i+1:]:
+            if (intent_1.source_mint_address == intent_2.destination_mint_address and
+                    intent_1.destination_mint_address == intent_2.source_mint_address and
+                    LevelOne.both_fillable(intent_1, intent_2)):
+                p2p_matches.append([intent_1, intent_2])
+    return p2p_matches
+
+
+def timed(function, *args) -> tuple:
+    """Run a function once and return its result and the elapsed seconds."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    print(f'{"intents":>10} {"matches":>10} {"naive (s)":>12} {"indexed (s)":>12} {"speedup":>10}')
+
+    for size in SIZES:
+        intents = make_intents(size)
+        batch = BatchData()
+        batch.intents = intents
+        agent = SimpleNamespace(batch=batch)
+
+        matches, indexed_time = timed(LevelOne().run, agent)
+
+        if size <= NAIVE_MAX_SIZE:
+            naive_matches, naive_time = timed(naive_run, intents)
+            assert naive_matches == matches, 'Indexed search disagrees with the naive search'
+            naive, speedup = f'{naive_time:.4f}', f'{naive_time / indexed_time:.1f}x'
+        else:
+            naive, speedup = '-', '-'
+
+        print(f'{size:>10} {len(matches):>10} {naive:>12} {indexed_time:>12.4f} {speedup:>10}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/p2p_optimal.py
+# Benchmark of the p2p match selection: greedy by surplus vs. maximum-weight matching.
+#
+# Usage: poetry run python -m benchmarks.p2p_optimal
+
+from types import SimpleNamespace
+
+from src.p2p.level_one import LevelOne
+from src.orders.batch import BatchData
+from src.p2p.matching import greedy_matching, optimal_matching, match_surplus
+from benchmarks.p2p_matching import make_intents, timed
+
+
+SIZES = [10**3, 5 * 10**3, 10**4, 2 * 10**4]
+NUMBER_OF_TOKENS = 5
+
+
+def main() -> None:
+    print(f'{"intents":>10} {"candidates":>12} {"greedy surplus":>16} {"optimal surplus":>16} '
+          f'{"gain":>8} {"greedy (s)":>12} {"optimal (s)":>12}')
+
+    for size in SIZES:
+        batch = BatchData()
+        batch.intents = make_intents(size, NUMBER_OF_TOKENS)
+        matches = LevelOne().run(SimpleNamespace(batch=batch))
+
+        greedy, greedy_time = timed(greedy_matching, matches)
+        optimal, optimal_time = timed(optimal_matching, matches)
+
+        greedy_surplus = sum(map(match_surplus, greedy))
+        optimal_surplus = sum(map(match_surplus, optimal))
+        assert optimal_surplus >= greedy_surplus, 'Optimal matching found less surplus than greedy'
+        gain = f'{100 * (optimal_surplus / greedy_surplus - 1):.2f}%' if greedy_surplus else '-'
+
+        print(f'{size:>10} {len(matches):>12} {greedy_surplus:>16.4g} {optimal_surplus:>16.4g} '
+              f'{gain:>8} {greedy_time:>12.4f} {optimal_time:>12.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/p2p_partial_fill.py
+# Benchmark of the partial-fill p2p matching: volume left to route and time to cross the books.
+#
+# Usage: poetry run python -m benchmarks.p2p_partial_fill
+
+from types import SimpleNamespace
+
+from src.p2p.level_one import LevelOne
+from src.p2p.partial_fill import PartialFill
+from src.orders.batch import BatchData
+from benchmarks.p2p_matching import make_intents, timed
+
+
+SIZES = [10**3, 10**4, 5 * 10**4]
+
+
+def routed_share(intents: list, filled: dict) -> float:
+    """Mean share of the source amount of the intents left to route."""
+    return sum(1 - filled.get(id(intent), 0) / intent.source_amount for intent in intents) / len(intents)
+
+
+def main() -> None:
+    print(f'{"intents":>10} {"routed (full fills)":>20} {"routed (partial fills)":>24} {"fills":>8} {"time (s)":>10}')
+
+    for size in SIZES:
+        intents = make_intents(size)
+        for intent in intents:
+            intent.partial_fill = True
+
+        batch = BatchData()
+        batch.intents = intents
+        agent = SimpleNamespace(batch=batch)
+
+        # Volume left to route with 1-hop full fills only (greedy, best-case for full fills)
+        full = {}
+        for intent_1, intent_2 in LevelOne().run(agent):
+            if id(intent_1) not in full and id(intent_2) not in full:
+                full[id(intent_1)], full[id(intent_2)] = intent_1.source_amount, intent_2.source_amount
+
+        fills, elapsed = timed(PartialFill().run, agent)
+        partial = {id(intent): given for intent, given, _ in fills}
+
+        print(f'{size:>10} {routed_share(intents, full):>20.1%} {routed_share(intents, partial):>24.1%} '
+              f'{len(fills):>8} {elapsed:>10.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/p2p_rings.py
+# Benchmark of the p2p ring trades search (LevelN) for growing batches and ring lengths.
+#
+# Usage: poetry run python -m benchmarks.p2p_rings
+
+from types import SimpleNamespace
+
+from src.p2p.level_n import LevelN
+from src.orders.batch import BatchData
+from benchmarks.p2p_matching import make_intents, timed
+
+
+SIZES = [10**3, 10**4, 5 * 10**4]
+MAX_HOPS = [3, 4, 5]
+
+
+def main() -> None:
+    print(f'{"intents":>10} {"max hops":>10} {"rings":>10} {"intents in rings":>18} {"time (s)":>10}')
+
+    for size in SIZES:
+        batch = BatchData()
+        batch.intents = make_intents(size)
+        agent = SimpleNamespace(batch=batch)
+
+        for max_hops in MAX_HOPS:
+            rings, elapsed = timed(LevelN(max_hops).run, agent)
+
+            intents_in_rings = [intent for ring in rings for intent in ring]
+            assert len(set(map(id, intents_in_rings))) == len(intents_in_rings), 'Rings share intents'
+
+            print(f'{size:>10} {max_hops:>10} {len(rings):>10} {len(intents_in_rings):>18} {elapsed:>10.4f}')
+
+
+if __name__ == '__main__':
+    main()
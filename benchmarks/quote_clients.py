@@ -0,0 +1,138 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/quote_clients.py
+# Benchmark of quotes per second with a new client per quote against the pooled clients.
+#
+# A local stand-in for a venue answers every quote request with a Jupiter-like quote,
+# over plain HTTP and over TLS (with a self-signed certificate, if openssl is available).
+# It takes LATENCY to answer, and delays every new connection by HANDSHAKE, standing for
+# the round trips of the TCP and TLS handshakes to a remote venue.
+#
+# Usage: poetry run python -m benchmarks.quote_clients
+
+import os
+import ssl
+import time
+import ujson
+import asyncio
+import tempfile
+import subprocess
+
+import httpx
+
+from src.utils.clients import HTTP_CLIENTS
+from src.utils.network import get_async_request
+
+
+QUOTES = 500
+CONCURRENCY = [1, 32, 128]
+LATENCY = 0.02
+HANDSHAKE = 0.05
+
+QUOTE = ujson.dumps({
+    'inputMint': 'So11111111111111111111111111111111111111112', 'inAmount': '1000000000',
+    'outputMint': 'EPjFWJ5Pwm2DpK4QKXXBGMvH1M3VY5nz8ZefQH9DMHfR', 'outAmount': '150000000',
+    'otherAmountThreshold': '149250000', 'swapMode': 'ExactIn', 'slippageBps': 50, 'platformFee': None,
+    'priceImpactPct': '0', 'routePlan': [], 'contextSlot': 1, 'timeTaken': 0.001,
+}).encode()
+
+
+class QuoteServer:
+    """Minimal HTTP/1.1 venue answering every request with the same quote, keeping connections alive."""
+
+    def __init__(self, ssl_context: ssl.SSLContext = None) -> None:
+        self.ssl_context = ssl_context
+        self.connections = 0
+        self.server = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        await asyncio.sleep(HANDSHAKE)
+        response = (b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    b'Content-Length: ' + str(len(QUOTE)).encode() + b'\r\n\r\n' + QUOTE)
+        try:
+            while await reader.readuntil(b'\r\n\r\n'):
+                await asyncio.sleep(LATENCY)
+                writer.write(response)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0, ssl=self.ssl_context)
+        port = self.server.sockets[0].getsockname()[1]
+        return f'{"https" if self.ssl_context else "http"}://127.0.0.1:{port}/quote?amount=1000000000'
+
+    async def stop(self) -> None:
+        self.server.close()
+
+
+def self_signed(directory: str) -> tuple:
+    """Create a certificate for 127.0.0.1, returning its server context and path, or (None, None)."""
+    cert, key = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    try:
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-keyout', key, '-out', cert, '-subj', '/CN=127.0.0.1',
+                        '-addext', 'subjectAltName=IP:127.0.0.1'], check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    return context, cert
+
+
+async def fresh_client_quote(url: str) -> dict:
+    """The former get_async_request: a new client, thus a new connection, per quote."""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url)
+        return response.json()
+
+
+async def quotes_per_second(quote, url: str, concurrency: int) -> float:
+    """Send QUOTES quotes, `concurrency` at a time, and return the quotes per second."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            assert (await quote(url))['outAmount'] == '150000000'
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(QUOTES)))
+    return QUOTES / (time.perf_counter() - start)
+
+
+async def compare(name: str, ssl_context: ssl.SSLContext = None) -> None:
+    for concurrency in CONCURRENCY:
+        rates = []
+        for quote in (fresh_client_quote, get_async_request):
+            server = QuoteServer(ssl_context)
+            url = await server.start()
+            rates.append((await quotes_per_second(quote, url, concurrency), server.connections))
+            await HTTP_CLIENTS.aclose()
+            await server.stop()
+
+        (before, before_connections), (after, after_connections) = rates
+        print(f'{name:>6} {concurrency:>12} {before:>10.0f}/s {before_connections:>12} '
+              f'{after:>10.0f}/s {after_connections:>12} {after / before:>7.1f}x')
+
+
+def main() -> None:
+    print(f'{QUOTES} quotes from a local stand-in venue ({LATENCY * 1000:.0f}ms per quote, '
+          f'{HANDSHAKE * 1000:.0f}ms per new connection)')
+    print(f'{"":>6} {"concurrency":>12} {"new client":>12} {"connections":>12} '
+          f'{"pooled":>12} {"connections":>12} {"speedup":>8}')
+    asyncio.run(compare('http'))
+
+    with tempfile.TemporaryDirectory() as directory:
+        ssl_context, cert = self_signed(directory)
+        if ssl_context is None:
+            print('openssl is not available: skipping TLS')
+            return
+        # Trust the self-signed certificate in every client
+        os.environ['SSL_CERT_FILE'] = cert
+        asyncio.run(compare('https', ssl_context))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+# -*- encoding: utf-8 -*-
+# benchmarks/quote_hedging.py
+# Benchmark of the tail latency of quotes, with and without hedged requests.
+#
+# A local stand-in for a venue answers most quotes after LATENCY, and a few (SLOW_RATE)
+# after SLOW_LATENCY, like a venue with a heavy tail. A batch of QUOTES distinct quotes
+# is sent CONCURRENCY at a time, as Aleph does, and is only as fast as its slowest quote.
+#
+# Usage: poetry run python -m benchmarks.quote_hedging
+
+import time
+import base58
+import random
+import asyncio
+
+from solders.keypair import Keypair
+from src.liquidity.jupiter import JupiterWrapper
+from src.orders.intent import IntentData
+from src.utils.clients import HTTP_CLIENTS
+
+
+QUOTES = 1000
+CONCURRENCY = 16
+LATENCY = 0.01
+SLOW_LATENCY = 0.25
+SLOW_RATE = 0.02
+BUDGETS = [0, 0.05, 0.1]
+
+QUOTE = (b'{"inputMint":"SOL_MINT","inAmount":"1","outputMint":"USDC_MINT","outAmount":"1",'
+         b'"otherAmountThreshold":"0","swapMode":"ExactIn","slippageBps":50,"platformFee":null,'
+         b'"priceImpactPct":"0","routePlan":[],"contextSlot":1,"timeTaken":0.001}')
+
+
+async def start_venue(rng: random.Random) -> tuple:
+    """Start the stand-in venue, returning its server, URL and request counter."""
+    requests = [0]
+
+    async def handle(reader, writer):
+        try:
+            while await reader.readuntil(b'\r\n\r\n'):
+                requests[0] += 1
+                await asyncio.sleep(SLOW_LATENCY if rng.random() < SLOW_RATE else LATENCY)
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: ' + str(len(QUOTE)).encode() + b'\r\n\r\n' + QUOTE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Requests abandoned by the hedges are still pending when the loop closes
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, f'http://127.0.0.1:{server.sockets[0].getsockname()[1]}/', requests
+
+
+def make_config(url: str, budget: float) -> dict:
+    return {
+        'SOLANA_RPC_HTTPS': 'http://127.0.0.1:1', 'WALLET_PRIVATE_KEY': base58.b58encode(bytes(Keypair())).decode(),
+        'JUPITER_HTTPS': url, 'JUPITER_QUOTE_ENDPOINT': 'quote', 'JUPITER_SWAP_ENDPOINT': 'swap',
+        'ACCEPTABLE_SLIPPAGE': '50', 'SWAP_RETRIES': '5', 'SWAP_SLEEP_TIME': '10',
+        'HTTP_MAX_CONNECTIONS': CONCURRENCY, 'HTTP_MAX_KEEPALIVE_CONNECTIONS': CONCURRENCY, 'HTTP_KEEPALIVE_SECONDS': 30,
+        'HTTP_HTTP2': False, 'HTTP_TIMEOUT_SECONDS': 10,
+        'RATE_LIMIT_RPS': 0, 'RATE_LIMIT_BURST': 10, 'RATE_LIMIT_HOST_RPS': {}, 'RATE_LIMIT_MAX_RETRIES': 5,
+        'RATE_LIMIT_DELAY': 5,
+        'HTTP_ADAPTIVE_TIMEOUT_MULTIPLIER': 4, 'HTTP_ADAPTIVE_TIMEOUT_MIN_SECONDS': 0.5,
+        'CIRCUIT_FAILURE_THRESHOLD': 5, 'CIRCUIT_COOLDOWN_SECONDS': 5,
+        'QUOTE_CACHE_TTL_SECONDS': 0, 'QUOTE_CACHE_MAX_ENTRIES': 4096, 'QUOTE_CACHE_MAX_SLOT_AGE': 5,
+        'QUOTE_CACHE_BUCKET_BPS': 0, 'QUOTE_HEDGE_PERCENTILE': 95, 'QUOTE_HEDGE_BUDGET': budget,
+    }
+
+
+def make_intent(i: int) -> IntentData:
+    return IntentData(str(i), 'SOL', 'SOL_MINT', 'Wallet', i + 1, 'USDC', 'USDC_MINT', 'Wallet',
+                      0, False, 0, 'pending', 9, 6)
+
+
+async def run(budget: float) -> tuple:
+    server, url, requests = await start_venue(random.Random(0))
+    jupiter = JupiterWrapper(make_config(url, budget))
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await jupiter.get_quote(make_intent(i))
+            latencies.append(time.perf_counter() - start)
+
+    # Warm the latency window of the hedge policy, as the previous batches would
+    await asyncio.gather(*(one(-i) for i in range(1, 101)))
+    latencies.clear()
+    sent = requests[0]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(QUOTES)))
+    elapsed = time.perf_counter() - start
+
+    await HTTP_CLIENTS.aclose()
+    server.close()
+    latencies.sort()
+    return (latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], latencies[-1],
+            elapsed, (requests[0] - sent) / QUOTES - 1)
+
+
+def main() -> None:
+    print(f'{QUOTES} quotes, {CONCURRENCY} at a time, from a local stand-in venue ({LATENCY * 1000:.0f}ms per quote, '
+          f'{SLOW_LATENCY * 1000:.0f}ms for {SLOW_RATE:.0%} of them)')
+    print(f'{"hedge budget":>12} {"p50":>9} {"p99":>9} {"max":>9} {"batch":>9} {"extra load":>11}')
+    for budget in BUDGETS:
+        p50, p99, worst, elapsed, extra = asyncio.run(run(budget))
+        print(f'{budget:>12.0%} {p50 * 1000:>7.1f}ms {p99 * 1000:>7.1f}ms {worst * 1000:>7.1f}ms '
+              f'{elapsed:>8.2f}s {extra:>10.1%}')
+
+
+if __name__ == '__main__':
+    main()
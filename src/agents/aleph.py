@@ -1,16 +1,26 @@
 # src/agents/aleph.py
 # Aleph agent class
 
+import math
 import asyncio
 
 from src.agents.base import AgentBase
 from src.p2p.level_one import LevelOne
+from src.p2p.level_n import LevelN
+from src.p2p.partial_fill import PartialFill
+from src.p2p.auction import BatchAuction
+from src.p2p.matching import greedy_matching, optimal_matching
 from src.orders.quote import QuoteData
-from src.utils.maths import calculate_surplus
+from src.orders.intent import IntentData
 from src.orders.solution import SolutionData
-from src.liquidity.jupiter import JupiterWrapper
-from src.utils.logging import (log_info, log_debug, log_error, 
-                               exit_with_error, log_debug_object)
+from src.liquidity.pools import PoolStore
+from src.liquidity.router import QuoteRouter
+from src.liquidity.venues import load_venues
+from src.liquidity.netting import NettedSwap, net_intents
+from src.utils.breakers import BREAKERS
+from src.utils.config import load_config
+from src.utils.limits import RetryBudget, jittered_backoff
+from src.utils.logging import log_info, log_debug, log_error, log_debug_object
 
 
 class Aleph(AgentBase):
@@ -20,6 +30,23 @@ class Aleph(AgentBase):
         super().__init__(config)
         self.name = 'Aleph'
 
+        self.P2P_MATCHING_ENGINE = self.config['P2P_MATCHING_ENGINE']
+        self.P2P_RING_MAX_HOPS = self.config['P2P_RING_MAX_HOPS']
+        self.P2P_PARTIAL_FILL = self.config['P2P_PARTIAL_FILL']
+        self.P2P_AUCTION_PRICE_CANDIDATES = self.config['P2P_AUCTION_PRICE_CANDIDATES']
+        # At least one attempt, or every intent would be dropped unquoted
+        self.QUOTE_MAX_ATTEMPTS = max(self.config['QUOTE_MAX_ATTEMPTS'], 1)
+        self.QUOTE_RETRY_BUDGET = self.config['QUOTE_RETRY_BUDGET']
+        self.QUOTE_BACKOFF_SECONDS = self.config['QUOTE_BACKOFF_SECONDS']
+        self.QUOTE_BACKOFF_MAX_SECONDS = self.config['QUOTE_BACKOFF_MAX_SECONDS']
+        self.ROUTING_NETTING = self.config['ROUTING_NETTING']
+        self.ROUTING_QUORUM = self.config['ROUTING_QUORUM']
+        self.ROUTING_TIMEOUT_SECONDS = self.config['ROUTING_TIMEOUT_SECONDS']
+        self.ROUTING_LOCAL_QUOTES = self.config['ROUTING_LOCAL_QUOTES']
+        self.ROUTING_LOCAL_SCREEN_BPS = self.config['ROUTING_LOCAL_SCREEN_BPS']
+        self.router = None
+        self.pool_store = None
+
     async def solve_order(self) -> None:
         """Solve order routine for Aleph."""
 
@@ -28,83 +55,134 @@ class Aleph(AgentBase):
         # 1- P2P
         log_info("⚙️  Searching for p2p matches ...")
         self.p2p_strategy()
+        if self.deadline_reached('routing'):
+            return
 
         # 2- Routing 
         log_info(f'⚙️  Searching optimal execution path for {len(self.batch.intents)} intents ...')
         await self.routing()
 
+    def deadline_reached(self, next_stage: str) -> bool:
+        """Check the batch deadline before a solving stage, keeping the solutions found so far."""
+        if self.batch.expired():
+            log_error(f"  Batch deadline reached, skipping {next_stage}: "
+                      f"posting the {len(self.batch.solutions)} solution(s) found so far.")
+            return True
+        return False
+
+    def p2p_time_limit(self) -> float:
+        """Return the seconds a p2p search may take, leaving at least half of the time left to the next stages."""
+        time_left = self.batch.time_left()
+        return time_left / 2 if time_left is not None else None
+
     @classmethod
-    def print_info(cls) -> None:
-        """Print Agent info"""
+    def print_info(cls, config: dict = None) -> None:
+        """Print Agent info, with the p2p settings of the configuration (loaded if not given)."""
+        config = config or load_config()
         log_info("   Aleph is the first Urani MEV in-house agent.")
         log_info("   .Version: v0.1")
         log_info("   .Language: Python")
-        log_info("   .Routing algorithm: Jupiter")
-        log_info("   .P2P matches: Naive 1-hop")
-        log_info("   .Partial fill: No")
-        log_info("   .Ring trades: No\n")
+        log_info("   .Routing algorithm: best quote of the venues in ROUTING_VENUES (Jupiter by default)")
+        if config['ROUTING_LOCAL_QUOTES']:
+            log_info(f"   .Routing pre-screen: local quotes of the {len(config['ROUTING_POOLS'])} pool(s) in ROUTING_POOLS")
+        engines = {'greedy': 'Indexed 1-hop, greedy selection',
+                   'optimal': 'Indexed 1-hop, maximum-weight matching',
+                   'auction': 'Batch auction at a uniform price per token pair'}
+        log_info(f"   .P2P matches: {engines[config['P2P_MATCHING_ENGINE']]}")
+        log_info(f"   .Partial fill: {'Yes' if config['P2P_PARTIAL_FILL'] else 'No'}")
+        hops = config['P2P_RING_MAX_HOPS']
+        log_info(f"   .Ring trades: {f'Yes, up to {hops} intents' if hops >= 3 else 'No'}\n")
         log_info("\n   --> Check the README to learn more about Aleph <--\n")
 
     def p2p_strategy(self) -> None:
         """
         Aleph p2p strategy:
-        1) Naive 1-hop search.
-        2) Ranking the matches according to the sum of the surplus of the two users.
-        3) Eliminating redundant IDs, e.g., [(1,2), (3,4), (2,5)] -> [(1,2), (3,4)], where (1,2) has the best overall surplus.
-        4) Removing from the intent list the IDs of the intents included in the p2p_matches list.
+        1) 1-hop search over intents indexed by token pair.
+        2) Selecting disjoint matches, according to `P2P_MATCHING_ENGINE`:
+           - 'greedy': ranking the matches according to the sum of the surplus of the two users, 
+             and eliminating redundant IDs, e.g., [(1,2), (3,4), (2,5)] -> [(1,2), (3,4)], 
+             where (1,2) has the best overall surplus.
+           - 'optimal': maximum-weight matching, i.e., the disjoint matches with the highest
+             total surplus.
+           - 'auction': instead of 1) and 5), clearing every token pair at a uniform price, 
+             filling the intents with the most surplus (partially, if they allow it).
+        3) Ring trades of 3 to `P2P_RING_MAX_HOPS` intents among the remaining intents.
+        4) Removing from the intent list the IDs of the intents included in a match or a ring.
+        5) If `P2P_PARTIAL_FILL`, crossing a book per token pair with the remaining intents 
+           allowing partial fills, and leaving only their unfilled part to the routing.
         """
-        log_debug("  Checking for p2p matches ...")
-    
-        level_one_p2p = LevelOne()
-        p2p_matches = level_one_p2p.run(self)
+        p2p_matches, fills = [], []
+
+        if self.P2P_MATCHING_ENGINE == 'auction':
+            log_debug("  Clearing the batch auction ...")
+            batch_auction = BatchAuction(self.P2P_AUCTION_PRICE_CANDIDATES, self.p2p_time_limit())
+            fills = batch_auction.run(self)
+            if fills:
+                self.add_fill_solutions(fills)
+        else:
+            log_debug("  Checking for p2p matches ...")
+            level_one_p2p = LevelOne()
+            p2p_matches = level_one_p2p.run(self)
     
-        if p2p_matches is False:
+        if p2p_matches:
+            if self.config.get('LOG_LEVEL') == 'debug':
+                log_debug_object('Printing all p2p matches', 'p2p match', p2p_matches)
+
+            # Create the solution only for the non-repetitive intents
+            log_debug(f"  Selecting p2p matches ({self.P2P_MATCHING_ENGINE}) ...")
+            if self.P2P_MATCHING_ENGINE == 'optimal':
+                p2p_matches = optimal_matching(p2p_matches)
+            else:
+                p2p_matches = greedy_matching(p2p_matches)
+            self.add_p2p_solutions(p2p_matches)
+
+        log_debug(f"  Checking for ring trades of up to {self.P2P_RING_MAX_HOPS} intents ...")
+        level_n_p2p = LevelN(self.P2P_RING_MAX_HOPS, self.p2p_time_limit())
+        rings = level_n_p2p.run(self)
+        if rings:
+            self.add_p2p_solutions(rings)
+
+        if self.P2P_PARTIAL_FILL and self.P2P_MATCHING_ENGINE != 'auction':
+            log_debug("  Crossing the books of partial-fill intents ...")
+            partial_fill_p2p = PartialFill(self.p2p_time_limit())
+            fills = partial_fill_p2p.run(self)
+            if fills:
+                self.add_fill_solutions(fills)
+
+        if not p2p_matches and not rings and not fills:
             log_info('    No p2p match found.\n')
             return
-        log_info('🤙 Found p2p matches.\n')
-    
-        if self.config.get('LOG_LEVEL') == 'debug':
-            log_debug_object('Printing all p2p matches', 'p2p match', p2p_matches)
-            pass
-    
-        log_debug("  Ranking p2p matches ...")
-        # Sort the matches based on surplus
-        p2p_matches.sort(key=lambda match: 
-                         calculate_surplus(match[1].source_amount,match[0].min_receive_amount) + 
-                         calculate_surplus(match[0].source_amount,match[1].min_receive_amount), 
-                         reverse=True)
+        fills_from = 'the batch auction' if self.P2P_MATCHING_ENGINE == 'auction' else 'the partial-fill intent books'
+        log_info(f'🤙 Found {len(p2p_matches)} p2p matches, {len(rings)} ring trades '
+                 f'and {len(fills)} fills from {fills_from}.\n')
 
         if self.config.get('LOG_LEVEL') == 'debug':
-            log_debug_object('Printing sorted p2p matches', 'p2p match', p2p_matches)
-    
-        # Create the solution only for the non-repetitive intents
-        log_debug("  Filtering p2p matches ...")
-
-        processed_intent_ids = set()  # Track processed intent IDs to avoid duplicates
+            log_debug_object('Printing reamining intents to match', 'intent', self.batch.intents)
 
-        # Iterate over the P2P matches
-        for index,this_match in enumerate(p2p_matches):
-            # Extract intents from the current match
-            intent_a, intent_b = this_match
+    def add_p2p_solutions(self, p2p_matches: list[list[IntentData]]) -> None:
+        """
+        Create the solutions of disjoint p2p matches (pairs or rings) and remove their intents from the batch.
 
-            # Skip matches involving already-processed intents
-            if intent_a.intent_id in processed_intent_ids or intent_b.intent_id in processed_intent_ids:
-                continue
+        Args:
+            p2p_matches (list[list[IntentData]]): The selected matches, each listing its intents in ring order.
+        """
+        if self.config.get('LOG_LEVEL') == 'debug':
+            log_debug_object('Printing selected p2p matches', 'p2p match', p2p_matches)
 
-            # Create solutions
-            solution_a, solution_b = SolutionData.from_intent_match(intent_a, intent_b)
+        processed_intent_ids = set()  # Track processed intent IDs
 
-            # Set the id: we start from 1
-            id = 2*index
-            solution_a.solution_id = f"{id+1}"
-            solution_b.solution_id = f"{id+2}"
-            
-            # Add solutions to the batch
-            self.batch.solutions[f'{id+1}'] = solution_a
-            self.batch.solutions[f'{id+2}'] = solution_b
+        # Iterate over the P2P matches
+        id = len(self.batch.solutions)
+        for this_match in p2p_matches:
+            # Create solutions, each intent being paid by the next one
+            for solution in SolutionData.from_ring(this_match):
+                # We enumerate the first solutions as "1" and not "0"
+                solution.solution_id = f"{id+1}"
+                self.batch.solutions[f'{id+1}'] = solution
+                id += 1
 
             # Add intent IDs to the processed set
-            processed_intent_ids.update({intent_a.intent_id, intent_b.intent_id})
+            processed_intent_ids.update(intent.intent_id for intent in this_match)
 
         log_debug(" Removing processed intents from the batch...")
         # Filter out processed intents from the batch
@@ -112,55 +190,244 @@ class Aleph(AgentBase):
             intent for intent in self.batch.intents 
             if intent.intent_id not in processed_intent_ids
         ]
-        if self.config.get('LOG_LEVEL') == 'debug':
-            log_debug_object('Printing reamining intents to match', 'intent', self.batch.intents)
     
+    def add_fill_solutions(self, fills: list[tuple[IntentData, int, int]]) -> None:
+        """
+        Create the solutions of the fills of intent books or auctions, and leave only the unfilled part of their intents in the batch.
+
+        Args:
+            fills (list[tuple[IntentData, int, int]]): The (intent, source amount given, destination amount received) fills.
+        """
+        residuals = {}
+
+        id = len(self.batch.solutions)
+        for intent, given, received in fills:
+            solution = SolutionData.from_fill(intent, given, received)
+            solution.solution_id = f"{id+1}"
+            self.batch.solutions[f'{id+1}'] = solution
+            id += 1
+
+            residuals[intent.intent_id] = PartialFill.residual(intent, given)
+
+        log_debug(" Replacing partially filled intents by their residuals...")
+        self.batch.intents = [
+            residuals.get(intent.intent_id, intent) for intent in self.batch.intents
+            if residuals.get(intent.intent_id, intent) is not None
+        ]
+        log_debug(f"  {sum(residual is not None for residual in residuals.values())} residual intents left to route.")
+
     async def routing(self) -> None:
         """
         Perform routing to get quotes and create solutions for remaining intents.
         
         This involves:
-        1. Fetching quotes for each intent from Jupiter.
-        2. Creating solutions based on the quotes.
+        1. If `ROUTING_NETTING`, netting the intents of the same direction into one swap each
+           (see `src.liquidity.netting`), so that a single quote is needed per token pair.
+        2. Fetching quotes for each swap and remaining intent from the venues, until the batch deadline.
+           If `ROUTING_LOCAL_QUOTES`, the intents routed alone are first pre-screened on the local
+           pools (see `screen_intents`).
+        3. Creating solutions based on the quotes, splitting the output of each swap pro-rata.
+           When an intent's share falls short of its minimum, it is routed alone, and the
+           rest of its swap is quoted again, in a following round.
         """
-        
-        # Get quotes from Jupiter
-        quotes = await self.get_jupiter_quotes()
+        if self.ROUTING_NETTING:
+            swaps, singles = net_intents(self.batch.intents)
+            if swaps:
+                log_info(f"    Netted {sum(len(swap) for swap in swaps)} intents into {len(swaps)} swaps.")
+        else:
+            swaps, singles = [], list(self.batch.intents)
 
-        # Craft and append solutions
         id = len(self.batch.solutions)
-        for index, quote in enumerate(quotes):
+        while swaps or singles:
+            # Get quotes from the venues
+            singles = self.screen_intents(singles)
+            quotes = await self.get_quotes([swap.intent for swap in swaps] + singles)
+            quoted = {intent.intent_id: quote for intent, quote in quotes}
 
-            solution = SolutionData.from_quote(quote, self.batch.intents[index])
+            # Craft and append solutions
+            solutions, next_swaps, next_singles = [], [], []
+            for swap in swaps:
+                quote = quoted.get(swap.intent.intent_id)
+                if quote is None:
+                    continue
+                try:
+                    filled, rejected = swap.split(quote)
+                except ValueError as e:
+                    log_error(f"  Dropping intents {[intent.intent_id for intent in swap.intents]}: {e}")
+                    continue
+                solutions.extend(filled)
+                if rejected:
+                    log_debug(f"  {len(rejected)} intent(s) of {swap.intent.intent_id} short of their minimum, routing them alone.")
+                    rejected_ids = {intent.intent_id for intent in rejected}
+                    remaining = [intent for intent in swap.intents if intent.intent_id not in rejected_ids]
+                    if len(remaining) > 1:
+                        next_swaps.append(NettedSwap(remaining))
+                    else:
+                        next_singles.extend(remaining)
+                    next_singles.extend(rejected)
 
-            # We enumerate the first solutions as "1" and not "0"
-            solution.solution_id = f"{id+1}"
-            self.batch.solutions[id+1] = solution
-            id+=1
+            for intent in singles:
+                quote = quoted.get(intent.intent_id)
+                if quote is None:
+                    continue
+                try:
+                    solutions.append(SolutionData.from_quote(quote, intent))
+                except ValueError as e:
+                    log_error(f"  Dropping intent {intent.intent_id}: {e}")
+
+            for solution in solutions:
+                # We enumerate the first solutions as "1" and not "0"
+                solution.solution_id = f"{id+1}"
+                self.batch.solutions[id+1] = solution
+                id+=1
+
+            swaps, singles = next_swaps, next_singles
+            if (swaps or singles) and self.batch.expired():
+                log_error(f"  Batch deadline reached: dropping {sum(map(len, swaps)) + len(singles)} intent(s) left to requote.")
+                break
     
-    async def get_jupiter_quotes(self) -> list[QuoteData]:
+    def screen_intents(self, intents: list[IntentData]) -> list[IntentData]:
         """
-        Retrieve quotes from Jupiter with retry logic.
+        Drop the intents that the pools in `ROUTING_POOLS`, simulated locally, cannot fill.
+
+        The pools are followed by a `PoolStore`, started on the first call and kept from one
+        batch to the next. Local quotes cost no request, but are only as fresh as the pool
+        states: an intent is only dropped when its best local output falls short of its minimum
+        by more than `ROUTING_LOCAL_SCREEN_BPS`. The other intents, including those without a
+        local pool, are quoted by the venues.
+
+        Args:
+            intents (list[IntentData]): The intents to screen.
+
         Returns:
-            list: A list of quotes retrieved from Jupiter.
+            list[IntentData]: The intents to quote.
+        """
+        if not self.ROUTING_LOCAL_QUOTES or not intents:
+            return intents
+        if self.pool_store is None:
+            self.pool_store = PoolStore(self.config['SOLANA_RPC_HTTPS'], self.config['SOLANA_RPC_WSS'], config=self.config)
+            self.pool_store.watch_pools(self.config['ROUTING_POOLS'])
+            self.pool_store.start()
+
+        kept = []
+        for intent, quote in zip(intents, self.pool_store.simulator.quotes(intents)):
+            if quote is not None and \
+                    int(quote['outAmount']) * 10_000 < intent.min_receive_amount * (10_000 - self.ROUTING_LOCAL_SCREEN_BPS):
+                log_debug(f"  Dropping intent {intent.intent_id}: the local pools pay {quote['outAmount']}, "
+                          f"short of its minimum {intent.min_receive_amount}.")
+                continue
+            kept.append(intent)
+        if len(kept) < len(intents):
+            log_info(f"    Pre-screened out {len(intents) - len(kept)} out of {len(intents)} intents on the local pools.")
+        return kept
+
+    async def get_quotes(self, intents: list[IntentData] = None) -> list[tuple[IntentData, QuoteData]]:
         """
-        jupiter = JupiterWrapper(self.config)
-        max_retries = self.MULDER_MAX_INSTANCES
-        retry_delay = self.MULDER_UPDATE_SECONDS
+        Retrieve the best quotes of the venues in `ROUTING_VENUES`, within the batch deadline.
+
+        Each intent is quoted and retried independently (see `get_quote_with_retries`),
+        so a failed quote never discards the quotes of the other intents. Intents that 
+        keep failing are dropped from the routing. When the deadline fires, outstanding
+        quote requests are cancelled and only the quotes received so far are returned.
+
+        Each intent is quoted on all the venues concurrently by a `QuoteRouter`, which keeps
+        the best quote. The router, with its venues and their quote caches, is kept from one
+        batch to the next.
+
+        Args:
+            intents (list[IntentData], optional): The intents to quote. Defaults to the intents of the batch.
 
-        for attempt in range(1, max_retries + 1):
+        Returns:
+            list: A list of (intent, quote) pairs retrieved from the venues.
+        """
+        if self.router is None:
+            self.router = QuoteRouter(load_venues(self.config), self.ROUTING_QUORUM, self.ROUTING_TIMEOUT_SECONDS)
+        router = self.router
+        if intents is None:
+            intents = self.batch.intents
+        budget = RetryBudget(math.ceil(self.QUOTE_RETRY_BUDGET * len(intents)))
+
+        # Run concurrently a different routing for each intent
+        tasks = [asyncio.create_task(self.get_quote_with_retries(router, intent, budget))
+                 for intent in intents]
+        if not tasks:
+            return []
+        done, pending = await asyncio.wait(tasks, timeout=self.batch.time_left())
+
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        quotes = [(intent, task.result()) for intent, task in zip(intents, tasks)
+                  if task in done and task.result() is not None]
+
+        if pending:
+            log_error(f"  Batch deadline reached: cancelled {len(pending)} outstanding quote(s), "
+                      f"keeping {len(quotes)}.")
+        if len(quotes) < len(intents):
+            log_info(f"    Quoted {len(quotes)} out of {len(intents)} intents.")
+        for name, stats in router.stats().items():
+            log_debug(f"    {name}: {stats['win_rate']:.0%} win rate ({stats['wins']} best quotes), "
+                      f"{stats['mean_latency'] * 1000:.0f}ms mean latency, {stats['errors']} errors, {stats['late']} late.")
+            venue = router.venues[name]
+            breaker = BREAKERS.breaker(venue.VENUE_URL)
+            if breaker.state != breaker.CLOSED or breaker.rejected:
+                log_debug(f"    {name} circuit is {breaker.state}: opened {breaker.opened} time(s), "
+                          f"{breaker.rejected} request(s) failed fast.")
+            if venue.quote_cache.enabled:
+                stats = venue.quote_cache.stats()
+                log_debug(f"    {name} quote cache: {stats['hit_rate']:.0%} hit rate ({stats['hits']} hits, "
+                          f"{stats['misses']} misses, {stats['stale']} stale), {stats['saved_seconds']:.2f}s saved.")
+            log_debug(f"    {name} quotes coalesced with a request in flight: {venue.coalesced} so far.")
+            if venue.hedge.enabled:
+                stats = venue.hedge.stats()
+                log_debug(f"    {name} hedged quotes: {stats['hedges']} out of {stats['requests']} "
+                          f"({stats['hedge_wins']} won), hedging after {stats['delay'] or 0:.3f}s.")
+        return quotes
+
+    async def get_quote_with_retries(self, venue: QuoteRouter, intent: IntentData,
+                                     budget: RetryBudget) -> QuoteData:
+        """
+        Retrieve the quote for one intent, retrying with its own jittered backoff.
+
+        Retries stop after `QUOTE_MAX_ATTEMPTS` attempts, when the batch retry budget
+        is spent, or when the backoff would overrun the batch deadline.
+
+        Args:
+            venue (QuoteRouter): The router of the liquidity venues to quote.
+            intent (IntentData): The intent to quote.
+            budget (RetryBudget): The retries left for the whole batch.
+
+        Returns:
+            QuoteData: The quote, or None if the intent must be dropped.
+        """
+        for attempt in range(self.QUOTE_MAX_ATTEMPTS):
             try:
-                # Run concurrently a different jupiter routing for each intent
-                quotes = await asyncio.gather(*[jupiter.get_quote(intent) for intent in self.batch.intents])
-                return [QuoteData.from_dict(quote) for quote in quotes]  
-            
+                return QuoteData.from_dict(await venue.get_quote(intent))
             except Exception as e:
-                log_error(f"  Retrieving quotes from Jupiter, attempt #{attempt} failed: {str(e)}")
-                if attempt < max_retries:
-                    log_error(f"  Retrying in {retry_delay} second(s)...")
-                    await asyncio.sleep(retry_delay)  # Wait before retrying
-                else:
-                    exit_with_error("  Maximum retry attempts reached. Failing operation.")
+                error = e
+                log_debug(f"  Quote for intent {intent.intent_id}, attempt #{attempt+1} failed: {e}")
+
+            if attempt + 1 == self.QUOTE_MAX_ATTEMPTS:
+                break
+            delay = jittered_backoff(attempt, self.QUOTE_BACKOFF_SECONDS, self.QUOTE_BACKOFF_MAX_SECONDS)
+            time_left = self.batch.time_left()
+            if time_left is not None and delay >= time_left:
+                break
+            if not budget.spend():
+                log_debug("  Retry budget of the batch is spent.")
+                break
+            await asyncio.sleep(delay)
+
+        log_error(f"  Dropping intent {intent.intent_id}: no quote after {attempt+1} attempt(s): {error}")
+        return None
+
+    async def close_clients(self) -> None:
+        """Stop following the local pools, then close the pooled HTTP connections."""
+        if self.pool_store is not None:
+            await self.pool_store.close()
+            self.pool_store = None
+        await super().close_clients()
 
 if __name__ == '__main__':
     Aleph().run()
@@ -2,14 +2,17 @@
 # Base class for agents
 
 import time
+import asyncio
 
 from functools import wraps
 from src.orders.batch import BatchData
+from src.orders.feeds import BatchSubscriber, BatchPoller
 from src.utils.config import load_config
-from src.utils.logging import log_debug, log_info, exit_with_error, hourglass
+from src.utils.clients import HTTP_CLIENTS
+from src.utils.logging import log_debug, log_info, log_error, exit_with_error, hourglass
 from src.utils.network import (get_request, post_request, 
-                               get_async_request, post_async_request, 
-                               html_to_json)
+                               post_async_request, 
+                               html_to_json, BATCH_ACCEPT_HEADERS)
 
 class AgentBase:
     """
@@ -21,6 +24,7 @@ class AgentBase:
 
     def __init__(self, config=None) -> None:
         self.config = config or load_config()
+        HTTP_CLIENTS.configure(self.config)
         
         self.URANI_ORDERBOOK_HTTPS_URL = self.config['URANI_ORDERBOOK_HTTPS_URL']
         self.URANI_ORDERBOOK_WS_URL = self.config['URANI_ORDERBOOK_WS_URL']
@@ -32,7 +36,15 @@ class AgentBase:
         self.MULDER_UPDATE_SECONDS = self.config['MULDER_UPDATE_SECONDS']
         self.MULDER_MAX_INSTANCES = self.config['MULDER_MAX_INSTANCES']
         self.MULDER_TYPE_OF_CONNECTION = self.config['MULDER_TYPE_OF_CONNECTION'].lower()
+        self.MULDER_PIPELINE_DEPTH = self.config['MULDER_PIPELINE_DEPTH']
+        self.MULDER_POLL_MIN_SECONDS = self.config['MULDER_POLL_MIN_SECONDS']
+        self.MULDER_LONG_POLL_SECONDS = self.config['MULDER_LONG_POLL_SECONDS']
+        self.MULDER_BATCH_DEADLINE_SECONDS = self.config['MULDER_BATCH_DEADLINE_SECONDS']
+        self.MULDER_STREAM_BATCHES = self.config['MULDER_STREAM_BATCHES']
         self.batch = BatchData()
+        self.batches_seen = 0
+        self.batch_subscriber = None
+        self.batch_poller = None
 
     #####################################################
     #                  Private methods
@@ -92,12 +104,15 @@ class AgentBase:
         
         try:
             while True:
-                response = get_request(url)
+                response = get_request(url, headers=BATCH_ACCEPT_HEADERS)
                 
                 if response.status_code != 200:
                     exit_with_error(f"Error fetching current batch: {response.text}")
                 
-                json_data = html_to_json(response)
+                try:
+                    json_data = html_to_json(response)
+                except ValueError as e:
+                    exit_with_error(f"Error decoding current batch: {e}")
                 
                 # Check if it is non-empty, if so we have a valid batch
                 if json_data: 
@@ -112,34 +127,129 @@ class AgentBase:
             exit_with_error("Process interrupted by the user.\n")
 
     async def get_current_batch_http_async(self) -> dict:
-        """Retrieve the current batch using HTTP asynchronously."""
+        """
+        Retrieve the next batch using HTTP asynchronously.
 
-        url = self.URANI_ORDERBOOK_HTTPS_URL + self.URANI_BATCHES_HTTP_ENDPOINT
-        log_debug(f'Fetching current batch from {url}')
-        
-        index = 0  # To keep track of which symbol to display
-        
-        try:
-            while True:
-                response = await get_async_request(url)
-                
-                if response.status_code != 200:
-                    exit_with_error(f"Error fetching current batch: {response.text}")
-                
-                json_data = html_to_json(response)
-                
-                # Check if it is non-empty, if so we have a valid batch
-                if json_data: 
-                    log_info(f'\n🛹 {self.name} found a valid batch ...')
-                    return json_data
-                else:
-                    index = hourglass(f'{self.name} is waiting for a valid batch ...', index)
-                time.sleep(1)
+        The first call sets up a `BatchPoller` on URANI's batches endpoint. Polls are
+        conditional (ETag/If-None-Match), long-polling if `MULDER_LONG_POLL_SECONDS`
+        is set, and back off while the orderbook is idle, so waiting for a batch
+        never blocks the event loop and costs close to nothing.
 
-        except KeyboardInterrupt:
-            log_info('\n')
-            exit_with_error("Process interrupted by the user.\n")
+        Returns:
+            dict: The JSON data of the batch.
+        """
+        json_data = await self._get_batch_poller().get()
+        log_info(f'\n🛹 {self.name} found a valid batch ...')
+        return json_data
+
+    async def get_current_batch_http_stream(self, batch_id: str) -> BatchData:
+        """
+        Retrieve the next batch using HTTP asynchronously, parsing its intents while it downloads.
+
+        Polls as `get_current_batch_http_async`, but the intents are built as the body
+        arrives, so the raw batch is never held in memory in full. Malformed intents
+        are quarantined in the batch instead of failing it.
+
+        Args:
+            batch_id (str): The ID to use if the batch does not carry one.
+
+        Returns:
+            BatchData: The parsed batch.
+        """
+        fields, batch = await self._get_batch_poller().get_batch()
+        log_info(f'\n🛹 {self.name} found a valid batch ...')
+        batch.batch_id = str(fields.get('batch_id', batch_id))
+        batch.set_deadline(self.MULDER_BATCH_DEADLINE_SECONDS, fields.get('deadline'))
+        return batch
+
+    def _get_batch_poller(self) -> BatchPoller:
+        """Return the poller of URANI's batches endpoint, setting it up on first use."""
+        if self.batch_poller is None:
+            url = self.URANI_ORDERBOOK_HTTPS_URL + self.URANI_BATCHES_HTTP_ENDPOINT
+            log_debug(f'Polling batches from {url}')
+            self.batch_poller = BatchPoller(url,
+                                            min_interval=self.MULDER_POLL_MIN_SECONDS,
+                                            max_interval=self.MULDER_UPDATE_SECONDS,
+                                            long_poll=self.MULDER_LONG_POLL_SECONDS)
+        return self.batch_poller
+
+    def _get_batch_subscriber(self) -> BatchSubscriber:
+        """Return the subscription to URANI's batches topic, starting it on first use."""
+        if self.batch_subscriber is None:
+            log_debug(f'Subscribing to {self.URANI_BATCHES_SUB_TOPIC} at {self.URANI_ORDERBOOK_WS_URL}')
+            self.batch_subscriber = BatchSubscriber(self.URANI_ORDERBOOK_WS_URL,
+                                                    self.URANI_BATCHES_SUB_TOPIC,
+                                                    max_pending=self.MULDER_PIPELINE_DEPTH,
+                                                    config=self.config)
+        self.batch_subscriber.start()
+        return self.batch_subscriber
+
+    async def get_current_batch_ws(self) -> dict:
+        """
+        Retrieve the next batch published on the orderbook's batches topic.
+
+        The first call opens a persistent subscription to `URANI_BATCHES_SUB_TOPIC`,
+        which reconnects automatically and keeps pushing batches as they are
+        published. At most `MULDER_PIPELINE_DEPTH` batches are buffered.
+
+        While the subscription is down (for up to `MULDER_UPDATE_SECONDS`), the batch
+        is polled from the batches endpoint instead. Batches already received either
+        way are skipped.
+
+        Returns:
+            dict: The JSON data of the batch.
+        """
+        subscriber = self._get_batch_subscriber()
+        if subscriber.batches.empty() and not subscriber.connected.is_set():
+            try:
+                await asyncio.wait_for(subscriber.connected.wait(), self.MULDER_UPDATE_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+        if subscriber.batches.empty() and not subscriber.connected.is_set():
+            log_debug(f'{self.URANI_BATCHES_SUB_TOPIC} subscription is down, polling instead')
+            json_data = await self._get_batch_poller().get()
+            while not subscriber.remember(json_data):
+                json_data = await self._get_batch_poller().get()
+        else:
+            json_data = await subscriber.get()
+        log_info(f'\n🛹 {self.name} received a valid batch ...')
+        return json_data
+
+    async def fetch_batch(self) -> dict:
+        """
+        Wait for the next batch without blocking the event loop.
+
+        Batches come from the websocket subscription for WS/PUBSUB connections, 
+        and from the conditional HTTP poller otherwise.
+
+        Returns:
+            dict: The JSON data of the batch.
+        """
+        if self.MULDER_TYPE_OF_CONNECTION in ('ws', 'pubsub'):
+            return await self.get_current_batch_ws()
+        return await self.get_current_batch_http_async()
+
+    async def next_batch(self, batch_id: str) -> BatchData:
+        """
+        Wait for the next batch and parse it.
 
+        Over HTTP, the batch is streamed if `MULDER_STREAM_BATCHES` is set (see
+        `get_current_batch_http_stream`). Websocket messages arrive whole, and are parsed as such.
+
+        Args:
+            batch_id (str): The ID to use if the batch does not carry one.
+
+        Returns:
+            BatchData: The parsed batch.
+        """
+        if self.MULDER_STREAM_BATCHES and self.MULDER_TYPE_OF_CONNECTION not in ('ws', 'pubsub'):
+            batch = await self.get_current_batch_http_stream(batch_id)
+        else:
+            batch = self.prepare_batch(await self.fetch_batch(), batch_id)
+        if batch.quarantined:
+            log_info(f'🛹 {len(batch.quarantined)} malformed intent(s) quarantined in batch {batch.batch_id}')
+        return batch
 
     #####################################################
     #        Public methods: Publishing Solutions
@@ -163,22 +273,28 @@ class AgentBase:
         except:
             exit_with_error(f"Unable to post solutions to {url}")
     
-    async def post_solution_http_async(self, data) -> dict:
-        """Post the solution using HTTP asynchronously."""
-        
+    async def post_solution_http_async(self, batch: BatchData = None) -> dict:
+        """
+        Post the solutions of a batch using HTTP asynchronously.
+
+        Args:
+            batch (BatchData, optional): The batch whose solutions are posted.
+                                         Defaults to the agent's current batch.
+        """
+        batch = batch or self.batch
         url = self.URANI_ORDERBOOK_HTTPS_URL + self.URANI_SOLUTION_HTTP_ENDPOINT
         log_debug(f'Posting solution to {url} asynchronously')
-        solutions = self.batch.solutions_to_dict()
+        solutions = batch.solutions_to_dict()
         try: 
-            await post_async_request(url, data=solutions)
-        except:
+            return await post_async_request(url, data=solutions)
+        except Exception:
             exit_with_error(f"Unable to post solutions to {url}")
 
     #####################################################
     #        Public methods: Retrieving Batches
     #####################################################
 
-    def parse_batch(self) -> None:
+    async def parse_batch(self) -> None:
         """
         Parse the current batch based on the connection type (HTTP/WS).
 
@@ -187,13 +303,36 @@ class AgentBase:
         """
 
         if self.MULDER_TYPE_OF_CONNECTION == 'http':
-            this_batch = self.get_current_batch_http()
-        elif self.MULDER_TYPE_OF_CONNECTION == 'ws':
-            this_batch = self.get_current_batch_ws()
+            self.batch = self.prepare_batch(self.get_current_batch_http(), batch_id='1')
+        else:
+            self.batch = await self.next_batch(batch_id='1')
+
+    def prepare_batch(self, this_batch: dict, batch_id: str) -> BatchData:
+        """
+        Create the `BatchData` for a fetched batch and start its deadline.
+
+        Args:
+            this_batch (dict): The JSON data of the batch.
+            batch_id (str): The ID to use if the batch does not carry one.
 
-        self.batch.batch_id = '1'
-        self.batch.parse_intent_instance(this_batch)
+        Returns:
+            BatchData: The parsed batch.
+        """
+        batch = BatchData()
+        batch.batch_id = str(this_batch.get('batch_id', batch_id))
+        batch.set_deadline(self.MULDER_BATCH_DEADLINE_SECONDS, this_batch.get('deadline'))
+        batch.parse_intent_instance(this_batch)
+        return batch
     
+    async def close_feeds(self) -> None:
+        """Close any persistent batch subscription or poller opened by the agent."""
+        if self.batch_subscriber is not None:
+            await self.batch_subscriber.close()
+            self.batch_subscriber = None
+        if self.batch_poller is not None:
+            await self.batch_poller.close()
+            self.batch_poller = None
+
     async def solve_order(self):
         raise NotImplementedError("Subclasses should implement this method.")
     
@@ -209,7 +348,8 @@ class AgentBase:
 
         # Fetch orders from the Urani's Protocol
         log_info(f'🛹 Fetching current batch from {self.URANI_ORDERBOOK_HTTPS_URL+self.URANI_BATCHES_HTTP_ENDPOINT}\n')
-        self.parse_batch()
+        await self.parse_batch()
+        await self.close_feeds()
 
         # Agent Specific solution: implemented in child class
         await self.solve_order()
@@ -217,3 +357,92 @@ class AgentBase:
         # Post solutions to the Urani's Protocol
         log_info(f'🤙 Sending solutions to {self.URANI_ORDERBOOK_HTTPS_URL+self.URANI_SOLUTION_HTTP_ENDPOINT}')
         self.post_solution_http()
+        await self.close_clients()
+
+    async def close_clients(self) -> None:
+        """Close the pooled HTTP connections of the agent (to the orderbook, venues and oracles)."""
+        HTTP_CLIENTS.close()
+        await HTTP_CLIENTS.aclose()
+
+    #####################################################
+    #        Public methods: Daemon mode
+    #####################################################
+
+    async def run_daemon(self) -> None:
+        """
+        Long-running entry point for agents.
+
+        Fetching, solving and posting run as three concurrent pipeline stages
+        connected by bounded queues: while batch N is being solved, batch N+1
+        is fetched and the solutions of batch N-1 are posted. Throughput is then
+        bound by the slowest stage rather than by the sum of all of them, and
+        config and clients are set up only once.
+        """
+        log_info(f'🛹 {self.name} is running in daemon mode...')
+
+        to_solve = asyncio.Queue(maxsize=self.MULDER_PIPELINE_DEPTH)
+        to_post = asyncio.Queue(maxsize=self.MULDER_PIPELINE_DEPTH)
+
+        stages = [
+            asyncio.create_task(self._fetch_stage(to_solve)),
+            asyncio.create_task(self._solve_stage(to_solve, to_post)),
+            asyncio.create_task(self._post_stage(to_post)),
+        ]
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            await self.close_feeds()
+            await self.close_clients()
+            log_info(f'\n🛹 {self.name} daemon stopped after {self.batches_seen} batch(es)')
+
+    async def _fetch_stage(self, to_solve: asyncio.Queue) -> None:
+        """Pipeline stage: fetch new batches and queue them for solving."""
+
+        while True:
+            try:
+                batch = await self.next_batch(batch_id=str(self.batches_seen + 1))
+            except Exception as e:
+                log_error(f'Could not fetch batch: {e}')
+                await asyncio.sleep(self.MULDER_UPDATE_SECONDS)
+                continue
+
+            self.batches_seen += 1
+            log_info(f'\n🛹 {self.name} fetched batch {batch.batch_id} ({len(batch.intents)} intents)')
+
+            # Blocks while the solver is behind, which throttles fetching
+            await to_solve.put(batch)
+
+    async def _solve_stage(self, to_solve: asyncio.Queue, to_post: asyncio.Queue) -> None:
+        """Pipeline stage: solve queued batches and queue their solutions for posting."""
+
+        while True:
+            batch = await to_solve.get()
+            self.batch = batch
+            try:
+                await self.solve_order()
+            except Exception as e:
+                # A bad batch must not take the whole daemon down
+                log_error(f'Could not solve batch {batch.batch_id}, skipping it: {e}')
+                continue
+            finally:
+                to_solve.task_done()
+
+            await to_post.put(batch)
+
+    async def _post_stage(self, to_post: asyncio.Queue) -> None:
+        """Pipeline stage: post the solutions of solved batches."""
+
+        while True:
+            batch = await to_post.get()
+            try:
+                log_info(f'🤙 Sending {len(batch.solutions)} solution(s) of batch {batch.batch_id}')
+                response = await self.post_solution_http_async(batch)
+                if isinstance(response, dict) and 'error' in response:
+                    log_error(f'Could not post solutions of batch {batch.batch_id}: {response["error"]}')
+            except Exception as e:
+                log_error(f'Could not post solutions of batch {batch.batch_id}: {e}')
+            finally:
+                to_post.task_done()
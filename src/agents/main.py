@@ -25,7 +25,7 @@ def print_agents_list() -> None:
     log_info(' ' * len(info_string) + '- Aleph (v0.1 - Python)')
 
 
-def print_agent_info(agent_name: str, deploy: bool = False) -> None:
+def print_agent_info(agent_name: str, deploy: bool = False, config: dict = None) -> None:
     """
     Print information about a specific agent, optionally indicating if it's being deployed.
 
@@ -35,6 +35,7 @@ def print_agent_info(agent_name: str, deploy: bool = False) -> None:
     Args:
         agent_name (str): The name of the agent.
         deploy (bool, optional): If True, indicates that the agent is being deployed. Defaults to False.
+        config (dict, optional): Configuration dictionary. Loaded from the environment if not given.
 
     Raises:
         SystemExit: If the agent name is not recognized.
@@ -46,14 +47,14 @@ def print_agent_info(agent_name: str, deploy: bool = False) -> None:
 
     # Check if the requested agent is Aleph and print its info
     if agent_name.lower() == 'aleph':
-        Aleph.print_info()
+        Aleph.print_info(config)
     else:
         log_info(f"Agent '{agent_name}' not recognized.")
         print_agents_list()  # Print the available agents if the specified one is not found
         sys.exit(1)
 
 
-async def main(agent_name: str) -> None:
+async def main(agent_name: str, daemon: bool = False) -> None:
     """
     Main entry point for running the specified agent.
 
@@ -62,12 +63,14 @@ async def main(agent_name: str) -> None:
 
     Args:
         agent_name (str): The name of the agent to run.
+        daemon (bool, optional): If True, keep the agent solving batches in 
+                                 pipelined daemon mode. Defaults to False.
     """
     config = load_config()  # Load configuration settings
     log_info("Loading environment variables...\n")
     
     # Print information on the agent being deployed
-    print_agent_info(agent_name, deploy=True)
+    print_agent_info(agent_name, deploy=True, config=config)
 
     # Initialize the agent class based on the agent_name
     agent_class = AgentBase.initialize_agent(agent_name)
@@ -75,7 +78,10 @@ async def main(agent_name: str) -> None:
 
     # Run the agent
     log_info(f"🛹 Starting Agent {agent.name}...")
-    await agent.run()
+    if daemon:
+        await agent.run_daemon()
+    else:
+        await agent.run()
 
     log_info(f"\n🛹 Agent {agent.name} has finished\n")
 
@@ -84,7 +90,8 @@ if __name__ == "__main__":
     # Argument parser for the command line to specify the agent name
     parser = argparse.ArgumentParser(description="Run the agent.")
     parser.add_argument('agent_name', type=str, help='The name of the agent to run')
+    parser.add_argument('--daemon', action='store_true', help='Keep the agent running in daemon mode')
     args = parser.parse_args()
  
     # Run the main function with the provided agent name
-    asyncio.run(main(args.agent_name))
+    asyncio.run(main(args.agent_name, daemon=args.daemon))
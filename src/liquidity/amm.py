@@ -0,0 +1,370 @@
+# -*- encoding: utf-8 -*-
+# src/liquidity/amm.py
+# Offline simulator of AMM pools, quoting intents locally from cached pool states.
+
+import time
+import numpy as np
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from src.orders.intent import IntentData
+
+
+# Range of the ticks of concentrated-liquidity pools (as in Orca Whirlpools and Raydium CLMM)
+MIN_TICK = -443636
+MAX_TICK = 443636
+
+
+def tick_to_sqrt_price(tick) -> float:
+    """Return the square root of the price (token B per token A) at a tick, or at an array of ticks."""
+    return np.power(1.0001, np.asarray(tick, dtype=np.float64) / 2)
+
+
+class Pool:
+    """
+    Base class of the AMM pools, trading token A (`mint_a`) against token B (`mint_b`).
+
+    Output amounts are computed for whole arrays of input amounts at once, in float64:
+    they are exact to a unit for amounts and reserves below 2**53, which is enough to
+    rank venues and pre-screen intents, but the final quote is expected to be confirmed
+    by a venue.
+
+    Attributes:
+        address (str): The address of the pool account.
+        mint_a, mint_b (str): The mints of the tokens of the pool.
+        fee_bps (float): The swap fee, in basis points of the input amount.
+        slot (int): The slot of the pool state.
+        label (str): The name of the pool's AMM, for the route plan of the quotes.
+    """
+
+    def __init__(self, address: str, mint_a: str, mint_b: str, fee_bps: float = 0, slot: int = 0,
+                 label: str = '') -> None:
+        self.address = address
+        self.mint_a = mint_a
+        self.mint_b = mint_b
+        self.fee_bps = fee_bps
+        self.slot = slot
+        self.label = label
+
+    def a_to_b(self, input_mint: str) -> bool:
+        """
+        Tell whether swapping `input_mint` sells token A for token B.
+
+        Raises:
+            ValueError: If the mint is not traded by the pool.
+        """
+        if input_mint == self.mint_a:
+            return True
+        if input_mint == self.mint_b:
+            return False
+        raise ValueError(f'Pool {self.address} does not trade {input_mint}.')
+
+    def output_mint(self, input_mint: str) -> str:
+        """Return the mint received for `input_mint`."""
+        return self.mint_b if self.a_to_b(input_mint) else self.mint_a
+
+    def amounts_after_fee(self, amounts: np.ndarray) -> np.ndarray:
+        """Return the input amounts left to swap once the fee is taken."""
+        return np.asarray(amounts, dtype=np.float64) * (1 - self.fee_bps / 10_000)
+
+    def amounts_out(self, amounts: np.ndarray, input_mint: str) -> np.ndarray:
+        """
+        Compute the output amounts of swaps of `input_mint`, fee included.
+
+        Args:
+            amounts (np.ndarray): The input amounts, in base units.
+            input_mint (str): The mint sold.
+
+        Returns:
+            np.ndarray: The output amounts (float64, not rounded), NaN where the pool cannot fill the swap.
+        """
+        raise NotImplementedError
+
+    def spot_price(self, input_mint: str) -> float:
+        """Return the marginal price of `input_mint`, in output base units per input base unit, before fees."""
+        raise NotImplementedError
+
+
+class ConstantProductPool(Pool):
+    """
+    Constant-product pool (x * y = k), as Raydium AMM v4 or Orca legacy pools.
+
+    Attributes:
+        reserve_a, reserve_b (int): The reserves of token A and token B, in base units.
+    """
+
+    def __init__(self, address: str, mint_a: str, mint_b: str, reserve_a: int, reserve_b: int,
+                 fee_bps: float = 25, slot: int = 0, label: str = 'Constant product') -> None:
+        super().__init__(address, mint_a, mint_b, fee_bps, slot, label)
+        self.reserve_a = reserve_a
+        self.reserve_b = reserve_b
+
+    def _reserves(self, input_mint: str) -> Tuple[float, float]:
+        if self.a_to_b(input_mint):
+            return float(self.reserve_a), float(self.reserve_b)
+        return float(self.reserve_b), float(self.reserve_a)
+
+    def amounts_out(self, amounts: np.ndarray, input_mint: str) -> np.ndarray:
+        reserve_in, reserve_out = self._reserves(input_mint)
+        amounts = self.amounts_after_fee(amounts)
+        if reserve_in <= 0 or reserve_out <= 0:
+            return np.full(amounts.shape, np.nan)
+        return reserve_out * amounts / (reserve_in + amounts)
+
+    def spot_price(self, input_mint: str) -> float:
+        reserve_in, reserve_out = self._reserves(input_mint)
+        return reserve_out / reserve_in if reserve_in > 0 else 0.0
+
+
+class ConcentratedLiquidityPool(Pool):
+    """
+    Concentrated-liquidity pool, as Orca Whirlpools or Raydium CLMM.
+
+    The state is the square root of the current price (token B per token A), the active
+    liquidity, and the initialized ticks with their net liquidity, added when the price
+    crosses them upwards and removed when it crosses them downwards. A swap walks the
+    ranges between ticks, each behaving as a constant-product pool of the range's
+    liquidity: the amounts needed to cross each range are cumulated once per direction,
+    then `np.searchsorted` finds the range where each input amount ends.
+
+    Only the initialized ticks within `tick_range` are known (e.g., those of the tick
+    arrays loaded around the price), so swaps moving the price out of it cannot be filled.
+
+    Attributes:
+        sqrt_price (float): The square root of the current price.
+        liquidity (int): The active liquidity.
+        ticks (np.ndarray): The initialized ticks, ascending.
+        liquidity_nets (np.ndarray): The net liquidity of each tick.
+        tick_range (Tuple[int, int]): The lowest and highest ticks known.
+    """
+
+    def __init__(self, address: str, mint_a: str, mint_b: str, sqrt_price: float, liquidity: int,
+                 ticks: Sequence[int] = (), liquidity_nets: Sequence[int] = (), fee_bps: float = 30,
+                 slot: int = 0, label: str = 'Concentrated liquidity',
+                 tick_range: Tuple[int, int] = (MIN_TICK, MAX_TICK)) -> None:
+        super().__init__(address, mint_a, mint_b, fee_bps, slot, label)
+        self.sqrt_price = float(sqrt_price)
+        self.liquidity = liquidity
+        self.tick_range = tick_range
+
+        order = np.argsort(np.asarray(ticks, dtype=np.int64), kind='stable')
+        self.ticks = np.asarray(ticks, dtype=np.int64)[order]
+        self.liquidity_nets = np.asarray(liquidity_nets, dtype=np.float64)[order]
+
+        # Ranges crossed when selling token A (price going down), then token B (price going up)
+        self._ranges = {True: self._walk_down(), False: self._walk_up()}
+
+    ###########################
+    #     Private methods     #
+    ###########################
+
+    def _walk_down(self) -> Tuple[np.ndarray, ...]:
+        """Return the start, liquidity, cumulated input and output of the ranges below the price."""
+        bounds = tick_to_sqrt_price(self.ticks)
+        below = bounds <= self.sqrt_price
+        ends = np.append(bounds[below][::-1], min(tick_to_sqrt_price(self.tick_range[0]), self.sqrt_price))
+        starts = np.insert(ends[:-1], 0, self.sqrt_price)
+        # Crossing a tick downwards removes its net liquidity
+        liquidity = np.maximum(self.liquidity - np.insert(np.cumsum(self.liquidity_nets[below][::-1]), 0, 0), 0)
+
+        amounts_in = liquidity * (1 / ends - 1 / starts)
+        amounts_out = liquidity * (starts - ends)
+        return starts, liquidity, np.cumsum(amounts_in), np.cumsum(amounts_out)
+
+    def _walk_up(self) -> Tuple[np.ndarray, ...]:
+        """Return the start, liquidity, cumulated input and output of the ranges above the price."""
+        bounds = tick_to_sqrt_price(self.ticks)
+        above = bounds > self.sqrt_price
+        ends = np.append(bounds[above], max(tick_to_sqrt_price(self.tick_range[1]), self.sqrt_price))
+        starts = np.insert(ends[:-1], 0, self.sqrt_price)
+        # Crossing a tick upwards adds its net liquidity
+        liquidity = np.maximum(self.liquidity + np.insert(np.cumsum(self.liquidity_nets[above]), 0, 0), 0)
+
+        amounts_in = liquidity * (ends - starts)
+        amounts_out = liquidity * (1 / starts - 1 / ends)
+        return starts, liquidity, np.cumsum(amounts_in), np.cumsum(amounts_out)
+
+    ###############################
+    #     Public methods          #
+    ###############################
+
+    def amounts_out(self, amounts: np.ndarray, input_mint: str) -> np.ndarray:
+        a_to_b = self.a_to_b(input_mint)
+        starts, liquidity, cum_in, cum_out = self._ranges[a_to_b]
+        amounts = self.amounts_after_fee(amounts)
+
+        # Range where each swap ends, after crossing the previous ones entirely
+        index = np.searchsorted(cum_in, amounts, side='right')
+        unfilled = index >= len(cum_in)
+        index = np.minimum(index, len(cum_in) - 1)
+        crossed_in = np.where(index > 0, cum_in[index - 1], 0.0)
+        crossed_out = np.where(index > 0, cum_out[index - 1], 0.0)
+
+        start, range_liquidity, rest = starts[index], liquidity[index], amounts - crossed_in
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if a_to_b:
+                end = range_liquidity * start / (range_liquidity + rest * start)
+                out = crossed_out + range_liquidity * (start - end)
+            else:
+                end = start + rest / range_liquidity
+                out = crossed_out + range_liquidity * (1 / start - 1 / end)
+        return np.where(unfilled, np.nan, np.where(rest > 0, out, crossed_out))
+
+    def spot_price(self, input_mint: str) -> float:
+        price = self.sqrt_price ** 2
+        return price if self.a_to_b(input_mint) else 1 / price
+
+
+class AmmSimulator:
+    """
+    Local quoting engine, simulating swaps on cached AMM pool states.
+
+    Each intent is quoted on every pool trading its pair, keeping the largest output
+    amount, and returned in the format of the quotes of `JupiterWrapper` (see
+    `QuoteData`), so local quotes can stand in for remote ones. Routes are single-hop,
+    and local quotes are only as fresh as the pool states (see `contextSlot`): the quote
+    of an intent to be swapped is expected to be confirmed by a venue.
+
+    Attributes:
+        slippage_bps (int): The slippage tolerated, for the minimum output of the quotes.
+        pools (Dict[Tuple[str, str], List[Pool]]): The pools of each pair, by sorted mints.
+    """
+
+    def __init__(self, pools: Sequence[Pool] = (), slippage_bps: int = 50) -> None:
+        """
+        Initialize the AmmSimulator.
+
+        Args:
+            pools (Sequence[Pool], optional): The pools to quote on.
+            slippage_bps (int, optional): The slippage tolerated, in basis points.
+        """
+        self.slippage_bps = slippage_bps
+        self.pools: Dict[Tuple[str, str], List[Pool]] = {}
+        for pool in pools:
+            self.add_pool(pool)
+
+    ###########################
+    #     Private methods     #
+    ###########################
+
+    def _quote(self, pool: Pool, input_mint: str, amount: int, out: float, time_taken: float) -> Dict[str, Any]:
+        """Format the output of a swap on a pool as a quote."""
+        out_amount = int(out)
+        fee_amount = int(amount * pool.fee_bps / 10_000)
+        expected = (amount - fee_amount) * pool.spot_price(input_mint)
+        price_impact = max(1 - out_amount / expected, 0.0) if expected > 0 else 0.0
+        output_mint = pool.output_mint(input_mint)
+        return {
+            'inputMint': input_mint,
+            'inAmount': str(amount),
+            'outputMint': output_mint,
+            'outAmount': str(out_amount),
+            'otherAmountThreshold': str(out_amount * (10_000 - self.slippage_bps) // 10_000),
+            'swapMode': 'ExactIn',
+            'slippageBps': self.slippage_bps,
+            'platformFee': None,
+            'priceImpactPct': str(price_impact),
+            'routePlan': [{
+                'swapInfo': {
+                    'ammKey': pool.address,
+                    'label': pool.label,
+                    'inputMint': input_mint,
+                    'outputMint': output_mint,
+                    'inAmount': str(amount),
+                    'outAmount': str(out_amount),
+                    'feeAmount': str(fee_amount),
+                    'feeMint': input_mint,
+                },
+                'percent': 100,
+            }],
+            'contextSlot': pool.slot,
+            'timeTaken': time_taken,
+        }
+
+    ###############################
+    #     Public methods          #
+    ###############################
+
+    def add_pool(self, pool: Pool) -> None:
+        """Add a pool, or replace the pool with the same address."""
+        pools = self.pools.setdefault(tuple(sorted((pool.mint_a, pool.mint_b))), [])
+        pools[:] = [p for p in pools if p.address != pool.address] + [pool]
+
+    def pools_for(self, input_mint: str, output_mint: str) -> List[Pool]:
+        """Return the pools trading a pair."""
+        return self.pools.get(tuple(sorted((input_mint, output_mint))), [])
+
+    def amounts_out(self, input_mint: str, output_mint: str, amounts: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the best output amounts of swaps of a pair, over all its pools.
+
+        Args:
+            input_mint (str): The mint sold.
+            output_mint (str): The mint bought.
+            amounts (Sequence[int]): The input amounts, in base units.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The best output amounts (NaN where no pool can fill
+                the swap) and the index of the best pool in `pools_for` (-1 where there is none).
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        pools = self.pools_for(input_mint, output_mint)
+        if not pools:
+            return np.full(amounts.shape, np.nan), np.full(amounts.shape, -1)
+
+        outs = np.vstack([pool.amounts_out(amounts, input_mint) for pool in pools])
+        filled = ~np.isnan(outs)
+        best = np.argmax(np.where(filled, outs, -np.inf), axis=0)
+        columns = np.arange(len(amounts))
+        return (np.where(filled[best, columns], outs[best, columns], np.nan),
+                np.where(filled.any(axis=0), best, -1))
+
+    def quote(self, intent: IntentData) -> Dict[str, Any]:
+        """
+        Quote an intent on the cached pools.
+
+        Args:
+            intent (IntentData): The intent to quote.
+
+        Returns:
+            Dict[str, Any]: The quote of the best pool, in the format of `QuoteData`.
+
+        Raises:
+            ValueError: If no pool can fill the intent.
+        """
+        quote = self.quotes([intent])[0]
+        if quote is None:
+            raise ValueError(f'No cached pool can fill intent {intent.intent_id}.')
+        return quote
+
+    def quotes(self, intents: Sequence[IntentData]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Quote many intents at once, computing the output amounts of each pair in one pass.
+
+        Args:
+            intents (Sequence[IntentData]): The intents to quote.
+
+        Returns:
+            List[Optional[Dict[str, Any]]]: The quote of each intent, or None where no pool can fill it.
+        """
+        start = time.perf_counter()
+        pairs: Dict[Tuple[str, str], List[int]] = {}
+        for i, intent in enumerate(intents):
+            pairs.setdefault((intent.source_mint_address, intent.destination_mint_address), []).append(i)
+
+        results: List[Optional[tuple]] = [None] * len(intents)
+        for (input_mint, output_mint), rows in pairs.items():
+            amounts = [intents[i].source_amount for i in rows]
+            outs, best = self.amounts_out(input_mint, output_mint, amounts)
+            pools = self.pools_for(input_mint, output_mint)
+            for i, out, b in zip(rows, outs, best):
+                if b >= 0:
+                    results[i] = (pools[b], out)
+
+        time_taken = (time.perf_counter() - start) / max(len(intents), 1)
+        return [None if result is None else
+                self._quote(result[0], intent.source_mint_address, intent.source_amount, result[1], time_taken)
+                for intent, result in zip(intents, results)]
+
+    async def get_quote(self, intent: IntentData) -> Dict[str, Any]:
+        """Quote an intent like a venue does (see `LiquidityBase.get_quote`), so the simulator can be routed."""
+        return self.quote(intent)
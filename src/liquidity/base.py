@@ -2,13 +2,235 @@
 # src/liquidity/base.py
 # Base class for liquidity sources.
 
+import math
+import time
+import asyncio
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 from src.orders.intent import IntentData
 from src.utils.config import load_config
+from src.utils.clients import HTTP_CLIENTS
+from src.utils.breakers import LatencyWindow
 from src.utils.logging import log_debug
 from src.utils.network import get_async_request
 from src.sol.transactions import SolanaTransactions
 
 
+class QuoteCache:
+    """
+    LRU cache of venue quotes, keyed on the quote parameters.
+
+    A quote is served again for the same (input mint, output mint, amount, slippage)
+    until it is older than `ttl` seconds, or until its `contextSlot` falls more than
+    `max_slot_age` slots behind the current slot. The current slot is the latest
+    `contextSlot` seen in a fresh quote, unless a newer one is given with `observe_slot`.
+
+    With `bucket_bps`, amounts within about `bucket_bps` basis points of each other
+    share an entry, and the cached quote is rescaled linearly to the amount asked.
+    This trades the exactness of the quote (price impact is not linear) for hits.
+
+    Attributes:
+        hits (int): Quotes served from the cache.
+        misses (int): Quotes not found (or no longer valid) in the cache.
+        stale (int): Entries dropped because of their age or slot.
+        evictions (int): Entries dropped to stay within `max_entries`.
+        saved_seconds (float): Time the venue took to answer the quotes served from the cache.
+    """
+
+    def __init__(self, ttl: float = 2, max_entries: int = 4096, max_slot_age: int = 5,
+                 bucket_bps: float = 0) -> None:
+        """
+        Initialize the QuoteCache.
+
+        Args:
+            ttl (float, optional): Seconds a quote is served for. 0 disables the cache.
+            max_entries (int, optional): Maximum number of quotes kept.
+            max_slot_age (int, optional): Slots a quote may fall behind the current slot. 0 disables the check.
+            bucket_bps (float, optional): Width of the amount buckets, in basis points. 0 keeps amounts exact.
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_slot_age = max_slot_age
+        self.bucket = math.log1p(bucket_bps / 10_000) if bucket_bps > 0 else 0
+
+        self.entries: OrderedDict = OrderedDict()
+        self.current_slot = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    ###########################
+    #     Private methods     #
+    ###########################
+
+    def _expired(self, quote: Dict[str, Any], stored_at: float) -> bool:
+        """Whether a cached quote is too old, in time or in slots."""
+        if time.monotonic() - stored_at > self.ttl:
+            return True
+        slot = quote.get('contextSlot')
+        return bool(self.max_slot_age and slot is not None and self.current_slot - slot > self.max_slot_age)
+
+    @staticmethod
+    def _rescale(quote: Dict[str, Any], amount: int) -> Dict[str, Any]:
+        """Return a quote for another input amount, scaling its output amounts linearly."""
+        in_amount = int(quote['inAmount'])
+        if in_amount == amount:
+            return quote
+        scaled = dict(quote)
+        scaled['inAmount'] = str(amount)
+        for field in ('outAmount', 'otherAmountThreshold'):
+            scaled[field] = str(int(quote[field]) * amount // in_amount)
+        return scaled
+
+    ###############################
+    #     Public methods          #
+    ###############################
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def key(self, input_mint: str, output_mint: str, amount: int, slippage: Any) -> Tuple:
+        """Return the cache key of the quote parameters, bucketing the amount if set."""
+        if self.bucket and amount > 0:
+            amount = round(math.log(amount) / self.bucket)
+        return (input_mint, output_mint, amount, str(slippage))
+
+    def observe_slot(self, slot: int) -> None:
+        """Move the current slot forward, e.g., from the RPC or a fresh quote."""
+        if slot is not None and slot > self.current_slot:
+            self.current_slot = slot
+
+    def get(self, key: Tuple, amount: int) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached quote of a key, if still valid.
+
+        Args:
+            key (Tuple): The key of the quote parameters, see `key`.
+            amount (int): The input amount of the quote asked.
+
+        Returns:
+            dict: The quote (rescaled to `amount` when bucketing), or None.
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            quote, stored_at, latency = entry
+            if not self._expired(quote, stored_at):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += latency
+                return self._rescale(quote, amount)
+            del self.entries[key]
+            self.stale += 1
+        self.misses += 1
+        return None
+
+    def put(self, key: Tuple, quote: Dict[str, Any], latency: float) -> None:
+        """
+        Store a fresh quote, unless it is not a quote (e.g., an error from the venue).
+
+        Args:
+            key (Tuple): The key of the quote parameters, see `key`.
+            quote (Dict[str, Any]): The quote, as returned by the venue.
+            latency (float): Seconds the venue took to answer.
+        """
+        if not isinstance(quote, dict) or 'outAmount' not in quote or 'inAmount' not in quote:
+            return
+        self.observe_slot(quote.get('contextSlot'))
+        self.entries[key] = (quote, time.monotonic(), latency)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the metrics of the cache: hits, misses, hit rate, dropped entries and saved latency."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stale': self.stale,
+            'evictions': self.evictions,
+            'saved_seconds': self.saved_seconds,
+        }
+
+
+class HedgePolicy:
+    """
+    Adaptive delay after which a slow quote request is duplicated (hedged), within a budget.
+
+    The delay is the `percentile` of the latencies of the last `window` quotes, so only
+    the slowest quotes are hedged, whatever the usual latency of the venue. Hedging only
+    starts after `min_samples` quotes, and at most a `budget` fraction of the requests
+    are hedged, bounding the extra load on the venue.
+
+    Attributes:
+        requests (int): Quote requests sent, hedges excluded.
+        hedges (int): Duplicate requests sent.
+        hedge_wins (int): Hedges that answered before the request they duplicated.
+    """
+
+    def __init__(self, percentile: float = 95, budget: float = 0.05, window: int = 256,
+                 min_samples: int = 20) -> None:
+        """
+        Initialize the HedgePolicy.
+
+        Args:
+            percentile (float, optional): Percentile of the recent latencies after which to hedge. 0 disables hedging.
+            budget (float, optional): Maximum fraction of the requests that are hedged. 0 disables hedging.
+            window (int, optional): Number of recent latencies considered.
+            min_samples (int, optional): Number of latencies needed before hedging.
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.latencies = LatencyWindow(window)
+
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.percentile > 0 and self.budget > 0
+
+    def observe(self, latency: float) -> None:
+        """Record the latency of a quote."""
+        self.latencies.observe(latency)
+
+    def delay(self) -> Optional[float]:
+        """Return the seconds after which to hedge a request, or None not to hedge it."""
+        if not self.enabled or len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.percentile(self.percentile)
+
+    def spend(self) -> bool:
+        """Take a hedge from the budget, returning False if it is spent."""
+        if self.hedges + 1 > self.budget * self.requests:
+            return False
+        self.hedges += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the metrics of the hedges: requests, hedges, hedges won and the current delay."""
+        return {
+            'requests': self.requests,
+            'hedges': self.hedges,
+            'hedge_rate': self.hedges / self.requests if self.requests else 0.0,
+            'hedge_wins': self.hedge_wins,
+            'delay': self.delay(),
+        }
+
+
 class LiquidityBase:
     """
     Base class for all liquidity sources.
@@ -30,6 +252,7 @@ class LiquidityBase:
                                      the default configuration will be loaded.
         """
         self.config = config or load_config()
+        HTTP_CLIENTS.configure(self.config)
 
         self.VENUE_URL = None
         self.VENUE_QUOTE_ENDPOINT = None
@@ -42,6 +265,17 @@ class LiquidityBase:
         self.solana = SolanaTransactions(config=self.config, is_async=False)
         self._get_config_data()
 
+        self.quote_cache = QuoteCache(ttl=self.config['QUOTE_CACHE_TTL_SECONDS'],
+                                      max_entries=self.config['QUOTE_CACHE_MAX_ENTRIES'],
+                                      max_slot_age=self.config['QUOTE_CACHE_MAX_SLOT_AGE'],
+                                      bucket_bps=self.config['QUOTE_CACHE_BUCKET_BPS'])
+        self.hedge = HedgePolicy(percentile=self.config['QUOTE_HEDGE_PERCENTILE'],
+                                 budget=self.config['QUOTE_HEDGE_BUDGET'])
+
+        # Quote requests in flight, by URL, with the number of callers waiting for each
+        self.in_flight: Dict[str, list] = {}
+        self.coalesced = 0
+
         assert self.VENUE_URL is not None, \
                     'Please fill in venue URL in _get_config_data().'
         assert self.VENUE_QUOTE_ENDPOINT is not None, \
@@ -106,12 +340,32 @@ class LiquidityBase:
         """
         pass
 
+    def to_quote(self, reply: dict) -> dict:
+        """
+        Map the reply of the venue's quote endpoint into the format of `QuoteData`.
+
+        This method should be overridden by venues whose quote API does not answer in
+        that format (the format of the Jupiter API). A reply without a quote (e.g., an
+        error) is returned as it is.
+
+        Args:
+            reply (dict): The decoded reply of the quote endpoint.
+
+        Returns:
+            dict: The quote, in the format read by `QuoteData.from_dict`.
+        """
+        return reply
+
     async def get_quote(self, intent: IntentData) -> dict:
         """
         Retrieve the quote for the specified intent.
 
         This method creates a quote request using the provided intent and sends it to
-        the liquidity venue's quote endpoint.
+        the liquidity venue's quote endpoint, over the venue's pooled connections (see `HttpClients`).
+        Quotes for the same parameters are served from `quote_cache` while still fresh,
+        and concurrent requests for the same quote share a single request to the venue
+        (single-flight), counted in `coalesced`. A request slower than most recent quotes
+        is hedged with a duplicate request, the first answer winning (see `HedgePolicy`).
 
         Args:
             intent (IntentData): The intent data used to generate the quote.
@@ -119,6 +373,76 @@ class LiquidityBase:
         Returns:
             dict: The response data containing the quote.
         """
+        cache = self.quote_cache
+        if cache.enabled:
+            key = cache.key(intent.source_mint_address, intent.destination_mint_address,
+                            intent.source_amount, self.ACCEPTABLE_SLIPPAGE)
+            quote = cache.get(key, intent.source_amount)
+            if quote is not None:
+                log_debug(f'\nQuote for {intent.intent_id} served from cache')
+                return quote
+
         quote_url = self.get_quote_url(intent)
-        log_debug(f'\nCreating quote for {intent.intent_id} at {quote_url}...')
-        return await get_async_request(quote_url)
+        flight = self.in_flight.get(quote_url)
+        if flight is None:
+            log_debug(f'\nCreating quote for {intent.intent_id} at {quote_url}...')
+            task = asyncio.ensure_future(self._fetch_quote(quote_url, key if cache.enabled else None))
+            flight = self.in_flight[quote_url] = [task, 0]
+            task.add_done_callback(lambda _: self._land(quote_url, flight))
+        else:
+            log_debug(f'\nQuote for {intent.intent_id} joins the request in flight to {quote_url}')
+            self.coalesced += 1
+
+        # Callers share the request: one giving up (e.g., at the batch deadline) does not cancel
+        # it for the others, but the request is cancelled once nobody waits for it anymore
+        task = flight[0]
+        flight[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not task.done():
+                task.cancel()
+                self._land(quote_url, flight)
+
+    def _land(self, quote_url: str, flight: list) -> None:
+        """Forget a request in flight, unless a newer request for the same URL replaced it."""
+        if self.in_flight.get(quote_url) is flight:
+            del self.in_flight[quote_url]
+
+    async def _fetch_quote(self, quote_url: str, key: Optional[Tuple]) -> dict:
+        """Send a quote request to the venue, hedged if slow, caching the quote under `key` if given."""
+        start = time.monotonic()
+        self.hedge.requests += 1
+        tasks = [asyncio.ensure_future(get_async_request(quote_url))]
+        try:
+            delay = self.hedge.delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self.hedge.spend():
+                    log_debug(f'\nHedging the quote request to {quote_url} after {delay:.3f}s')
+                    tasks.append(asyncio.ensure_future(get_async_request(quote_url)))
+
+            # The first successful answer wins, unless every request fails
+            winner, pending = None, set(tasks)
+            while winner is None and pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in tasks:
+                    if task in done and task.exception() is None and winner is None:
+                        winner = task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if winner is None:
+            return done.pop().result()
+        if winner is not tasks[0]:
+            self.hedge.hedge_wins += 1
+
+        # The latency of the first request, at least the time waited for it if the hedge won
+        latency = time.monotonic() - start
+        self.hedge.observe(latency)
+        quote = self.to_quote(winner.result())
+        if key is not None:
+            self.quote_cache.put(key, quote, latency)
+        return quote
@@ -2,6 +2,7 @@
 # src/liquidity/jupiter.py
 # Wrapper for Jupiter liquidity source.
 
+from urllib.parse import urlencode
 from src.utils.network import craft_url
 from src.utils.logging import log_debug
 from src.liquidity.base import LiquidityBase
@@ -15,8 +16,15 @@ class JupiterWrapper(LiquidityBase):
     This class extends the LiquidityBase class to interact specifically with the
     Jupiter liquidity protocol. It provides methods for configuring the Jupiter
     endpoints, generating quote URLs, and formatting quote data.
+
+    Subclasses can quote another venue through a Jupiter quote API, by naming the
+    prefix of its configuration keys in `VENUE`, and its Jupiter AMM labels in
+    `DEXES` (see the `dexes` parameter of the quote API).
     """
 
+    VENUE = 'JUPITER'
+    DEXES = None
+
     def __init__(self, config=None) -> None:
         """
         Initialize the JupiterWrapper class.
@@ -38,9 +46,9 @@ class JupiterWrapper(LiquidityBase):
         This method overrides the base class implementation to populate the 
         configuration with Jupiter-specific URLs and parameters.
         """
-        self.VENUE_URL = self.config['JUPITER_HTTPS']
-        self.VENUE_SWAP_ENDPOINT = self.config['JUPITER_SWAP_ENDPOINT']
-        self.VENUE_QUOTE_ENDPOINT = self.config['JUPITER_QUOTE_ENDPOINT']
+        self.VENUE_URL = self.config[f'{self.VENUE}_HTTPS']
+        self.VENUE_SWAP_ENDPOINT = self.config[f'{self.VENUE}_SWAP_ENDPOINT']
+        self.VENUE_QUOTE_ENDPOINT = self.config[f'{self.VENUE}_QUOTE_ENDPOINT']
 
         self.SWAP_RETRIES = self.config['SWAP_RETRIES']
         self.SWAP_SLEEP_TIME = self.config['SWAP_SLEEP_TIME']
@@ -69,6 +77,8 @@ class JupiterWrapper(LiquidityBase):
                           '&outputMint=' + intent.destination_mint_address +
                           '&amount=' + str(intent.source_amount) +
                           '&slippageBps=' + self.ACCEPTABLE_SLIPPAGE)
+        if self.DEXES:
+            quote_endpoint += '&' + urlencode({'dexes': ','.join(self.DEXES)})
         log_debug(f'Quote endpoint: {quote_endpoint}')
         return craft_url(self.VENUE_URL, quote_endpoint)
 
@@ -0,0 +1,102 @@
+# -*- encoding: utf-8 -*-
+# src/liquidity/netting.py
+# Same-direction netting: intents selling the same token for the same token, routed as one swap.
+
+from dataclasses import replace
+from typing import Dict, List, Tuple
+from src.orders.intent import IntentData
+from src.orders.quote import QuoteData
+from src.orders.solution import SolutionData
+from src.p2p.partial_fill import split_pro_rata
+
+
+class NettedSwap:
+    """
+    Intents of the same direction (source and destination tokens), routed as a single swap.
+
+    The swap sells the total source amount of its intents, and must receive at least their
+    total minimum receive amount. A single quote is requested for the whole swap, and its
+    output is split back among the intents pro-rata to their source amounts.
+
+    Attributes:
+        intents (List[IntentData]): The netted intents.
+        intent (IntentData): The aggregate intent to quote.
+    """
+
+    def __init__(self, intents: List[IntentData]) -> None:
+        """
+        Initialize a NettedSwap of intents of the same direction.
+
+        Args:
+            intents (List[IntentData]): At least two intents, with the same source and destination tokens.
+        """
+        self.intents = intents
+        first = intents[0]
+        self.intent = replace(first,
+                              intent_id=f'net-{first.intent_id}-{len(intents)}',
+                              source_address='',
+                              destination_address='',
+                              source_amount=sum(intent.source_amount for intent in intents),
+                              min_receive_amount=sum(intent.min_receive_amount for intent in intents),
+                              partial_fill=False,
+                              expiration=min(intent.expiration for intent in intents))
+
+    def __len__(self) -> int:
+        return len(self.intents)
+
+    def split(self, quote: QuoteData) -> Tuple[List[SolutionData], List[IntentData]]:
+        """
+        Split the quote of the swap into a solution per intent.
+
+        Each intent receives the output of the swap pro-rata to its source amount (see
+        `split_pro_rata`), and shares the route plan of the swap. An intent whose share
+        falls short of its minimum receive amount is rejected, in which case no solution
+        is returned: without it, the swap sells less and must be quoted again.
+
+        Args:
+            quote (QuoteData): The quote of the aggregate intent.
+
+        Returns:
+            Tuple[List[SolutionData], List[IntentData]]: The solutions, and the rejected intents.
+
+        Raises:
+            ValueError: If the quote's mints do not match the swap.
+        """
+        if (quote.input_token_id != self.intent.source_token_id
+                or quote.output_token_id != self.intent.destination_token_id):
+            raise ValueError(f"Quote's mints do not match the netted swap {self.intent.intent_id}.")
+
+        shares = split_pro_rata(int(quote.out_amount), [intent.source_amount for intent in self.intents])
+        rejected = [intent for intent, share in zip(self.intents, shares) if share < intent.min_receive_amount]
+        if rejected:
+            return [], rejected
+
+        solutions = []
+        for intent, share in zip(self.intents, shares):
+            solution = SolutionData.from_fill(intent, intent.source_amount, share)
+            solution.route_plan = quote.route_plan or {}
+            solutions.append(solution)
+        return solutions, []
+
+
+def net_intents(intents: List[IntentData]) -> Tuple[List[NettedSwap], List[IntentData]]:
+    """
+    Group intents by direction, netting the directions shared by several intents.
+
+    Args:
+        intents (List[IntentData]): The intents to route.
+
+    Returns:
+        Tuple[List[NettedSwap], List[IntentData]]: The netted swaps, and the intents left alone in their direction.
+    """
+    directions: Dict[Tuple[int, int], List[IntentData]] = {}
+    for intent in intents:
+        directions.setdefault((intent.source_token_id, intent.destination_token_id), []).append(intent)
+
+    swaps, singles = [], []
+    for group in directions.values():
+        if len(group) > 1:
+            swaps.append(NettedSwap(group))
+        else:
+            singles.extend(group)
+    return swaps, singles
@@ -0,0 +1,375 @@
+# -*- encoding: utf-8 -*-
+# src/liquidity/pools.py
+# Store of AMM pool states, loaded from the Solana RPC and kept fresh by account subscriptions.
+
+import base64
+import struct
+import asyncio
+import base58
+import numpy as np
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from src.liquidity.amm import AmmSimulator, ConcentratedLiquidityPool, ConstantProductPool, Pool
+from src.utils.logging import log_debug, log_error
+from src.utils.network import post_async_request, ws_reloop, ws_subscribe
+
+
+# Accounts per getMultipleAccounts request, the limit of the Solana RPC
+MAX_ACCOUNTS_PER_REQUEST = 100
+
+# Ticks per tick array of a Whirlpool
+TICK_ARRAY_SIZE = 88
+
+# An initialized flag, the net liquidity (i128, as its low and high 64 bits) and the
+# gross liquidity, fee and reward growths, which quotes do not need
+TICK_DTYPE = np.dtype([('initialized', 'u1'), ('net_low', '<u8'), ('net_high', '<i8'), ('rest', 'V96')])
+
+
+class TokenAccountState:
+    """Balance of an SPL token account (e.g., the vault of a pool), at a slot."""
+
+    __slots__ = ('mint', 'amount', 'slot')
+
+    def __init__(self, mint: str, amount: int, slot: int) -> None:
+        self.mint = mint
+        self.amount = amount
+        self.slot = slot
+
+
+class WhirlpoolState:
+    """Price, liquidity and fee of an Orca Whirlpool, at a slot."""
+
+    __slots__ = ('mint_a', 'mint_b', 'sqrt_price', 'liquidity', 'tick', 'tick_spacing', 'fee_bps', 'slot')
+
+    def __init__(self, mint_a: str, mint_b: str, sqrt_price: float, liquidity: int, tick: int,
+                 tick_spacing: int, fee_bps: float, slot: int) -> None:
+        self.mint_a = mint_a
+        self.mint_b = mint_b
+        self.sqrt_price = sqrt_price
+        self.liquidity = liquidity
+        self.tick = tick
+        self.tick_spacing = tick_spacing
+        self.fee_bps = fee_bps
+        self.slot = slot
+
+
+class TickArrayState:
+    """Initialized ticks of a Whirlpool tick array, by offset from its start tick, at a slot."""
+
+    __slots__ = ('start_tick', 'offsets', 'liquidity_nets', 'slot')
+
+    def __init__(self, start_tick: int, offsets: np.ndarray, liquidity_nets: np.ndarray, slot: int) -> None:
+        self.start_tick = start_tick
+        self.offsets = offsets
+        self.liquidity_nets = liquidity_nets
+        self.slot = slot
+
+
+def decode_token_account(data: bytes, slot: int) -> TokenAccountState:
+    """Decode an SPL token account: its mint (bytes 0-32) and amount (u64 at 64)."""
+    return TokenAccountState(base58.b58encode(data[0:32]).decode(), struct.unpack_from('<Q', data, 64)[0], slot)
+
+
+def decode_whirlpool(data: bytes, slot: int) -> WhirlpoolState:
+    """
+    Decode a Whirlpool account.
+
+    Its fee rate is in hundredths of a basis point, and the square root of its price a Q64.64 number.
+    """
+    tick_spacing, = struct.unpack_from('<H', data, 41)
+    fee_rate, = struct.unpack_from('<H', data, 45)
+    tick, = struct.unpack_from('<i', data, 81)
+    return WhirlpoolState(
+        mint_a=base58.b58encode(data[101:133]).decode(),
+        mint_b=base58.b58encode(data[181:213]).decode(),
+        sqrt_price=int.from_bytes(data[65:81], 'little') / 2**64,
+        liquidity=int.from_bytes(data[49:65], 'little'),
+        tick=tick,
+        tick_spacing=tick_spacing,
+        fee_bps=fee_rate / 100,
+        slot=slot,
+    )
+
+
+def decode_tick_array(data: bytes, slot: int) -> TickArrayState:
+    """Decode a Whirlpool tick array, keeping its initialized ticks only."""
+    start_tick, = struct.unpack_from('<i', data, 8)
+    ticks = np.frombuffer(data, dtype=TICK_DTYPE, count=TICK_ARRAY_SIZE, offset=12)
+    offsets = np.flatnonzero(ticks['initialized'])
+    liquidity_nets = ticks['net_high'][offsets] * 2.0**64 + ticks['net_low'][offsets]
+    return TickArrayState(start_tick, offsets, liquidity_nets, slot)
+
+
+class PoolStore:
+    """
+    In-memory snapshot of the accounts of AMM pools, feeding an `AmmSimulator`.
+
+    Accounts are loaded in bulk with `getMultipleAccounts`, then kept fresh by one
+    `accountSubscribe` per account, all on one websocket (reconnected by `ws_reloop`).
+    Once the subscriptions are confirmed, the accounts are loaded again, so updates
+    missed before subscribing, or while reconnecting, are caught up.
+
+    Each account is decoded into a compact state stamped with its slot, and updates
+    older than the state in hand are dropped. The pools of an updated account are
+    rebuilt into the simulator, at the slot of their latest account: accounts that
+    were not notified did not change.
+
+    Attributes:
+        rpc_url (str): The HTTP URL of the Solana RPC.
+        ws_url (str): The websocket URL of the Solana RPC.
+        simulator (AmmSimulator): The simulator quoting on the pools.
+        accounts (Dict[str, Any]): The state of each account, by address.
+        slot (int): The latest slot of the states.
+    """
+
+    def __init__(self, rpc_url: str, ws_url: str, simulator: AmmSimulator = None, commitment: str = 'confirmed',
+                 config: dict = None) -> None:
+        """
+        Initialize the PoolStore, without pools.
+
+        Args:
+            rpc_url (str): The HTTP URL of the Solana RPC.
+            ws_url (str): The websocket URL of the Solana RPC.
+            simulator (AmmSimulator, optional): The simulator to feed. Defaults to a new one.
+            commitment (str, optional): The commitment of the account states.
+            config (dict, optional): Configuration dictionary with the websocket settings.
+        """
+        self.rpc_url = rpc_url
+        self.ws_url = ws_url
+        self.simulator = simulator or AmmSimulator()
+        self.commitment = commitment
+        self.config = config
+
+        self.accounts: Dict[str, Any] = {}
+        self.slot = 0
+
+        # How to decode each account, and the pools built from it
+        self.decoders: Dict[str, Callable[[bytes, int], Any]] = {}
+        self.watchers: Dict[str, List[str]] = {}
+        self.builders: Dict[str, Callable[[], Optional[Pool]]] = {}
+
+        # Account of each subscription request and subscription of the current connection
+        self.requests: Dict[int, str] = {}
+        self.subscriptions: Dict[int, str] = {}
+        self.task = None
+        self.reload = None
+
+        self.updates = 0
+        self.stale = 0
+        self.errors = 0
+        self.connections = 0
+
+    ###########################
+    #     Private methods     #
+    ###########################
+
+    def _watch(self, pool: str, accounts: Dict[str, Callable[[bytes, int], Any]],
+               builder: Callable[[], Optional[Pool]]) -> None:
+        """Watch the accounts of a pool, built by `builder` once they are all loaded."""
+        for account, decoder in accounts.items():
+            self.decoders[account] = decoder
+            self.watchers.setdefault(account, [])
+            if pool not in self.watchers[account]:
+                self.watchers[account].append(pool)
+        self.builders[pool] = builder
+
+    def _build_constant_product(self, address: str, vault_a: str, vault_b: str, fee_bps: float,
+                                label: str) -> Optional[Pool]:
+        a, b = self.accounts.get(vault_a), self.accounts.get(vault_b)
+        if a is None or b is None:
+            return None
+        return ConstantProductPool(address, a.mint, b.mint, a.amount, b.amount, fee_bps=fee_bps,
+                                   slot=max(a.slot, b.slot), label=label)
+
+    def _build_whirlpool(self, address: str, tick_arrays: Sequence[str]) -> Optional[Pool]:
+        pool = self.accounts.get(address)
+        arrays = [self.accounts.get(account) for account in tick_arrays]
+        if pool is None or any(array is None for array in arrays):
+            return None
+
+        span = TICK_ARRAY_SIZE * pool.tick_spacing
+        ticks = [array.start_tick + array.offsets * pool.tick_spacing for array in arrays]
+        nets = [array.liquidity_nets for array in arrays]
+        tick_range = (min(array.start_tick for array in arrays), max(array.start_tick for array in arrays) + span) \
+            if arrays else (pool.tick, pool.tick)
+        return ConcentratedLiquidityPool(
+            address, pool.mint_a, pool.mint_b, pool.sqrt_price, pool.liquidity,
+            np.concatenate(ticks) if ticks else (), np.concatenate(nets) if nets else (),
+            fee_bps=pool.fee_bps, slot=max([pool.slot] + [array.slot for array in arrays]),
+            label='Whirlpool', tick_range=tick_range)
+
+    async def _on_message(self, message: dict) -> None:
+        """Record the subscription of a response, or apply the account update of a notification."""
+        if message.get('id') in self.requests:
+            if 'error' in message:
+                log_error(f'Could not subscribe to {self.requests[message["id"]]}: {message["error"]}')
+                return
+            self.subscriptions[message['result']] = self.requests[message['id']]
+            if len(self.subscriptions) == len(self.requests):
+                log_debug(f'Subscribed to {len(self.subscriptions)} pool account(s), reloading them')
+                # A reload of an earlier connection is superseded by this one
+                if self.reload is not None and not self.reload.done():
+                    self.reload.cancel()
+                self.reload = asyncio.ensure_future(self.load())
+            return
+
+        if message.get('method') != 'accountNotification':
+            log_debug(f'Ignoring message from {self.ws_url}: {message}')
+            return
+        params = message['params']
+        account = self.subscriptions.get(params['subscription'])
+        if account is None:
+            log_debug(f'Ignoring notification of unknown subscription {params["subscription"]}')
+            return
+        self.update(account, params['result']['value'], params['result']['context']['slot'])
+
+    async def _stream(self) -> None:
+        """Open one connection, subscribing to every account."""
+        self.connections += 1
+        self.subscriptions = {}
+        self.requests = {i: account for i, account in enumerate(self.decoders, 1)}
+        subscription_requests = [
+            {'jsonrpc': '2.0', 'id': i, 'method': 'accountSubscribe',
+             'params': [account, {'encoding': 'base64', 'commitment': self.commitment}]}
+            for i, account in self.requests.items()]
+        log_debug(f'Subscribing to {len(subscription_requests)} pool account(s) at {self.ws_url}')
+        await ws_subscribe(self.ws_url, subscription_requests, self._on_message, config=self.config)
+
+    ###############################
+    #     Public methods          #
+    ###############################
+
+    def watch_constant_product(self, address: str, vault_a: str, vault_b: str, fee_bps: float = 25,
+                               label: str = 'Constant product') -> None:
+        """
+        Watch a constant-product pool whose reserves are the balances of its vaults.
+
+        Args:
+            address (str): The address of the pool.
+            vault_a, vault_b (str): The token accounts holding its reserves.
+            fee_bps (float, optional): The swap fee, in basis points.
+            label (str, optional): The name of the pool's AMM.
+        """
+        self._watch(address, {vault_a: decode_token_account, vault_b: decode_token_account},
+                    lambda: self._build_constant_product(address, vault_a, vault_b, fee_bps, label))
+
+    def watch_whirlpool(self, address: str, tick_arrays: Sequence[str] = ()) -> None:
+        """
+        Watch an Orca Whirlpool.
+
+        Args:
+            address (str): The address of the Whirlpool.
+            tick_arrays (Sequence[str], optional): Contiguous tick arrays around its price. Swaps moving
+                the price beyond them cannot be quoted.
+        """
+        tick_arrays = tuple(tick_arrays)
+        self._watch(address, {address: decode_whirlpool, **{account: decode_tick_array for account in tick_arrays}},
+                    lambda: self._build_whirlpool(address, tick_arrays))
+
+    def watch_pools(self, pools: Sequence[Sequence[str]]) -> None:
+        """
+        Watch the pools of `ROUTING_POOLS`.
+
+        Args:
+            pools (Sequence[Sequence[str]]): Each pool, as its kind followed by its accounts:
+                `whirlpool, <address>[, <tick array>...]` or
+                `constant_product, <address>, <vault a>, <vault b>[, <fee bps>]`.
+
+        Raises:
+            ValueError: If a pool is of an unknown kind, or misses accounts.
+        """
+        for kind, *accounts in pools:
+            if kind == 'whirlpool' and len(accounts) >= 1:
+                self.watch_whirlpool(accounts[0], accounts[1:])
+            elif kind == 'constant_product' and len(accounts) in (3, 4):
+                self.watch_constant_product(*accounts[:3], *(float(fee) for fee in accounts[3:]))
+            else:
+                raise ValueError(f'Invalid pool {":".join([kind, *accounts])} in ROUTING_POOLS, please give '
+                                 f'whirlpool:<address>[:<tick array>...] or '
+                                 f'constant_product:<address>:<vault a>:<vault b>[:<fee bps>].')
+
+    def update(self, account: str, value: Optional[dict], slot: int) -> bool:
+        """
+        Apply the state of an account at a slot, rebuilding its pools.
+
+        Args:
+            account (str): The address of the account.
+            value (dict): The account, as returned by the RPC, with base64 data.
+            slot (int): The slot of the state.
+
+        Returns:
+            bool: Whether the state was applied (i.e., it was valid and not older than the state in hand).
+        """
+        current = self.accounts.get(account)
+        if current is not None and current.slot > slot:
+            self.stale += 1
+            return False
+        try:
+            state = self.decoders[account](base64.b64decode(value['data'][0]), slot)
+        except Exception as e:
+            self.errors += 1
+            log_error(f'Could not decode pool account {account} at slot {slot}: {e}')
+            return False
+
+        self.accounts[account] = state
+        self.slot = max(self.slot, slot)
+        self.updates += 1
+        for pool in self.watchers[account]:
+            built = self.builders[pool]()
+            if built is not None:
+                self.simulator.add_pool(built)
+        return True
+
+    async def load(self) -> int:
+        """
+        Load every watched account with `getMultipleAccounts`.
+
+        Returns:
+            int: The number of account states applied.
+        """
+        accounts, applied = list(self.decoders), 0
+        for start in range(0, len(accounts), MAX_ACCOUNTS_PER_REQUEST):
+            chunk = accounts[start:start + MAX_ACCOUNTS_PER_REQUEST]
+            response = await post_async_request(self.rpc_url, {
+                'jsonrpc': '2.0', 'id': 1, 'method': 'getMultipleAccounts',
+                'params': [chunk, {'encoding': 'base64', 'commitment': self.commitment}]})
+            if 'error' in response:
+                log_error(f'Could not load pool accounts from {self.rpc_url}: {response["error"]}')
+                continue
+
+            slot = response['result']['context']['slot']
+            for account, value in zip(chunk, response['result']['value']):
+                if value is None:
+                    log_error(f'Pool account {account} does not exist.')
+                    continue
+                applied += self.update(account, value, slot)
+        return applied
+
+    def pools(self) -> List[Pool]:
+        """Return the pools whose accounts are all loaded."""
+        return [pool for pool in (build() for build in self.builders.values()) if pool is not None]
+
+    def start(self) -> None:
+        """Start the background subscription if it is not running yet."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(ws_reloop(self._stream, 'pools', config=self.config))
+
+    async def close(self) -> None:
+        """Cancel the background subscription."""
+        for task in (self.task, self.reload):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self.task = self.reload = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the metrics of the store: accounts, pools, latest slot, updates applied and dropped, connections."""
+        return {
+            'accounts': len(self.accounts),
+            'pools': len(self.pools()),
+            'slot': self.slot,
+            'updates': self.updates,
+            'stale': self.stale,
+            'errors': self.errors,
+            'connections': self.connections,
+        }
@@ -0,0 +1,123 @@
+# -*- encoding: utf-8 -*-
+# src/liquidity/raydium.py
+# Wrapper for Raydium liquidity source.
+
+from src.utils.network import craft_url
+from src.utils.logging import log_debug
+from src.liquidity.base import LiquidityBase
+from src.orders.intent import IntentData
+
+
+class RaydiumWrapper(LiquidityBase):
+    """
+    Wrapper for the Raydium liquidity source.
+
+    This class extends the LiquidityBase class to quote Raydium's pools through
+    its Trade API (e.g., `compute/swap-base-in` at https://transaction-v1.raydium.io/),
+    mapping its replies into the format of `QuoteData`.
+    """
+
+    def __init__(self, config=None) -> None:
+        """
+        Initialize the RaydiumWrapper class.
+
+        Args:
+            config (dict, optional): Configuration dictionary. If not provided,
+                                     the default configuration will be loaded.
+        """
+        super().__init__(config)
+
+    ###################################################
+    #           Private methods for Config
+    ###################################################
+
+    def _get_config_data(self) -> None:
+        """
+        Set the configuration data specific to the Raydium liquidity source.
+
+        This method overrides the base class implementation to populate the 
+        configuration with Raydium-specific URLs and parameters.
+        """
+        self.VENUE_URL = self.config['RAYDIUM_HTTPS']
+        self.VENUE_SWAP_ENDPOINT = self.config['RAYDIUM_SWAP_ENDPOINT']
+        self.VENUE_QUOTE_ENDPOINT = self.config['RAYDIUM_QUOTE_ENDPOINT']
+
+        self.SWAP_RETRIES = self.config['SWAP_RETRIES']
+        self.SWAP_SLEEP_TIME = self.config['SWAP_SLEEP_TIME']
+        self.ACCEPTABLE_SLIPPAGE = self.config['ACCEPTABLE_SLIPPAGE']
+
+    ###################################################
+    #        Private methods for Quotes
+    ###################################################
+
+    def get_quote_url(self, intent: IntentData) -> str:
+        """
+        Construct the URL for retrieving a quote from Raydium.
+
+        Args:
+            intent (IntentData): The intent data containing the necessary
+                                 information to build the quote URL.
+
+        Returns:
+            str: The fully constructed URL for the quote request.
+        """
+        quote_endpoint = (self.VENUE_QUOTE_ENDPOINT +
+                          '?inputMint=' + intent.source_mint_address +
+                          '&outputMint=' + intent.destination_mint_address +
+                          '&amount=' + str(intent.source_amount) +
+                          '&slippageBps=' + self.ACCEPTABLE_SLIPPAGE +
+                          '&txVersion=V0')
+        log_debug(f'Quote endpoint: {quote_endpoint}')
+        return craft_url(self.VENUE_URL, quote_endpoint)
+
+    def to_quote(self, reply: dict) -> dict:
+        """
+        Map a reply of Raydium's `compute/swap-base-in` endpoint into the format of `QuoteData`.
+
+        Raydium does not tell the slot of its quotes, and the whole reply is kept
+        in `swapResponse`, as Raydium's swap endpoint expects it.
+
+        Args:
+            reply (dict): The decoded reply, e.g., {'success': True, 'data': {'inputAmount': ..., ...}}.
+
+        Returns:
+            dict: The quote, or the reply as it is if it has no quote.
+        """
+        if not isinstance(reply, dict) or not reply.get('success') or not reply.get('data'):
+            return reply
+        data = reply['data']
+        return {
+            'inputMint': data['inputMint'],
+            'inAmount': str(data['inputAmount']),
+            'outputMint': data['outputMint'],
+            'outAmount': str(data['outputAmount']),
+            'otherAmountThreshold': str(data['otherAmountThreshold']),
+            'swapMode': 'ExactIn',
+            'slippageBps': data['slippageBps'],
+            'platformFee': None,
+            'priceImpactPct': str(data['priceImpactPct']),
+            'routePlan': data['routePlan'],
+            'contextSlot': None,
+            'timeTaken': None,
+            'swapResponse': reply,
+        }
+
+    def get_quote_data(self, quote: dict) -> dict:
+        """
+        Prepare the data for a swap POST request to Raydium.
+
+        Args:
+            quote (dict): The quote, as returned by `to_quote`.
+
+        Returns:
+            dict: The formatted data ready to be sent in the POST request.
+        """
+        this_data = {
+            "computeUnitPriceMicroLamports": str(self.config.get('COMPUTER_UNIT_PRICE')),
+            "swapResponse": quote['swapResponse'],
+            "txVersion": "V0",
+            "wallet": str(self.solana.pubkey),
+            "wrapSol": True,
+            "unwrapSol": True,
+        }
+        return this_data
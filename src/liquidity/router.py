@@ -0,0 +1,163 @@
+# -*- encoding: utf-8 -*-
+# src/liquidity/router.py
+# Router quoting an intent on several liquidity venues at once, keeping the best quote.
+
+import time
+import asyncio
+
+from typing import Any, Dict, Optional
+from src.liquidity.base import LiquidityBase
+from src.orders.intent import IntentData
+from src.utils.logging import log_debug
+
+
+class VenueStats:
+    """
+    Metrics of the quotes of a venue.
+
+    Attributes:
+        requests (int): Quotes asked to the venue.
+        quotes (int): Quotes received.
+        errors (int): Requests that failed, or were answered without a quote.
+        late (int): Requests abandoned, the router having stopped waiting for them.
+        wins (int): Quotes that were the best of their intent.
+        latency (float): Total seconds taken by the quotes received.
+        max_latency (float): Seconds taken by the slowest quote received.
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.quotes = 0
+        self.errors = 0
+        self.late = 0
+        self.wins = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+
+    def record(self, latency: float) -> None:
+        """Record a quote received after `latency` seconds."""
+        self.quotes += 1
+        self.latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    def stats(self, routed: int) -> Dict[str, Any]:
+        """Return the metrics of the venue, its win rate being over the `routed` intents."""
+        return {
+            'requests': self.requests,
+            'quotes': self.quotes,
+            'errors': self.errors,
+            'late': self.late,
+            'wins': self.wins,
+            'win_rate': self.wins / routed if routed else 0.0,
+            'mean_latency': self.latency / self.quotes if self.quotes else 0.0,
+            'max_latency': self.max_latency,
+        }
+
+
+class QuoteRouter:
+    """
+    Router sending each quote to all the enabled venues concurrently, for best execution.
+
+    The router waits for the quotes of `quorum` venues, or until `timeout` seconds have
+    passed with at least one quote in hand, whichever comes first, then keeps the quote
+    with the largest output amount. Requests still pending are cancelled (a venue's request
+    shared with other callers carries on, see `LiquidityBase.get_quote`).
+
+    The router quotes like a single venue (`get_quote`), so it can stand in for one.
+
+    Attributes:
+        venues (Dict[str, LiquidityBase]): The venues, by name.
+        quorum (int): Number of quotes after which to stop waiting.
+        timeout (float): Seconds after which to stop waiting, once a quote is in hand (None to wait for the quorum).
+        venue_stats (Dict[str, VenueStats]): The metrics of each venue.
+        routed (int): Intents quoted by at least one venue.
+    """
+
+    def __init__(self, venues: Dict[str, LiquidityBase], quorum: int = 0, timeout: Optional[float] = None) -> None:
+        """
+        Initialize the QuoteRouter.
+
+        Args:
+            venues (Dict[str, LiquidityBase]): The venues, by name.
+            quorum (int, optional): Number of quotes after which to stop waiting. Defaults to 0, i.e. all venues.
+            timeout (float, optional): Seconds after which to stop waiting, once a quote is in hand.
+        """
+        self.venues = venues
+        self.quorum = min(quorum, len(venues)) if quorum > 0 else len(venues)
+        self.timeout = timeout
+        self.venue_stats = {name: VenueStats() for name in venues}
+        self.routed = 0
+
+    ###########################
+    #     Private methods     #
+    ###########################
+
+    async def _quote(self, name: str, intent: IntentData) -> Optional[dict]:
+        """Quote an intent on a venue, returning None if the venue has no quote for it."""
+        stats = self.venue_stats[name]
+        stats.requests += 1
+        start = time.monotonic()
+        try:
+            quote = await self.venues[name].get_quote(intent)
+        except Exception as e:
+            stats.errors += 1
+            log_debug(f'  {name} failed to quote intent {intent.intent_id}: {e}')
+            return None
+
+        if not isinstance(quote, dict) or 'outAmount' not in quote:
+            stats.errors += 1
+            log_debug(f'  {name} has no quote for intent {intent.intent_id}: {quote}')
+            return None
+        stats.record(time.monotonic() - start)
+        return quote
+
+    ###############################
+    #     Public methods          #
+    ###############################
+
+    async def get_quote(self, intent: IntentData) -> dict:
+        """
+        Retrieve the best quote of the venues for an intent.
+
+        Args:
+            intent (IntentData): The intent to quote.
+
+        Returns:
+            dict: The quote with the largest output amount.
+
+        Raises:
+            ValueError: If no venue quoted the intent.
+        """
+        start = time.monotonic()
+        tasks = {asyncio.ensure_future(self._quote(name, intent)): name for name in self.venues}
+        pending = set(tasks)
+        quotes = {}
+        try:
+            while pending and len(quotes) < self.quorum:
+                timeout = None
+                if quotes and self.timeout is not None:
+                    timeout = max(self.timeout - (time.monotonic() - start), 0)
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.result() is not None:
+                        quotes[tasks[task]] = task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+                self.venue_stats[tasks[task]].late += 1
+
+        if not quotes:
+            raise ValueError(f'No venue quoted intent {intent.intent_id}.')
+
+        # Venues are listed by preference, which breaks ties
+        best = max((name for name in self.venues if name in quotes), key=lambda name: int(quotes[name]['outAmount']))
+        self.venue_stats[best].wins += 1
+        self.routed += 1
+        log_debug(f'  Best quote for intent {intent.intent_id} from {best}, out of {len(quotes)} venue(s)')
+        return quotes[best]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the metrics of each venue: quotes, errors, late requests, win rate and latency."""
+        return {name: stats.stats(self.routed) for name, stats in self.venue_stats.items()}
@@ -0,0 +1,70 @@
+# -*- encoding: utf-8 -*-
+# src/liquidity/venues.py
+# Registry of the liquidity venues the router can quote.
+
+from src.liquidity.base import LiquidityBase
+from src.liquidity.jupiter import JupiterWrapper
+from src.liquidity.raydium import RaydiumWrapper
+
+
+class OrcaWrapper(JupiterWrapper):
+    """Orca's Whirlpools, quoted through a Jupiter quote API restricted to them."""
+
+    VENUE = 'ORCA'
+    DEXES = ('Whirlpool',)
+
+
+class MeteoraWrapper(JupiterWrapper):
+    """Meteora's DLMM and dynamic pools, quoted through a Jupiter quote API restricted to them."""
+
+    VENUE = 'METEORA'
+    DEXES = ('Meteora DLMM', 'Meteora')
+
+
+class PhoenixWrapper(JupiterWrapper):
+    """Phoenix's order books, quoted through a Jupiter quote API restricted to them."""
+
+    VENUE = 'PHOENIX'
+    DEXES = ('Phoenix',)
+
+
+class LifinityWrapper(JupiterWrapper):
+    """Lifinity's oracle-based pools, quoted through a Jupiter quote API restricted to them."""
+
+    VENUE = 'LIFINITY'
+    DEXES = ('Lifinity V2',)
+
+
+# The liquidity venues, by the name used in ROUTING_VENUES. A venue is only listed once its
+# wrapper returns quotes in the format of `QuoteData`, from the venue's own quote API or from
+# a Jupiter quote API restricted to its pools. Drift, Zeta and Arcana have neither yet.
+VENUES = {
+    'jupiter': JupiterWrapper,
+    'raydium': RaydiumWrapper,
+    'orca': OrcaWrapper,
+    'meteora': MeteoraWrapper,
+    'phoenix': PhoenixWrapper,
+    'lifinity': LifinityWrapper,
+}
+
+
+def load_venues(config: dict) -> dict[str, LiquidityBase]:
+    """
+    Create the wrappers of the venues enabled in `ROUTING_VENUES`.
+
+    Args:
+        config (dict): The configuration, see `load_config`.
+
+    Returns:
+        dict[str, LiquidityBase]: The venue wrappers, by name.
+
+    Raises:
+        ValueError: If a venue is unknown.
+    """
+    venues = {}
+    for name in config['ROUTING_VENUES']:
+        if name not in VENUES:
+            raise ValueError(f'Unknown liquidity venue {name} in ROUTING_VENUES, '
+                             f'please choose among: {", ".join(VENUES)}.')
+        venues[name] = VENUES[name](config)
+    return venues
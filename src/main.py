@@ -11,12 +11,14 @@ import argparse
 from src.utils.system import open_file
 from src.utils.logging import log_info, log_error
 from src.utils.config import load_config
+from src.utils.clients import HTTP_CLIENTS
 from src.oracles.helius import HeliusWrapper
 from src.oracles.dexscreener import DexscreenerWrapper
 from src.oracles.pyth import PythWrapper
 from src.sol.accounts import SolanaAccounts
 from src.sol.blocks import SolanaBlocks
 from src.liquidity.cexes.binance import BinanceWrapper
+from src.liquidity.venues import VENUES
 from src.agents.main import print_agents_list, print_agent_info
 from src.agents.main import main as agent_deploy
 
@@ -44,6 +46,8 @@ def run_menu() -> argparse.ArgumentParser:
     parser.add_argument('-d', '--deploy', dest='deploy', 
                         nargs='?',metavar='AGENT', const=True,
                         help="Deploy a specific [AGENT].")
+    parser.add_argument('--daemon', dest='daemon', action='store_true',
+                        help="Keep the deployed [AGENT] solving batches in daemon mode.")
 
     ######################################################
     #               Liquidity
@@ -64,6 +68,7 @@ async def run() -> None:
     """Entry point for this module."""
 
     config = load_config()
+    HTTP_CLIENTS.configure(config)
     log_info(open_file(config['LOGO_FILE']))
     spacer = open_file(config['SPACER_FILE'])
 
@@ -127,6 +132,10 @@ async def run() -> None:
         log_info(string)
         ## Jupiter
         log_info(len(string)*' ' + ' - Jupiter (https://station.jup.ag/)')
+        ## Venues quoted next to Jupiter, see ROUTING_VENUES
+        for venue in VENUES:
+            if venue != 'jupiter':
+                log_info(len(string)*' ' + f' - {venue.capitalize()} ({config[venue.upper() + "_HTTPS"]})')
 
     ######################################################
     #               Agents Information
@@ -150,7 +159,7 @@ async def run() -> None:
         else:
             log_info('\n' + spacer)
             agent_name = args.deploy
-            await agent_deploy(args.deploy)
+            await agent_deploy(args.deploy, daemon=args.daemon)
 
 
     ######################################################
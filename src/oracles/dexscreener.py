@@ -2,6 +2,8 @@
 # src/oracles/dexscreener.py
 # Wrapper for Dexscreener price source.
 
+import httpx
+
 from src.utils.network import get_request, craft_url
 from src.utils.logging import log_error, log_info
 
@@ -48,7 +50,12 @@ class DexscreenerWrapper:
         token_url = craft_url(self.url, token_address)
         log_info(f'Fetching price for token {token_symbol} on Dexscreener...')
         
-        response = get_request(token_url)
+        try:
+            response = get_request(token_url)
+        except httpx.HTTPError as e:
+            # Timeouts, unreachable host, or its circuit open (see `CircuitBreaker`)
+            log_error(f"Error fetching price for {token_symbol} on Dexscreener: {e}")
+            return 0
 
         if response.status_code != 200:
             log_error(f"Error fetching price for {token_symbol} on Dexscreener: {response.text}")
@@ -2,6 +2,8 @@
 # src/oracles/helius.py
 # Wrapper for Helius price source.
 
+import httpx
+
 from src.utils.network import post_request
 from src.utils.logging import log_error, log_info
 
@@ -58,7 +60,12 @@ class HeliusWrapper:
         }
 
         log_info(f'Fetching price for token {token_address} on Helius...')
-        response = post_request(url, data=data)
+        try:
+            response = post_request(url, data=data)
+        except httpx.HTTPError as e:
+            # Timeouts, unreachable host, or its circuit open (see `CircuitBreaker`)
+            log_error(f"Error fetching price for {token_address} on Helius: {e}")
+            return 0
 
         try:
             return response['result']['token_info']['price_info']['price_per_token']
@@ -2,8 +2,12 @@
 # src/orders/batch.py
 # This class implements an API to parse order batches.
 
+import time
+
+from typing import Any, AsyncIterator, Dict
 from src.orders.intent import IntentData
-from src.utils.logging import exit_with_error, pprint
+from src.orders.stream import IntentStream, order_error, stream_intents
+from src.utils.logging import log_debug, log_error, pprint
 
 
 class BatchData:
@@ -19,12 +23,14 @@ class BatchData:
         """
         Initialize the BatchData instance.
 
-        Sets up initial attributes for batch_id, intents, solutions, and AMMs.
+        Sets up initial attributes for batch_id, intents, quarantined intents, solutions, AMMs, and deadline.
         """
         self.batch_id = None
         self.intents = []
+        self.quarantined = []
         self.solutions = {}
         self.amms = None
+        self.deadline = None
 
     ###########################
     #     Access methods      #
@@ -50,27 +56,96 @@ class BatchData:
         """
         return {key: solution.to_dict() for key, solution in self.solutions.items()}
 
+    def time_left(self) -> float:
+        """
+        Seconds left before the batch deadline.
+
+        Returns:
+            float: The remaining time (never negative), or None if the batch has no deadline.
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0)
+
+    def expired(self) -> bool:
+        """Check whether the batch deadline has passed."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
     ###############################
     #     Public methods          #
     ###############################
 
+    def set_deadline(self, budget: float = None, auction_deadline: float = None) -> None:
+        """
+        Set the deadline for solving the batch.
+
+        Args:
+            budget (float, optional): Seconds from now the agent can spend on the batch.
+            auction_deadline (float, optional): Unix timestamp of the auction deadline, if
+                                                published with the batch. The earliest 
+                                                of the two deadlines is kept.
+        """
+        deadlines = []
+        if budget:
+            deadlines.append(time.monotonic() + budget)
+        if auction_deadline:
+            deadlines.append(time.monotonic() + (auction_deadline - time.time()))
+        self.deadline = min(deadlines) if deadlines else None
+
+    def quarantine(self, quarantined: list) -> None:
+        """Set aside malformed intents, as (key in the orders, reason) pairs, and report them."""
+        for key, reason in quarantined:
+            log_debug(f"  Quarantined intent {key}: {reason}")
+        if quarantined:
+            log_error(f"Quarantined {len(quarantined)} malformed intent(s), e.g., {quarantined[0][0]}: {quarantined[0][1]}")
+        self.quarantined.extend(quarantined)
+
     def parse_intent_instance(self, input_json: dict) -> None:
         """
         Parse a batch of orders from a JSON input into a list of intents.
 
         This method processes the input JSON to extract orders and converts them
-        into `IntentData` instances, appending them to the `intents` attribute.
+        into `IntentData` instances in bulk (see `IntentData.from_orders`),
+        appending them to the `intents` attribute. Malformed orders are set aside
+        in the `quarantined` attribute instead (see `order_error`).
 
         Args:
             input_json (dict): JSON data containing orders. Expected format includes a key "orders"
                                with a dictionary of intents, where each intent is represented as a dictionary.
+        """
+        orders, quarantined = [], []
+        for key, order in input_json.get("orders", {}).items():
+            error = order_error(order)
+            if error:
+                quarantined.append((key, error))
+            else:
+                orders.append(order)
+
+        self.intents.extend(IntentData.from_orders(orders))
+        self.quarantine(quarantined)
+
+    async def parse_intent_stream(self, chunks: AsyncIterator[str], html: bool = False) -> Dict[str, Any]:
+        """
+        Parse a batch of orders from its body as it arrives, e.g., from a streamed HTTP response.
+
+        Intents are appended to the `intents` attribute as soon as they are complete, and
+        malformed ones to the `quarantined` attribute, without ever holding the whole body
+        or its decoded JSON in memory (see `IntentStream`).
+
+        Args:
+            chunks (AsyncIterator[str]): The pieces of the body.
+            html (bool, optional): Whether the body is an HTML page embedding the JSON of the batch.
+
+        Returns:
+            Dict[str, Any]: The other top-level fields of the batch, e.g., batch_id or deadline.
 
         Raises:
-            Exception: If there is an error parsing any intent, it logs the error and stops processing.
+            ValueError: If the body is not a valid batch. The intents parsed before are kept.
         """
-        orders = input_json.get("orders", {})
-        for intent_id, intent_data in orders.items():
-            try:
-                self.intents.append(IntentData(**intent_data))
-            except Exception as e:
-                exit_with_error(f"Could not parse intent {intent_data.get('intentId', 'unknown')}: {e}")
+        stream = IntentStream(html=html)
+        try:
+            async for intent in stream_intents(chunks, stream):
+                self.intents.append(intent)
+        finally:
+            self.quarantine(stream.quarantined)
+        return stream.fields
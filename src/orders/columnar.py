@@ -0,0 +1,181 @@
+# -*- encoding: utf-8 -*-
+# src/orders/columnar.py
+# Columnar (struct-of-arrays) representation of a batch of intents.
+
+import numpy as np
+
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.orders.intent import IntentData
+from src.orders.tokens import TOKENS
+
+
+class IntentBatch:
+    """
+    A batch of intents stored column by column.
+
+    Amounts, decimals and expirations are NumPy arrays, and tokens are stored as
+    their ids in the token registry (see `src.orders.tokens`). Intents are only
+    built as `IntentData` objects on demand, so matching, filtering and pricing
+    can work on whole columns at once.
+
+    Attributes:
+        intent_id, source_address, destination_address, status (np.ndarray): Object columns.
+        source_token, destination_token (np.ndarray): Token ids (int32).
+        source_amount, min_receive_amount (np.ndarray): Amounts in base units (uint64).
+        source_token_decimals, destination_token_decimals (np.ndarray): Decimals (uint8).
+        expiration (np.ndarray): Expirations (int64).
+        partial_fill (np.ndarray): Partial fill flags (bool).
+    """
+
+    OBJECT_COLUMNS = ['intent_id', 'source_address', 'destination_address', 'status']
+    NUMERIC_COLUMNS = {
+        'source_amount': np.uint64,
+        'min_receive_amount': np.uint64,
+        'source_token_decimals': np.uint8,
+        'destination_token_decimals': np.uint8,
+        'expiration': np.int64,
+        'partial_fill': np.bool_,
+    }
+    TOKEN_COLUMNS = ['source_token', 'destination_token']
+
+    def __init__(self) -> None:
+        """Initialize an empty IntentBatch."""
+        for column in self.OBJECT_COLUMNS:
+            setattr(self, column, np.empty(0, dtype=object))
+        for column, dtype in self.NUMERIC_COLUMNS.items():
+            setattr(self, column, np.empty(0, dtype=dtype))
+        for column in self.TOKEN_COLUMNS:
+            setattr(self, column, np.empty(0, dtype=np.int32))
+
+    def __len__(self) -> int:
+        return len(self.intent_id)
+
+    def __getitem__(self, index: int) -> IntentData:
+        """Build the `IntentData` of the intent at a given row."""
+        return IntentData(
+            intent_id=self.intent_id[index],
+            source_token=TOKENS.symbols[self.source_token[index]],
+            source_mint_address=TOKENS.mints[self.source_token[index]],
+            source_address=self.source_address[index],
+            source_amount=int(self.source_amount[index]),
+            destination_token=TOKENS.symbols[self.destination_token[index]],
+            destination_mint_address=TOKENS.mints[self.destination_token[index]],
+            destination_address=self.destination_address[index],
+            min_receive_amount=int(self.min_receive_amount[index]),
+            partial_fill=bool(self.partial_fill[index]),
+            expiration=int(self.expiration[index]),
+            status=self.status[index],
+            source_token_decimals=int(self.source_token_decimals[index]),
+            destination_token_decimals=int(self.destination_token_decimals[index]),
+        )
+
+    ###########################
+    #     Private methods     #
+    ###########################
+
+    @classmethod
+    def from_rows(cls, rows: List, get, source_tokens: Iterable[int], destination_tokens: Iterable[int]) -> 'IntentBatch':
+        """Build the columns from rows, reading each field with `get(row, field)`."""
+        batch = cls()
+
+        for column in cls.OBJECT_COLUMNS:
+            values = np.empty(len(rows), dtype=object)
+            values[:] = [get(row, column) for row in rows]
+            setattr(batch, column, values)
+        for column, dtype in cls.NUMERIC_COLUMNS.items():
+            setattr(batch, column, np.array([get(row, column) for row in rows], dtype=dtype))
+
+        batch.source_token = np.fromiter(source_tokens, dtype=np.int32, count=len(rows))
+        batch.destination_token = np.fromiter(destination_tokens, dtype=np.int32, count=len(rows))
+        return batch
+
+    ###############################
+    #     Public methods          #
+    ###############################
+
+    @classmethod
+    def from_intents(cls, intents: List[IntentData]) -> 'IntentBatch':
+        """
+        Build the columnar batch of a list of intents.
+
+        Args:
+            intents (List[IntentData]): The intents.
+
+        Returns:
+            IntentBatch: The intents, column by column, in the same order.
+        """
+        return cls.from_rows(intents, getattr,
+                             (intent.source_token_id for intent in intents),
+                             (intent.destination_token_id for intent in intents))
+
+    @classmethod
+    def from_orders(cls, input_json: dict) -> 'IntentBatch':
+        """
+        Build the columnar batch straight from the JSON of a batch, without building intents.
+
+        Args:
+            input_json (dict): JSON data containing orders, in the format of `BatchData.parse_intent_instance`.
+
+        Returns:
+            IntentBatch: The intents of the batch, column by column.
+        """
+        orders = list(input_json.get('orders', {}).values())
+        return cls.from_rows(orders, dict.__getitem__,
+                             (TOKENS.intern(order['source_mint_address'], order['source_token'],
+                                            order['source_token_decimals']) for order in orders),
+                             (TOKENS.intern(order['destination_mint_address'], order['destination_token'],
+                                            order['destination_token_decimals']) for order in orders))
+
+    def to_intents(self, rows: Optional[Iterable[int]] = None) -> List[IntentData]:
+        """
+        Build the `IntentData` of some rows (all of them by default).
+
+        Args:
+            rows (Iterable[int], optional): The rows to build.
+
+        Returns:
+            List[IntentData]: The intents, in the order of `rows`.
+        """
+        rows = range(len(self)) if rows is None else rows
+        return [self[int(row)] for row in rows]
+
+    def where(self, mask: np.ndarray) -> 'IntentBatch':
+        """
+        Select the rows of the batch with a boolean mask (or an array of rows).
+
+        Args:
+            mask (np.ndarray): The rows to keep.
+
+        Returns:
+            IntentBatch: A new batch with the selected rows.
+        """
+        batch = IntentBatch()
+        for column in self.OBJECT_COLUMNS + list(self.NUMERIC_COLUMNS) + self.TOKEN_COLUMNS:
+            setattr(batch, column, getattr(self, column)[mask])
+        return batch
+
+    def limit_prices(self) -> np.ndarray:
+        """Minimum price of each intent, in destination base units per source base unit."""
+        return self.min_receive_amount.astype(np.float64) / self.source_amount.astype(np.float64)
+
+    def pair_groups(self) -> Dict[Tuple[int, int], np.ndarray]:
+        """
+        Group the rows by (source token id, destination token id).
+
+        Returns:
+            Dict: (source token id, destination token id) -> rows of the pair, in batch order.
+        """
+        tokens = len(TOKENS)
+        keys = self.source_token.astype(np.int64) * tokens + self.destination_token
+        order = np.argsort(keys, kind='stable')
+        pairs, starts = np.unique(keys[order], return_index=True)
+
+        groups = {}
+        for key, rows in zip(pairs.tolist(), np.split(order, starts[1:])):
+            groups[divmod(key, tokens)] = rows
+        return groups
+
+    def nbytes(self) -> int:
+        """Memory used by the columns (not counting the strings shared with other objects)."""
+        return sum(getattr(self, column).nbytes
+                   for column in self.OBJECT_COLUMNS + list(self.NUMERIC_COLUMNS) + self.TOKEN_COLUMNS)
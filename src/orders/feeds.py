@@ -0,0 +1,308 @@
+# -*- encoding: utf-8 -*-
+# src/orders/feeds.py
+# Feeds pushing order batches from Urani's orderbook into the agents.
+
+import httpx
+import ujson
+import asyncio
+
+from collections import deque
+from typing import Any, Dict, Hashable, Tuple
+from src.orders.batch import BatchData
+from src.utils.clients import HTTP_CLIENTS
+from src.utils.logging import log_debug, log_error
+from src.utils.network import ws_subscribe, ws_reloop, html_to_json, BATCH_ACCEPT_HEADERS
+
+
+class BatchSubscriber:
+    """
+    Persistent subscription to the batches topic of Urani's orderbook.
+
+    A background task keeps a websocket subscription open (reconnecting through
+    `ws_reloop` whenever it drops) and pushes every published batch into a bounded
+    queue. When the queue is full, the subscription stops reading from the socket
+    until the agent catches up, applying backpressure to the publisher.
+
+    The orderbook sends its current batch to each new subscription, so a batch already
+    received (e.g., before a reconnection, or by polling meanwhile) is dropped: the last
+    `remember` batches are kept by id (or by content, for batches without one).
+    `connected` is set while the subscription is confirmed.
+    """
+
+    def __init__(self, url: str, topic: str, max_pending: int = 2, config: dict = None,
+                 remember: int = 64) -> None:
+        """
+        Initialize the BatchSubscriber.
+
+        Args:
+            url (str): The websocket URL of the orderbook.
+            topic (str): The topic the batches are published on.
+            max_pending (int, optional): Maximum number of batches waiting to be consumed.
+            config (dict, optional): Configuration dictionary with the websocket settings.
+            remember (int, optional): Number of recent batches kept to drop those sent again.
+        """
+        self.url = url
+        self.topic = topic
+        self.config = config
+        self.batches = asyncio.Queue(maxsize=max_pending)
+        # Sent as a list, so the confirmation of the subscription reaches `_on_message`
+        self.subscription_request = [{"method": "subscribe", "topic": topic}]
+        self.connected = asyncio.Event()
+        self.seen = deque(maxlen=remember)
+        self.duplicates = 0
+        self.task = None
+
+    ###########################
+    #     Private methods     #
+    ###########################
+
+    @staticmethod
+    def unwrap(message: dict) -> dict:
+        """Extract the batch from a published message, if it contains one."""
+        batch = message.get('data', message) if isinstance(message, dict) else None
+        if isinstance(batch, dict) and batch.get('orders'):
+            return batch
+        return {}
+
+    @staticmethod
+    def key(batch: dict) -> Hashable:
+        """Return what identifies a batch: its id, or else its content."""
+        return batch.get('batch_id') or hash(ujson.dumps(batch, sort_keys=True))
+
+    async def _on_message(self, message: dict) -> None:
+        """Queue the new batch carried by a message, waiting while the queue is full."""
+        if isinstance(message, dict) and message.get('result') == 'subscribed':
+            log_debug(f'Subscribed to {self.topic} at {self.url}')
+            self.connected.set()
+            return
+
+        batch = self.unwrap(message)
+        if not batch:
+            log_debug(f'Ignoring message on topic {self.topic}: {message}')
+            return
+        if not self.remember(batch):
+            log_debug(f'Dropping batch {batch.get("batch_id")} on topic {self.topic}: already received')
+            return
+        await self.batches.put(batch)
+
+    async def _stream(self) -> None:
+        """Open one subscription to the batches topic."""
+        log_debug(f'Subscribing to {self.topic} at {self.url}')
+        try:
+            await ws_subscribe(self.url, self.subscription_request, self._on_message, config=self.config)
+        finally:
+            self.connected.clear()
+
+    ###############################
+    #     Public methods          #
+    ###############################
+
+    def remember(self, batch: dict) -> bool:
+        """
+        Record a batch as received.
+
+        Returns:
+            bool: False if the batch was already received.
+        """
+        key = self.key(batch)
+        if key in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.append(key)
+        return True
+
+    def start(self) -> None:
+        """Start the background subscription if it is not running yet."""
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(ws_reloop(self._stream, self.topic, config=self.config))
+
+    async def get(self) -> dict:
+        """
+        Wait for the next published batch.
+
+        Returns:
+            dict: The JSON data of the batch.
+        """
+        self.start()
+        batch = await self.batches.get()
+        self.batches.task_done()
+        return batch
+
+    async def close(self) -> None:
+        """Cancel the background subscription."""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+            log_debug(f'Unsubscribed from {self.topic}')
+
+
+class BatchPoller:
+    """
+    Non-blocking poller for the batches HTTP endpoint of Urani's orderbook.
+
+    Polls are conditional: the ETag of the last batch is sent as If-None-Match, so
+    an unchanged batch costs a 304 with no body to download or parse (servers that
+    do not send ETags are handled by comparing the raw body instead). When
+    `long_poll` is set, the server is asked to hold the request until a new batch
+    is published, so new batches are picked up as soon as they are posted.
+    Otherwise, the interval between idle polls backs off exponentially from
+    `min_interval` to `max_interval`, and resets once a new batch arrives.
+    The raw JSON of the batch is negotiated (Accept), falling back to the HTML page,
+    and responses are streamed, so a new batch can be parsed while it downloads (see `get_batch`).
+    """
+
+    def __init__(self, url: str, min_interval: float = 0.05, max_interval: float = 1,
+                 long_poll: float = 0, timeout: float = 10) -> None:
+        """
+        Initialize the BatchPoller.
+
+        Args:
+            url (str): The batches HTTP endpoint.
+            min_interval (float, optional): Seconds between polls right after a new batch.
+            max_interval (float, optional): Maximum seconds between idle polls.
+            long_poll (float, optional): Seconds the server may hold a poll. 0 disables long-polling.
+            timeout (float, optional): Request timeout, on top of the long-poll wait.
+        """
+        self.url = url
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.long_poll = long_poll
+        self.timeout = timeout + long_poll
+
+        self.interval = min_interval
+        self.etag = None
+        self.last_body = None
+        self.client = None
+
+    ###########################
+    #     Private methods     #
+    ###########################
+
+    def _backoff(self) -> float:
+        """Return the wait before the next idle poll and increase it for the following one."""
+        interval = self.interval
+        self.interval = min(self.interval * 2, self.max_interval)
+        return interval
+
+    async def _poll(self) -> httpx.Response:
+        """Send one conditional (and possibly long) poll, streaming its response."""
+        if self.client is None:
+            self.client = HTTP_CLIENTS.get_async(self.url)
+
+        headers, params = dict(BATCH_ACCEPT_HEADERS), None
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+            if self.long_poll:
+                params = {'wait': self.long_poll}
+        request = self.client.build_request('GET', self.url, headers=headers, params=params, timeout=self.timeout)
+        return await self.client.send(request, stream=True)
+
+    async def _next_response(self) -> httpx.Response:
+        """Poll until the endpoint returns a new batch, and return its (open) streamed response."""
+        while True:
+            try:
+                response = await self._poll()
+            except httpx.HTTPError as e:
+                log_error(f'Error polling {self.url}: {e}')
+                await asyncio.sleep(self._backoff())
+                continue
+
+            if response.status_code == 304:
+                await response.aclose()
+                # A long-poll that timed out can be resent right away, unless the
+                # server answered at once (i.e., it does not support long-polling)
+                if not self.long_poll or response.elapsed.total_seconds() < self.min_interval:
+                    await asyncio.sleep(self._backoff())
+                continue
+
+            if response.status_code != 200:
+                await response.aread()
+                log_error(f'Error fetching current batch: {response.text}')
+                await asyncio.sleep(self._backoff())
+                continue
+
+            # Without an ETag, the only way to tell a new batch is to read the whole body
+            if response.headers.get('ETag') is None:
+                await response.aread()
+                if response.content == self.last_body:
+                    await asyncio.sleep(self._backoff())
+                    continue
+            return response
+
+    def _accept(self, response: httpx.Response) -> None:
+        """
+        Remember the batch of a response once it is parsed, so the next polls only return a newer one.
+
+        A batch that could not be read or parsed is not remembered, and is fetched again.
+        """
+        self.etag = response.headers.get('ETag')
+        self.last_body = None if self.etag else response.content
+        self.interval = self.min_interval
+
+    ###############################
+    #     Public methods          #
+    ###############################
+
+    async def get(self) -> dict:
+        """
+        Wait for the next batch published at the endpoint.
+
+        A body that breaks off or cannot be decoded is dropped, and polling goes on.
+
+        Returns:
+            dict: The JSON data of the batch.
+        """
+        while True:
+            response = await self._next_response()
+            try:
+                await response.aread()
+                json_data = html_to_json(response)
+            except (httpx.HTTPError, ValueError) as e:
+                log_error(f'Dropping batch from {self.url}: {e}')
+                await asyncio.sleep(self._backoff())
+                continue
+
+            if not json_data:
+                log_debug(f'Waiting for a valid batch at {self.url}')
+                await asyncio.sleep(self._backoff())
+                continue
+
+            self._accept(response)
+            return json_data
+
+    async def get_batch(self) -> Tuple[Dict[str, Any], BatchData]:
+        """
+        Wait for the next batch published at the endpoint, parsing its intents while it downloads.
+
+        Malformed intents are quarantined in the batch (see `BatchData.parse_intent_stream`).
+        A body that breaks off or is not a batch is dropped, and polling goes on.
+
+        Returns:
+            Dict[str, Any], BatchData: The top-level fields of the batch (e.g., batch_id, deadline),
+                                       and the batch with its intents.
+        """
+        while True:
+            response = await self._next_response()
+            batch = BatchData()
+            html = 'text/html' in response.headers.get('Content-Type', '')
+            try:
+                fields = await batch.parse_intent_stream(response.aiter_text(), html=html)
+            except (httpx.HTTPError, ValueError) as e:
+                log_error(f'Dropping batch from {self.url}: {e}')
+                await asyncio.sleep(self._backoff())
+                continue
+            finally:
+                await response.aclose()
+
+            if not batch.intents and not batch.quarantined:
+                log_debug(f'Waiting for a valid batch at {self.url}')
+                await asyncio.sleep(self._backoff())
+                continue
+
+            self._accept(response)
+            return fields, batch
+
+    async def close(self) -> None:
+        """Release the client of the poller. Its connections are shared, and closed with the other clients."""
+        self.client = None
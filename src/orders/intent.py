@@ -3,7 +3,12 @@
 # This module defines the IntentData class, which models an intent for an agent in the system.
 # The class is used to represent the details of an intent, including source and destination token information.
 
+import sys
+
+from operator import itemgetter
 from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List
+from src.orders.tokens import TOKENS
 
 
 @dataclass
@@ -12,9 +17,18 @@ class IntentData:
     Represents a user's intent for token transfer.
 
     This class models the details of an intent, including information about the source and destination tokens,
-    their respective addresses, amounts, and other relevant details.
+    their respective addresses, amounts, and other relevant details. Tokens are registered in the token registry,
+    and `source_token_id` and `destination_token_id` hold their ids (see `src.orders.tokens`).
+    Attributes are stored in slots, with no per-instance `__dict__`.
     """
 
+    # The keys of an intent in the orders JSON, in the order of `__init__`
+    FIELDS = ('intent_id', 'source_token', 'source_mint_address', 'source_address', 'source_amount',
+              'destination_token', 'destination_mint_address', 'destination_address', 'min_receive_amount',
+              'partial_fill', 'expiration', 'status', 'source_token_decimals', 'destination_token_decimals')
+
+    __slots__ = FIELDS + ('source_token_id', 'destination_token_id')
+
     intent_id: str
     source_token: str
     source_mint_address: str
@@ -64,13 +78,16 @@ class IntentData:
             source_token_decimals (int): Number of decimal places for the source token.
             destination_token_decimals (int): Number of decimal places for the destination token.
         """
+        self.source_token_id = TOKENS.intern(source_mint_address, source_token, source_token_decimals)
+        self.destination_token_id = TOKENS.intern(destination_mint_address, destination_token, destination_token_decimals)
+
         self.intent_id = intent_id
-        self.source_token = source_token
-        self.source_mint_address = source_mint_address
+        self.source_token = sys.intern(source_token)
+        self.source_mint_address = TOKENS.mints[self.source_token_id]
         self.source_address = source_address
         self.source_amount = source_amount
-        self.destination_token = destination_token
-        self.destination_mint_address = destination_mint_address
+        self.destination_token = sys.intern(destination_token)
+        self.destination_mint_address = TOKENS.mints[self.destination_token_id]
         self.destination_address = destination_address
         self.min_receive_amount = min_receive_amount
         self.partial_fill = partial_fill
@@ -78,3 +95,72 @@ class IntentData:
         self.status = status
         self.source_token_decimals = source_token_decimals
         self.destination_token_decimals = destination_token_decimals
+
+    @classmethod
+    def from_orders(cls, orders: Iterable[Dict[str, Any]]) -> List['IntentData']:
+        """
+        Build the intents of decoded orders in bulk.
+
+        Equivalent to `[IntentData(**order) for order in orders]`, but the fields of each
+        order are unpacked straight into the slots of the intent, and each token is looked
+        up in the registry once per call. Orders without exactly the expected keys go
+        through `__init__`, which raises the usual errors.
+
+        Args:
+            orders (Iterable[Dict[str, Any]]): The orders, as decoded from the JSON of a batch.
+
+        Returns:
+            List[IntentData]: The intents, in the same order.
+        """
+        new, fields, size = cls.__new__, itemgetter(*cls.FIELDS), len(cls.FIELDS)
+        mints, intern, tokens = TOKENS.mints, sys.intern, {}
+
+        intents = []
+        for order in orders:
+            if len(order) != size:
+                intents.append(cls(**order))
+                continue
+
+            intent = new(cls)
+            (intent.intent_id, source_token, source_mint, intent.source_address, intent.source_amount,
+             destination_token, destination_mint, intent.destination_address, intent.min_receive_amount,
+             intent.partial_fill, intent.expiration, intent.status, intent.source_token_decimals,
+             intent.destination_token_decimals) = fields(order)
+
+            source_id = tokens.get(source_mint)
+            if source_id is None:
+                source_id = tokens[source_mint] = TOKENS.intern(source_mint, source_token, intent.source_token_decimals)
+            destination_id = tokens.get(destination_mint)
+            if destination_id is None:
+                destination_id = tokens[destination_mint] = TOKENS.intern(destination_mint, destination_token,
+                                                                          intent.destination_token_decimals)
+
+            intent.source_token_id, intent.source_mint_address = source_id, mints[source_id]
+            intent.destination_token_id, intent.destination_mint_address = destination_id, mints[destination_id]
+            intent.source_token, intent.destination_token = intern(source_token), intern(destination_token)
+            intents.append(intent)
+        return intents
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the IntentData object to a dictionary, in the format of the orders JSON.
+
+        Returns:
+            Dict[str, Any]: The dictionary representation of the IntentData object.
+        """
+        return {
+            "intent_id": self.intent_id,
+            "source_token": self.source_token,
+            "source_mint_address": self.source_mint_address,
+            "source_address": self.source_address,
+            "source_amount": self.source_amount,
+            "destination_token": self.destination_token,
+            "destination_mint_address": self.destination_mint_address,
+            "destination_address": self.destination_address,
+            "min_receive_amount": self.min_receive_amount,
+            "partial_fill": self.partial_fill,
+            "expiration": self.expiration,
+            "status": self.status,
+            "source_token_decimals": self.source_token_decimals,
+            "destination_token_decimals": self.destination_token_decimals
+        }
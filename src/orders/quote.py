@@ -2,6 +2,8 @@ from typing import List, Optional, Dict, Any
 # -*- encoding: utf-8 -*-
 # src/orders/quote.py
 
+from src.orders.tokens import TOKENS
+
 
 class QuoteData:
     """
@@ -9,8 +11,15 @@ class QuoteData:
 
     This class encapsulates all relevant information about a token swap quote, 
     including input and output tokens, amounts, slippage, fees, and more.
+    The input and output tokens are registered in the token registry, and
+    `input_token_id` and `output_token_id` hold their ids. Attributes are stored
+    in slots, with no per-instance `__dict__`.
     """
 
+    __slots__ = ('input_mint', 'in_amount', 'output_mint', 'out_amount', 'other_amount_threshold', 'swap_mode',
+                 'slippage_bps', 'platform_fee', 'price_impact_pct', 'route_plan', 'context_slot', 'time_taken',
+                 'input_token_id', 'output_token_id')
+
     def __init__(self, 
                  input_mint: str, 
                  in_amount: str, 
@@ -41,9 +50,12 @@ class QuoteData:
             context_slot (int): Slot number in the blockchain context.
             time_taken (float): Time taken to complete the quote process.
         """
-        self.input_mint = input_mint
+        self.input_token_id = TOKENS.intern(input_mint)
+        self.output_token_id = TOKENS.intern(output_mint)
+
+        self.input_mint = TOKENS.mints[self.input_token_id]
         self.in_amount = in_amount
-        self.output_mint = output_mint
+        self.output_mint = TOKENS.mints[self.output_token_id]
         self.out_amount = out_amount
         self.other_amount_threshold = other_amount_threshold
         self.swap_mode = swap_mode
@@ -79,3 +91,25 @@ class QuoteData:
             context_slot=data['contextSlot'],
             time_taken=data['timeTaken']
         )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the QuoteData object to a dictionary, in the format read by `from_dict`.
+
+        Returns:
+            Dict[str, Any]: The dictionary representation of the QuoteData object.
+        """
+        return {
+            'inputMint': self.input_mint,
+            'inAmount': self.in_amount,
+            'outputMint': self.output_mint,
+            'outAmount': self.out_amount,
+            'otherAmountThreshold': self.other_amount_threshold,
+            'swapMode': self.swap_mode,
+            'slippageBps': self.slippage_bps,
+            'platformFee': self.platform_fee,
+            'priceImpactPct': self.price_impact_pct,
+            'routePlan': self.route_plan,
+            'contextSlot': self.context_slot,
+            'timeTaken': self.time_taken
+        }
@@ -1,11 +1,13 @@
 # -*- encoding: utf-8 -*-
 # src/orders/solution.py
 
+import sys
+
 from dataclasses import dataclass
 from src.orders.quote import QuoteData
+from src.orders.tokens import TOKENS
 from typing import Dict, Optional, Any
 from src.orders.intent import IntentData
-from src.utils.logging import exit_with_error
 
 
 @dataclass
@@ -24,8 +26,16 @@ class SolutionData:
         destination_address (str): Address to which the destination token is sent.
         destination_amount (int): Amount of the destination token.
         route_plan (Optional[list[Dict[str, Any]]]): Route plan for the trade, if applicable.
+        source_token_id (int): Id of the source token in the token registry.
+        destination_token_id (int): Id of the destination token in the token registry.
+
+    Attributes are stored in slots, with no per-instance `__dict__`.
     """
 
+    __slots__ = ('solution_id', 'source_token', 'source_mint_address', 'source_address', 'source_amount',
+                 'destination_token', 'destination_mint_address', 'destination_address', 'destination_amount',
+                 'route_plan', 'source_token_id', 'destination_token_id')
+
     solution_id: str
     source_token: str
     source_mint_address: str
@@ -35,7 +45,7 @@ class SolutionData:
     destination_mint_address: str
     destination_address: str
     destination_amount: int
-    route_plan: Optional[list[Dict[str, Any]]] = None
+    route_plan: Optional[list[Dict[str, Any]]]
 
     def __init__(self, 
                  solution_id: str, 
@@ -63,13 +73,16 @@ class SolutionData:
             destination_amount (int): Amount of the destination token.
             route_plan (Optional[list[Dict[str, Any]]], optional): The route plan for the trade. Defaults to None.
         """
+        self.source_token_id = TOKENS.intern(source_mint_address, source_token)
+        self.destination_token_id = TOKENS.intern(destination_mint_address, destination_token)
+
         self.solution_id = solution_id
-        self.source_token = source_token
-        self.source_mint_address = source_mint_address
+        self.source_token = sys.intern(source_token)
+        self.source_mint_address = TOKENS.mints[self.source_token_id]
         self.source_address = source_address
         self.source_amount = source_amount
-        self.destination_token = destination_token
-        self.destination_mint_address = destination_mint_address
+        self.destination_token = sys.intern(destination_token)
+        self.destination_mint_address = TOKENS.mints[self.destination_token_id]
         self.destination_address = destination_address
         self.destination_amount = destination_amount
         self.route_plan = route_plan if route_plan else {}
@@ -110,6 +123,61 @@ class SolutionData:
         )
         return solution_a, solution_b
     
+    @classmethod
+    def from_ring(cls, intents: list['IntentData']) -> list['SolutionData']:
+        """
+        Create and return solutions for a peer-to-peer (P2P) ring trade, e.g., A->B, B->C, C->A.
+
+        Every intent is paid the source amount of the next intent in the ring, which 
+        sells the token it wants to receive (the last intent is paid by the first one).
+
+        Args:
+            intents (list[IntentData]): The intents of the ring, in ring order.
+
+        Returns:
+            list[SolutionData]: One SolutionData object per intent, in the same order.
+        """
+        solutions = []
+        for position, intent in enumerate(intents):
+            next_intent = intents[(position + 1) % len(intents)]
+            solutions.append(cls(
+                solution_id='---',
+                source_token=intent.source_token,
+                source_mint_address=intent.source_mint_address,
+                source_address=intent.source_address,
+                source_amount=intent.source_amount,
+                destination_token=intent.destination_token,
+                destination_mint_address=intent.destination_mint_address,
+                destination_address=next_intent.source_address,
+                destination_amount=next_intent.source_amount
+            ))
+        return solutions
+
+    @classmethod
+    def from_fill(cls, intent: 'IntentData', source_amount: int, destination_amount: int) -> 'SolutionData':
+        """
+        Create a SolutionData object for a (possibly partial) fill of an intent against a book of intents.
+
+        Args:
+            intent (IntentData): The intent data object.
+            source_amount (int): The amount of source token filled.
+            destination_amount (int): The amount of destination token received for it.
+
+        Returns:
+            SolutionData: The solution data object of the fill.
+        """
+        return cls(
+            solution_id='---',
+            source_token=intent.source_token,
+            source_mint_address=intent.source_mint_address,
+            source_address=intent.source_address,
+            source_amount=source_amount,
+            destination_token=intent.destination_token,
+            destination_mint_address=intent.destination_mint_address,
+            destination_address=intent.destination_address,
+            destination_amount=destination_amount
+        )
+
     @classmethod
     def from_quote(cls, quote: 'QuoteData', intent: 'IntentData') -> 'SolutionData':
         """
@@ -126,12 +194,12 @@ class SolutionData:
             ValueError: If the quote's input or output mint does not match the intent or if the output amount is less than the minimum receive amount.
         """
         # Sanity checks
-        if (quote.input_mint != intent.source_mint_address):
-            exit_with_error(f"Quote's input mint does not match source token in intent {intent.intent_id}.")
-        if (quote.output_mint != intent.destination_mint_address):
-            exit_with_error(f"Quote's output mint does not match destination token in intent {intent.intent_id}.")
+        if (quote.input_token_id != intent.source_token_id):
+            raise ValueError(f"Quote's input mint does not match source token in intent {intent.intent_id}.")
+        if (quote.output_token_id != intent.destination_token_id):
+            raise ValueError(f"Quote's output mint does not match destination token in intent {intent.intent_id}.")
         if (int(quote.out_amount) < intent.min_receive_amount):
-            exit_with_error(f'Quote for intent {intent.intent_id} provides less {intent.destination_token} than the minimum required {intent.min_receive_amount}.')
+            raise ValueError(f'Quote for intent {intent.intent_id} provides less {intent.destination_token} than the minimum required {intent.min_receive_amount}.')
         
         # Initialize solution
         solution = cls(
@@ -0,0 +1,306 @@
+# -*- encoding: utf-8 -*-
+# src/orders/stream.py
+# Incremental parser of order batches, building intents as the response body arrives.
+
+import re
+import ujson
+
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from src.orders.intent import IntentData
+
+
+# A JSON string, and the tokens delimiting JSON values (a lone quote is an unterminated string)
+STRING = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+TOKEN = re.compile(STRING + r'|"|[{}\[\],]')
+
+# A key of an object, up to its value
+KEY = re.compile(r'\s*,?\s*(' + STRING + r')\s*:\s*')
+
+# The end of an object
+END = re.compile(r'\s*\}')
+WHITESPACE = ' \t\r\n'
+
+# The entities escaped in the HTML batch pages (by Jinja2/markupsafe or html.escape), in unescaping order
+HTML_ENTITIES = (('&#34;', '"'), ('&quot;', '"'), ('&#39;', "'"), ('&#x27;', "'"),
+                 ('&lt;', '<'), ('&gt;', '>'), ('&amp;', '&'))
+
+# Largest integer amount an intent can hold (u64 on-chain)
+MAX_AMOUNT = 2**64 - 1
+
+
+def order_error(order: Any) -> Optional[str]:
+    """
+    Validate a decoded order before building its intent.
+
+    Args:
+        order (Any): The decoded order.
+
+    Returns:
+        str: Why the order is malformed, or None if it is valid.
+    """
+    if not isinstance(order, dict):
+        return f'expected an object, got {type(order).__name__}'
+
+    missing = [field for field in IntentData.FIELDS if field not in order]
+    if missing:
+        return f'missing {", ".join(missing)}'
+    if len(order) != len(IntentData.FIELDS):
+        return f'unexpected {", ".join(key for key in order if key not in IntentData.FIELDS)}'
+
+    for field in ('intent_id', 'source_token', 'source_mint_address', 'source_address', 'destination_token',
+                  'destination_mint_address', 'destination_address', 'status'):
+        if not isinstance(order[field], str):
+            return f'{field} is not a string'
+    for field in ('source_amount', 'min_receive_amount', 'expiration', 'source_token_decimals',
+                  'destination_token_decimals'):
+        if not isinstance(order[field], int) or isinstance(order[field], bool):
+            return f'{field} is not an integer'
+    if not isinstance(order['partial_fill'], bool):
+        return 'partial_fill is not a boolean'
+
+    if not 0 < order['source_amount'] <= MAX_AMOUNT:
+        return f'source_amount {order["source_amount"]} out of range'
+    if not 0 <= order['min_receive_amount'] <= MAX_AMOUNT:
+        return f'min_receive_amount {order["min_receive_amount"]} out of range'
+    if not (0 <= order['source_token_decimals'] <= 255 and 0 <= order['destination_token_decimals'] <= 255):
+        return 'decimals out of range'
+    if not order['source_mint_address'] or order['source_mint_address'] == order['destination_mint_address']:
+        return 'source and destination mints must be distinct'
+    return None
+
+
+class IntentStream:
+    """
+    Incremental parser of the JSON of a batch, fed with the response body piece by piece.
+
+    Only the part of the body not parsed yet is kept: every complete order is decoded
+    on its own, validated and turned into an intent right away, so the memory used by
+    the parser does not grow with the size of the batch. Malformed orders are kept
+    aside in `quarantined`, with the reason why, instead of failing the whole batch.
+    The other top-level values of the batch (e.g., batch_id, deadline) are decoded
+    into `fields`.
+
+    The body can also be an HTML batch page, whose JSON is the (escaped) content of
+    its `<code>` block.
+    """
+
+    def __init__(self, html: bool = False) -> None:
+        """
+        Initialize the IntentStream.
+
+        Args:
+            html (bool, optional): Whether the body is an HTML page embedding the JSON.
+        """
+        self.html = html
+        self.in_code = False
+        self.code_done = False
+        self.pending = ''
+
+        self.buffer = ''
+        self.pos = 0
+        self.state = 'start'
+        self.fields: Dict[str, Any] = {}
+        self.quarantined: List[Tuple[str, str]] = []
+
+    ###########################
+    #     Private methods     #
+    ###########################
+
+    def _unescape(self, text: str) -> str:
+        """Extract the JSON text of the `<code>` block from a piece of HTML, unescaped."""
+        text = self.pending + text
+        self.pending = ''
+        if self.code_done:
+            return ''
+
+        if not self.in_code:
+            start = text.find('<code>')
+            if start < 0:
+                self.pending = text[-len('<code>'):]
+                return ''
+            self.in_code, text = True, text[start + len('<code>'):]
+
+        end = text.find('</code>')
+        if end >= 0:
+            self.code_done, text = True, text[:end]
+        else:
+            # Keep what may be the start of an entity or of the closing tag for the next piece
+            cut = max(text.rfind('&'), text.rfind('<'))
+            if cut >= 0 and ';' not in text[cut:]:
+                text, self.pending = text[:cut], text[cut:]
+
+        for entity, character in HTML_ENTITIES:
+            text = text.replace(entity, character)
+        return text
+
+    def _value_end(self, pos: int) -> Optional[int]:
+        """
+        Find the end of the JSON value starting at `pos`.
+
+        Returns:
+            int: The position right after the value, or None if it is not complete yet.
+        """
+        depth = 0
+        for match in TOKEN.finditer(self.buffer, pos):
+            token = match.group()
+            if token == '"':
+                return None
+            if token in '{[':
+                depth += 1
+            elif token in '}]' or token == ',':
+                if depth == 0:
+                    return match.start()
+                if token != ',':
+                    depth -= 1
+                    if depth == 0:
+                        return match.end()
+        return None
+
+    def _check(self, key: str, order: Any, orders: List[Dict[str, Any]]) -> None:
+        """Keep a decoded order if it is valid, or quarantine it."""
+        error = order_error(order)
+        if error:
+            self.quarantined.append((key, error))
+        else:
+            orders.append(order)
+
+    def _orders(self) -> List[Dict[str, Any]]:
+        """
+        Decode the complete orders in the buffer, quarantining the malformed ones.
+
+        Orders are flat objects, so the last closing brace of the buffer usually ends
+        its last complete order, and all the orders up to it are decoded at once. When
+        that fails (at the end of the orders, or around a malformed order), the orders
+        are delimited one by one instead.
+        """
+        orders = []
+        buffer = self.buffer
+
+        cut = buffer.rfind('}')
+        if cut > self.pos:
+            try:
+                complete = ujson.loads('{' + buffer[self.pos:cut + 1].lstrip(WHITESPACE + ',') + '}')
+            except ValueError:
+                complete = None
+            if isinstance(complete, dict):
+                self.pos = cut + 1
+                for key, order in complete.items():
+                    self._check(key, order, orders)
+
+        while True:
+            end = END.match(buffer, self.pos)
+            if end is not None:
+                self.pos, self.state = end.end(), 'top'
+                return orders
+
+            key_match = KEY.match(buffer, self.pos)
+            value_end = self._value_end(key_match.end()) if key_match else None
+            if value_end is None:
+                if key_match is None and buffer[self.pos:].lstrip(WHITESPACE + ',')[:1] not in ('', '"'):
+                    raise ValueError(f'Malformed orders at character {self.pos}')
+                return orders
+
+            key = ujson.loads(key_match.group(1))
+            self.pos = value_end
+            try:
+                order = ujson.loads(buffer[key_match.end():value_end])
+            except ValueError as e:
+                self.quarantined.append((key, f'invalid JSON: {e}'))
+                continue
+            self._check(key, order, orders)
+
+    def _parse(self) -> List[IntentData]:
+        """Advance through the buffer as far as it is complete."""
+        orders = []
+        buffer = self.buffer
+
+        while self.state != 'done':
+            if self.state == 'start':
+                start = buffer.find('{', self.pos)
+                if start < 0:
+                    self.pos = len(buffer)
+                    break
+                self.pos, self.state = start + 1, 'top'
+
+            elif self.state == 'top':
+                end = END.match(buffer, self.pos)
+                if end is not None:
+                    self.pos, self.state = end.end(), 'done'
+                    break
+                key_match = KEY.match(buffer, self.pos)
+                if key_match is None or key_match.end() == len(buffer):
+                    break
+                key = ujson.loads(key_match.group(1))
+
+                if key == 'orders' and buffer[key_match.end()] == '{':
+                    self.pos, self.state = key_match.end() + 1, 'orders'
+                    continue
+                value_end = self._value_end(key_match.end())
+                if value_end is None:
+                    break
+                self.fields[key] = ujson.loads(buffer[key_match.end():value_end])
+                self.pos = value_end
+
+            elif self.state == 'orders':
+                orders.extend(self._orders())
+                if self.state == 'orders':
+                    break
+
+        # Drop the part of the buffer already parsed
+        self.buffer, self.pos = buffer[self.pos:], 0
+        return IntentData.from_orders(orders)
+
+    ###############################
+    #     Public methods          #
+    ###############################
+
+    def feed(self, text: str) -> List[IntentData]:
+        """
+        Parse the next piece of the body.
+
+        Args:
+            text (str): The next piece of the body.
+
+        Returns:
+            List[IntentData]: The intents completed by this piece, in batch order.
+
+        Raises:
+            ValueError: If the body is not a valid batch. The intents returned before stay valid.
+        """
+        if self.html:
+            text = self._unescape(text)
+        self.buffer += text
+        return self._parse()
+
+    def close(self) -> List[IntentData]:
+        """
+        Parse the rest of the body, once it has been fully fed.
+
+        Returns:
+            List[IntentData]: The intents completed by the end of the body.
+
+        Raises:
+            ValueError: If the body is truncated or is not a valid batch.
+        """
+        intents = self._parse()
+        if self.state not in ('done', 'start') or self.buffer.strip():
+            raise ValueError(f'Truncated batch ({len(self.buffer)} characters left unparsed)')
+        return intents
+
+
+async def stream_intents(chunks: AsyncIterator[str], stream: IntentStream) -> AsyncIterator[IntentData]:
+    """
+    Yield the intents of a batch as its body arrives.
+
+    Args:
+        chunks (AsyncIterator[str]): The pieces of the body, e.g., `httpx.Response.aiter_text()`.
+        stream (IntentStream): The parser, holding the quarantined orders and the other fields once done.
+
+    Yields:
+        IntentData: The valid intents, in batch order.
+    """
+    async for chunk in chunks:
+        for intent in stream.feed(chunk):
+            yield intent
+    for intent in stream.close():
+        yield intent
@@ -0,0 +1,84 @@
+# -*- encoding: utf-8 -*-
+# src/orders/tokens.py
+# Process-wide registry of tokens, interning mint addresses to small integer ids.
+
+import sys
+
+from typing import Dict, List, Optional
+
+
+class TokenRegistry:
+    """
+    Registry interning the mint address of every token seen to a small integer id.
+
+    Each token is stored once, with its symbol and decimals, and its mint address
+    and symbol strings are interned, so every intent, quote and solution trading
+    it shares the same strings and compares it by id. Ids are given in order of
+    first appearance and never change while the process runs, so the registry
+    keeps growing across batches (e.g., in daemon mode).
+
+    Attributes:
+        mints (List[str]): Mint address of each token id.
+        symbols (List[Optional[str]]): Symbol of each token id, if known.
+        decimals (List[Optional[int]]): Decimals of each token id, if known.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty TokenRegistry."""
+        self.ids: Dict[str, int] = {}
+        self.mints: List[str] = []
+        self.symbols: List[Optional[str]] = []
+        self.decimals: List[Optional[int]] = []
+
+    def __len__(self) -> int:
+        return len(self.mints)
+
+    def __contains__(self, mint: str) -> bool:
+        return mint in self.ids
+
+    ###############################
+    #     Public methods          #
+    ###############################
+
+    def intern(self, mint: str, symbol: Optional[str] = None, decimals: Optional[int] = None) -> int:
+        """
+        Return the id of a token, registering it on first sight.
+
+        The symbol and decimals are recorded the first time they are given for the token.
+
+        Args:
+            mint (str): The mint address of the token.
+            symbol (str, optional): The symbol of the token.
+            decimals (int, optional): The decimals of the token.
+
+        Returns:
+            int: The id of the token.
+        """
+        token_id = self.ids.get(mint)
+        if token_id is None:
+            token_id = self.ids[mint] = len(self.mints)
+            self.mints.append(sys.intern(mint))
+            self.symbols.append(None)
+            self.decimals.append(None)
+
+        if symbol is not None and self.symbols[token_id] is None:
+            self.symbols[token_id] = sys.intern(symbol)
+        if decimals is not None and self.decimals[token_id] is None:
+            self.decimals[token_id] = decimals
+        return token_id
+
+    def mint(self, token_id: int) -> str:
+        """Return the (interned) mint address of a token id."""
+        return self.mints[token_id]
+
+    def symbol(self, token_id: int) -> Optional[str]:
+        """Return the (interned) symbol of a token id, if known."""
+        return self.symbols[token_id]
+
+    def clear(self) -> None:
+        """Forget every token. Ids given before must not be used anymore."""
+        self.__init__()
+
+
+# The registry shared by the whole process
+TOKENS = TokenRegistry()
@@ -0,0 +1,278 @@
+# -*- encoding: utf-8 -*-
+# src/p2p/auction.py
+# Batch auction: uniform clearing price per token pair, maximizing the surplus of the batch.
+
+
+import time
+import numpy as np
+
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from scipy.optimize import milp, Bounds, LinearConstraint
+from src.agents.base import AgentBase
+from src.orders.intent import IntentData
+from src.p2p.partial_fill import Fill, IntentBook, split_pro_rata
+
+
+class BatchAuction:
+    """
+    Batch auction clearing every token pair of a batch at a uniform price.
+
+    At a given price, intents selling the base token (asks) at or below it and intents
+    selling the quote token (bids) at or above it can trade, and choosing how much of
+    each intent to fill is a linear problem: maximize the surplus of the filled intents,
+    under the constraint that the quote paid by the bids is the quote received by the
+    asks. Intents not allowing partial fills are either fully filled or not at all,
+    which makes it a mixed-integer linear problem, solved with scipy's `milp`.
+    The price itself is searched over candidates between the limit prices of the pair.
+    """
+
+    # Weight of the traded volume in the objective, to break ties between fills with no surplus
+    VOLUME_WEIGHT = 1e-6
+
+    def __init__(self, price_candidates: int = 16, time_limit: Optional[float] = None):
+        """
+        Initialize the BatchAuction.
+
+        Args:
+            price_candidates (int, optional): Maximum number of prices tried per token pair.
+            time_limit (float, optional): Seconds to clear the whole batch. None for no limit.
+        """
+        self.price_candidates = price_candidates
+        self.time_limit = time_limit
+        self.deadline = None
+        self.limits = {}
+
+    #####################################################
+    #                  Private methods
+    #####################################################
+
+    def candidate_prices(self, asks: List[IntentData], bids: List[IntentData]) -> List:
+        """
+        Prices worth trying for a token pair, in quote token per base token.
+
+        Between two consecutive limit prices the set of intents that can trade does not
+        change, so one price per interval is enough: its midpoint, which leaves every
+        intent that trades some room above its limit price for the rounding of the fills.
+        Only the intervals where some ask and some bid cross are kept, and they are
+        subsampled down to `price_candidates`.
+
+        Args:
+            asks (List[IntentData]): The intents selling the base token.
+            bids (List[IntentData]): The intents selling the quote token.
+
+        Returns:
+            List[Fraction]: The candidate prices, in increasing order.
+        """
+        if not asks or not bids:
+            return []
+
+        low = min(self.limits[id(intent)][0] for intent in asks)
+        high = max(self.limits[id(intent)][0] for intent in bids)
+        if low > high:
+            return []
+
+        limits = sorted({self.limits[id(intent)][0] for intent in asks if self.limits[id(intent)][0] <= high} |
+                        {self.limits[id(intent)][0] for intent in bids if self.limits[id(intent)][0] >= low})
+        if len(limits) == 1:
+            return limits
+
+        midpoints = [(a + b) / 2 for a, b in zip(limits, limits[1:])]
+        if len(midpoints) > self.price_candidates:
+            picks = np.linspace(0, len(midpoints) - 1, self.price_candidates).round().astype(int)
+            midpoints = [midpoints[i] for i in sorted(set(picks))]
+        return midpoints
+
+    def relaxation(self, asks: List[IntentData], bids: List[IntentData], price) -> Tuple[float, np.ndarray]:
+        """
+        Fill a token pair at a given price, allowing partial fills of every intent.
+
+        Without integer constraints, the problem has a closed-form optimum: the side of the
+        pair offering the least quote is fully filled, and the other side fills it with its
+        intents with the most surplus per quote first.
+
+        Args:
+            asks (List[IntentData]): The intents selling the base token that can trade at the price.
+            bids (List[IntentData]): The intents selling the quote token that can trade at the price.
+            price (Fraction): The price, in quote token per base token.
+
+        Returns:
+            float, np.ndarray: The objective, and the fractions filled of the asks, then the bids.
+        """
+        surplus, volume = self.objective(asks, bids, price)
+        gain = surplus + self.VOLUME_WEIGHT * volume
+
+        fractions = np.zeros(len(asks) + len(bids))
+        sides = (slice(0, len(asks)), slice(len(asks), len(asks) + len(bids)))
+        traded = min(volume[sides[0]].sum(), volume[sides[1]].sum())
+
+        for side in sides:
+            # Fill the intents with the most gain per quote first, up to the traded quote
+            order = np.argsort(-gain[side] / volume[side], kind='stable')
+            before = np.concatenate([[0], np.cumsum(volume[side][order])[:-1]])
+            fractions[side][order] = np.clip((traded - before) / volume[side][order], 0, 1)
+
+        return float(gain @ fractions), fractions
+
+    def objective(self, asks: List[IntentData], bids: List[IntentData], price) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Surplus and quote volume of fully filling each intent at a given price.
+
+        Asks get more than their limit price per base sold, and bids pay less than their
+        limit price per base bought. Both are measured in quote token.
+
+        Returns:
+            np.ndarray, np.ndarray: The surplus and the volume of the asks, then the bids.
+        """
+        price = float(price)
+        ask_amounts = np.array([intent.source_amount for intent in asks], dtype=np.float64)
+        bid_amounts = np.array([intent.source_amount for intent in bids], dtype=np.float64)
+        ask_limits = np.array([self.limits[id(intent)][1] for intent in asks])
+        bid_limits = np.array([self.limits[id(intent)][1] for intent in bids])
+
+        surplus = np.concatenate([(price - ask_limits) * ask_amounts, (1 - price / bid_limits) * bid_amounts])
+        volume = np.concatenate([price * ask_amounts, bid_amounts])
+        return surplus, volume
+
+    def solve_at(self, asks: List[IntentData], bids: List[IntentData], price) -> Tuple[float, np.ndarray]:
+        """
+        Fill a token pair at a given price, maximizing the surplus.
+
+        Args:
+            asks (List[IntentData]): The intents selling the base token that can trade at the price.
+            bids (List[IntentData]): The intents selling the quote token that can trade at the price.
+            price (Fraction): The price, in quote token per base token.
+
+        Returns:
+            float, np.ndarray: The objective, and the fractions filled of the asks, then the bids.
+        """
+        integrality = np.array([0 if intent.partial_fill else 1 for intent in asks + bids])
+        if not integrality.any():
+            return self.relaxation(asks, bids, price)
+
+        surplus, volume = self.objective(asks, bids, price)
+        gain = surplus + self.VOLUME_WEIGHT * volume
+        scale = volume.max()
+
+        # The quote received by the asks is the quote paid by the bids
+        balance = np.concatenate([volume[:len(asks)], -volume[len(asks):]]) / scale
+
+        options = {}
+        if self.deadline is not None:
+            options['time_limit'] = max(self.deadline - time.monotonic(), 1e-3)
+
+        result = milp(-gain / scale,
+                      constraints=LinearConstraint(balance, 0, 0),
+                      integrality=integrality,
+                      bounds=Bounds(0, 1),
+                      options=options)
+        if result.x is None:
+            return 0, np.zeros(len(asks) + len(bids))
+        return float(gain @ result.x), result.x
+
+    @staticmethod
+    def to_fills(filled: List[Tuple[IntentData, float]], base_token: int) -> List[Fill]:
+        """
+        Round the fractions filled to integer fills, balancing each token exactly.
+
+        Each side of the pair receives what the other side gives, split pro-rata to what it gives.
+
+        Args:
+            filled (List[Tuple[IntentData, float]]): The (intent, fraction filled) of a token pair.
+            base_token (int): The id of the base token of the pair.
+
+        Returns:
+            List[Fill]: The fills of the asks, then of the bids.
+        """
+        given = {id(intent): intent.source_amount if not intent.partial_fill
+                 else min(round(fraction * intent.source_amount), intent.source_amount)
+                 for intent, fraction in filled}
+        asks = [intent for intent, _ in filled if intent.source_token_id == base_token and given[id(intent)]]
+        bids = [intent for intent, _ in filled if intent.source_token_id != base_token and given[id(intent)]]
+
+        base_volume = sum(given[id(intent)] for intent in asks)
+        quote_volume = sum(given[id(intent)] for intent in bids)
+
+        fills = []
+        for side, received_volume in ((asks, quote_volume), (bids, base_volume)):
+            side_given = [given[id(intent)] for intent in side]
+            fills.extend(zip(side, side_given, split_pro_rata(received_volume, side_given)))
+        return fills
+
+    def clear_pair(self, base_token: int, intents: List[IntentData]) -> List[Fill]:
+        """
+        Clear a token pair at the candidate price with the most surplus.
+
+        Rounding the fills to integer amounts may leave an intent slightly below its limit
+        price. Such intents are taken out of the pair, and the pair is cleared again.
+
+        Args:
+            base_token (int): The id of the base token of the pair.
+            intents (List[IntentData]): The intents of the pair.
+
+        Returns:
+            List[Fill]: The fills of the pair.
+        """
+        # Limit prices of the intents, in quote token per base token: (exact, float)
+        self.limits = {}
+        for intent in intents:
+            price = IntentBook.ask_price(intent) if intent.source_token_id == base_token else IntentBook.bid_price(intent)
+            self.limits[id(intent)] = (price, float(price))
+
+        while True:
+            asks = [intent for intent in intents if intent.source_token_id == base_token]
+            bids = [intent for intent in intents if intent.source_token_id != base_token]
+
+            # Try the prices by decreasing upper bound (their relaxation), until no other can do better
+            candidates = []
+            for price in self.candidate_prices(asks, bids):
+                eligible_asks = [intent for intent in asks if self.limits[id(intent)][0] <= price]
+                eligible_bids = [intent for intent in bids if self.limits[id(intent)][0] >= price]
+                if eligible_asks and eligible_bids:
+                    bound, _ = self.relaxation(eligible_asks, eligible_bids, price)
+                    candidates.append((bound, price, eligible_asks, eligible_bids))
+            candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+
+            best_gain, best_filled = 0, []
+            for bound, price, eligible_asks, eligible_bids in candidates:
+                if bound <= best_gain or (self.deadline is not None and time.monotonic() > self.deadline):
+                    break
+                gain, fractions = self.solve_at(eligible_asks, eligible_bids, price)
+                if gain > best_gain:
+                    best_gain = gain
+                    best_filled = [(intent, fraction) for intent, fraction in zip(eligible_asks + eligible_bids, fractions)
+                                   if fraction > 1e-9]
+
+            fills = self.to_fills(best_filled, base_token)
+            rejected = {id(fill[0]) for fill in fills if not IntentBook.fillable(fill)}
+            if not rejected:
+                return fills
+            intents = [intent for intent in intents if id(intent) not in rejected]
+
+    #####################################################
+    #                  Public methods
+    #####################################################
+
+    def run(self, agent: AgentBase) -> List[Fill]:
+        """
+        Clear every token pair of the batch at a uniform price.
+
+        Args:
+            agent (AgentBase): The agent whose intents are to be matched.
+
+        Returns:
+            List[Fill]: The (intent, source amount given, destination amount received) fills.
+        """
+        if self.time_limit is not None:
+            self.deadline = time.monotonic() + self.time_limit
+
+        pairs: Dict[Tuple[int, int], List[IntentData]] = defaultdict(list)
+        for intent in agent.batch.intents:
+            pairs[tuple(sorted((intent.source_token_id, intent.destination_token_id)))].append(intent)
+
+        fills = []
+        for (base_token, _), intents in pairs.items():
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                break
+            fills.extend(self.clear_pair(base_token, intents))
+        return fills
@@ -0,0 +1,302 @@
+# -*- encoding: utf-8 -*-
+# src/p2p/level_n.py
+# Level N p2p network: ring trades of 3 to N hops.
+
+
+import time
+import numpy as np
+
+from bisect import bisect_left
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from src.agents.base import AgentBase
+from src.orders.intent import IntentData
+
+
+class LevelN:
+    """
+    Ring trades (multi-hop coincidences of wants), e.g., A->B, B->C, C->A.
+
+    In a ring, every intent is paid the full source amount of the next intent, which
+    sells the token the former wants to receive. A ring is fillable when every next
+    intent pays at least the min_receive_amount of the previous one.
+    """
+
+    # Relative tolerance of the float64 amounts used to discard starting intents,
+    # erring on the side of keeping them
+    TOLERANCE = 1e-9
+
+    def __init__(self, max_hops: int = 3, time_limit: Optional[float] = None):
+        """
+        Initialize the LevelN search.
+
+        Args:
+            max_hops (int, optional): Maximum number of intents in a ring (at least 3).
+            time_limit (float, optional): Seconds to search the whole batch. None for no limit.
+        """
+        self.max_hops = max_hops
+        self.time_limit = time_limit
+        self.deadline = None
+        self.index = {}
+        self.destinations = {}
+        self.slots = {}
+        self.used = set()
+
+    #####################################################
+    #                  Private methods
+    #####################################################
+
+    @staticmethod
+    def prune_intents(intents: List[IntentData]) -> List[Tuple[int, IntentData]]:
+        """
+        Drop the intents that cannot belong to any ring.
+
+        An intent can only be in a ring if some intent sells its destination token and
+        some intent buys its source token. Dropping intents may strand others, so the
+        pruning is repeated until no intent is dropped.
+
+        Args:
+            intents (List[IntentData]): The intents to prune.
+
+        Returns:
+            List[Tuple[int, IntentData]]: The remaining (position in `intents`, intent).
+        """
+        candidates = list(enumerate(intents))
+        while True:
+            sold = {intent.source_token_id for _, intent in candidates}
+            bought = {intent.destination_token_id for _, intent in candidates}
+            remaining = [(position, intent) for position, intent in candidates
+                         if intent.destination_token_id in sold and intent.source_token_id in bought]
+            if len(remaining) == len(candidates):
+                return remaining
+            candidates = remaining
+
+    @staticmethod
+    def distances_to(token: int, pairs: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+        """
+        Minimum number of hops from every token to `token` in the token graph.
+
+        Args:
+            token (int): The id of the target token.
+            pairs (Iterable[Tuple[int, int]]): The (source token, destination token) edges of the graph.
+
+        Returns:
+            Dict[int, int]: token id -> hops to `token`. Tokens that cannot reach it are missing.
+        """
+        sellers_of = defaultdict(set)
+        for source, destination in pairs:
+            sellers_of[destination].add(source)
+
+        distances = {token: 0}
+        queue = deque([token])
+        while queue:
+            current = queue.popleft()
+            for seller in sellers_of[current]:
+                if seller not in distances:
+                    distances[seller] = distances[current] + 1
+                    queue.append(seller)
+        return distances
+
+    def _index_intents(self, candidates: List[Tuple[int, IntentData]]) -> None:
+        """Bucket the intents by token pair, sorted by source amount."""
+        buckets = defaultdict(list)
+        for position, intent in candidates:
+            buckets[(intent.source_token_id, intent.destination_token_id)].append((position, intent))
+
+        self.index, self.destinations, self.slots = {}, defaultdict(list), {}
+        for (source, destination), bucket in buckets.items():
+            bucket.sort(key=lambda item: item[1].source_amount)
+
+            # For every suffix of the bucket, its intent asking the least in return (the smallest one on ties)
+            cheapest = [None] * (len(bucket) + 1)
+            for i in range(len(bucket) - 1, -1, -1):
+                best = cheapest[i + 1]
+                if best is None or bucket[i][1].min_receive_amount <= best[1].min_receive_amount:
+                    best = bucket[i]
+                cheapest[i] = best
+                self.slots[bucket[i][0]] = ((source, destination), i)
+
+            self.index[(source, destination)] = ([intent.source_amount for _, intent in bucket], bucket, cheapest)
+            self.destinations[source].append(destination)
+
+    def _use(self, position: int) -> None:
+        """Mark an intent as used, replacing it in the suffixes of its bucket where it was the cheapest."""
+        self.used.add(position)
+        pair, i = self.slots[position]
+        _, bucket, cheapest = self.index[pair]
+        removed = bucket[i]
+
+        # The suffixes where it was the cheapest are contiguous and end at its own
+        while i >= 0 and cheapest[i] is removed:
+            best = cheapest[i + 1]
+            if bucket[i][0] not in self.used and (best is None or
+                                                  bucket[i][1].min_receive_amount <= best[1].min_receive_amount):
+                best = bucket[i]
+            cheapest[i] = best
+            i -= 1
+
+    def _routes_to(self, token: int) -> Tuple[list, dict]:
+        """
+        Precompute the token pairs that can extend or close a ring starting with `token`.
+
+        Returns:
+            list: hops left -> {token: [(destination, amounts, cheapest)]}, for the pairs whose
+                  destination can get back to `token` within the hops left.
+            dict: {token: (amounts, cheapest)}, for the pairs closing the ring.
+        """
+        distances = self.distances_to(token, self.index)
+        routes = []
+        for hops_left in range(self.max_hops):
+            routes.append({
+                source: [(destination, self.index[(source, destination)][0], self.index[(source, destination)][2])
+                         for destination in destinations
+                         if destination != token and distances.get(destination, self.max_hops) <= hops_left]
+                for source, destinations in self.destinations.items()
+            })
+        closers = {source: (amounts, cheapest) for (source, destination), (amounts, _, cheapest) in self.index.items()
+                   if destination == token}
+        return routes, closers
+
+    def _closable(self, candidates: List[Tuple[int, IntentData]]) -> Set[int]:
+        """
+        Find the intents that can start a ring, while no intent is used yet.
+
+        This runs the search of `_search` for all the starting intents of a token at once,
+        skipping the checks for repeated intents, so it may keep a few intents with no ring
+        but never discards an intent with one. Intents only get used over time, so the 
+        discarded intents never have a ring later either.
+
+        Args:
+            candidates (List[Tuple[int, IntentData]]): The (position, intent) to check.
+
+        Returns:
+            Set[int]: The positions of the intents that may start a ring.
+        """
+        token_ids = {token: i for i, token in enumerate(self.destinations)}
+        pairs = {}
+        for (source, destination), (amounts, bucket, _) in self.index.items():
+            wanted = np.array([intent.min_receive_amount for _, intent in bucket], dtype=np.float64)
+            cheapest = np.append(np.minimum.accumulate(wanted[::-1])[::-1], np.inf)
+            pairs[(token_ids[source], token_ids[destination])] = (np.array(amounts, dtype=np.float64), cheapest)
+
+        starts_by_token = defaultdict(list)
+        for position, intent in candidates:
+            starts_by_token[token_ids[intent.source_token_id]].append((position, intent))
+
+        closable = set()
+        for token, starts in starts_by_token.items():
+            paid = np.array([intent.source_amount for _, intent in starts], dtype=np.float64) * (1 + self.TOLERANCE)
+
+            # Amount wanted by the partial rings of each starting intent, at each token
+            wanted = np.full((len(starts), len(token_ids)), np.inf)
+            wanted[np.arange(len(starts)), [token_ids[intent.destination_token_id] for _, intent in starts]] = \
+                np.array([intent.min_receive_amount for _, intent in starts], dtype=np.float64) * (1 - self.TOLERANCE)
+
+            found = np.zeros(len(starts), dtype=bool)
+            for length in range(2, self.max_hops + 1):
+                extended = np.full_like(wanted, np.inf)
+                for (source, destination), (amounts, cheapest) in pairs.items():
+                    if destination == token:
+                        if length >= 3:
+                            found |= cheapest[np.searchsorted(amounts, wanted[:, source])] <= paid
+                    elif length < self.max_hops:
+                        np.minimum(extended[:, destination], cheapest[np.searchsorted(amounts, wanted[:, source])],
+                                   out=extended[:, destination])
+                wanted = extended
+
+            closable.update(position for (position, _), ok in zip(starts, found) if ok)
+        return closable
+
+    def _search(self, start: Tuple[int, IntentData], routes: list, closers: dict) -> Optional[List[Tuple[int, IntentData]]]:
+        """
+        Search the shortest fillable ring starting with the intent `start`.
+
+        Rings are extended one hop at a time, keeping for each token only the partial ring
+        asking the least in return (the one most likely to be closed). Among the intents of
+        a token pair paying enough, only the one asking the least in return is tried: any 
+        ring through another one is still fillable with it instead.
+        """
+        intent = start[1]
+
+        # Partial rings by the token they want to receive: token -> (amount wanted, ring)
+        frontier = {intent.destination_token_id: (intent.min_receive_amount, (start,))}
+
+        for length in range(2, self.max_hops + 1):
+            extended = {}
+            extensions = routes[self.max_hops - length]
+
+            for current, (min_amount, ring) in frontier.items():
+                # Close the ring, if the start pays enough and no intent is repeated
+                if length >= 3 and current in closers:
+                    amounts, cheapest = closers[current]
+                    candidate = cheapest[bisect_left(amounts, min_amount)]
+                    if (candidate is not None and intent.source_amount >= candidate[1].min_receive_amount and
+                            len({position for position, _ in ring + (candidate,)}) == length):
+                        return list(ring) + [candidate]
+
+                for destination, amounts, cheapest in extensions.get(current, ()):
+                    candidate = cheapest[bisect_left(amounts, min_amount)]
+                    if candidate is not None and (destination not in extended or
+                                                  candidate[1].min_receive_amount < extended[destination][0]):
+                        extended[destination] = (candidate[1].min_receive_amount, ring + (candidate,))
+
+            frontier = extended
+            if not frontier:
+                break
+
+        return None
+
+    #####################################################
+    #                  Public methods
+    #####################################################
+
+    def run(self, agent: AgentBase) -> List[List[IntentData]]:
+        """
+        P2P ring trades strategy using a pruned breadth-first search.
+
+        Intents that cannot close any ring are pruned first. Then, following the batch
+        order, the shortest fillable ring starting at each intent is searched, extending
+        rings only with intents that pay enough and whose destination token is close 
+        enough to close the ring within `max_hops`. Among the intents of a token pair, 
+        only the one asking the least in return is tried, so the search is bounded by 
+        max_hops * (number of tokens)^2 lookups per starting intent. The intents that
+        cannot start any ring are discarded beforehand, all at once (see `_closable`).
+        Rings are disjoint: the intents of a ring are not used by the next ones.
+        Past `time_limit`, the search stops and the rings found so far are returned.
+
+        Args:
+            agent (AgentBase): The agent whose intents are to be matched.
+
+        Returns:
+            List[List[IntentData]]: A list of rings, each listing its intents in ring order.
+        """
+        rings = []
+        if self.max_hops < 3:
+            return rings
+        if self.time_limit is not None:
+            self.deadline = time.monotonic() + self.time_limit
+
+        candidates = self.prune_intents(agent.batch.intents)
+        self._index_intents(candidates)
+        self.used = set()
+        closable = self._closable(candidates)
+        routes = {}
+
+        for start in candidates:
+            position, intent = start
+            if position in self.used or position not in closable:
+                continue
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                break
+
+            token = intent.source_token_id
+            if token not in routes:
+                routes[token] = self._routes_to(token)
+
+            ring = self._search(start, *routes[token])
+            if ring:
+                rings.append([intent for _, intent in ring])
+                for position, _ in ring:
+                    self._use(position)
+
+        return rings
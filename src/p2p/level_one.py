@@ -3,8 +3,11 @@
 # Level one p2p network: 1 hop away.
 
 
-from typing import List, Optional
+import numpy as np
+
+from typing import List, Tuple
 from src.agents.base import AgentBase
+from src.orders.columnar import IntentBatch
 from src.orders.intent import IntentData
 from src.utils.logging import log_info
 
@@ -24,35 +27,71 @@ class LevelOne:
         return (intent_1.source_amount >= intent_2.min_receive_amount and
                 intent_2.source_amount >= intent_1.min_receive_amount)
 
+    @staticmethod
+    def match_columns(columns: IntentBatch) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the 1-hop matches of a columnar batch, a whole token pair at a time.
+
+        For every intent of a pair, the counterparties paying enough form a suffix of the
+        opposite bucket sorted by source amount. All these (intent, counterparty) candidates
+        are laid out at once, and the ones asking more than the intent pays are masked out.
+
+        Args:
+            columns (IntentBatch): The intents of the batch.
+
+        Returns:
+            np.ndarray, np.ndarray: The rows of the two intents of each match, the first
+                                    being the lowest, sorted by (first row, second row).
+        """
+        groups = columns.pair_groups()
+        firsts, seconds = [], []
+
+        for (source, destination), rows in groups.items():
+            if source >= destination or (destination, source) not in groups:
+                continue
+
+            counterparties = groups[(destination, source)]
+            counterparties = counterparties[np.argsort(columns.source_amount[counterparties], kind='stable')]
+            starts = np.searchsorted(columns.source_amount[counterparties], columns.min_receive_amount[rows])
+
+            # One candidate per (intent, counterparty in its suffix)
+            counts = len(counterparties) - starts
+            intents = np.repeat(rows, counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            candidates = counterparties[np.repeat(starts, counts) + offsets]
+
+            fillable = columns.min_receive_amount[candidates] <= columns.source_amount[intents]
+            intents, candidates = intents[fillable], candidates[fillable]
+            firsts.append(np.minimum(intents, candidates))
+            seconds.append(np.maximum(intents, candidates))
+
+        if not firsts:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        firsts, seconds = np.concatenate(firsts), np.concatenate(seconds)
+        order = np.lexsort((seconds, firsts))
+        return firsts[order], seconds[order]
+
     #####################################################
     #                  Public methods
     #####################################################
 
     def run(self, agent: AgentBase) -> List[List[IntentData]]:
         """
-        P2P 1-hop away strategy using a naive neighbors search approach.
+        P2P 1-hop away strategy using a hash-indexed neighbors search approach.
+
+        Intents are bucketed by (source token, destination token), so each intent is
+        only compared with the opposite-direction bucket of its pair. Within that
+        bucket, counterparties are sorted by source amount, so the ones that cannot
+        pay the intent's min_receive_amount are skipped with a binary search. The
+        search runs on the columnar view of the batch (see `match_columns`).
 
         Args:
             agent (AgentBase): The agent whose intents are to be matched.
 
         Returns:
-            List[List[IntentData]]: A list of pairs of intents that are 1-hop away p2p matches.
+            List[List[IntentData]]: A list of pairs of intents that are 1-hop away p2p matches,
+                                    in the order they appear in the batch.
         """
-        p2p_matches = []
-        intents = agent.batch.intents.copy()
-
-        for i, intent_1 in enumerate(intents):
-            source_1 = intent_1.source_token  
-            destination_1 = intent_1.destination_token
-
-            for j, intent_2 in enumerate(intents[i+1:], start=i+1):
-                source_2 = intent_2.source_token 
-                destination_2 = intent_2.destination_token 
-
-                # Conditions check: token pair
-                if (source_1 == destination_2 and destination_1 == source_2):
-                    # Checks if the two intents fully overlap
-                    if LevelOne.both_fillable(intent_1, intent_2):
-                        p2p_matches.append([intent_1, intent_2])
-
-        return p2p_matches if p2p_matches else []
+        intents = agent.batch.intents
+        firsts, seconds = self.match_columns(IntentBatch.from_intents(intents))
+        return [[intents[i], intents[j]] for i, j in zip(firsts.tolist(), seconds.tolist())]
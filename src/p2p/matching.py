@@ -0,0 +1,104 @@
+# -*- encoding: utf-8 -*-
+# src/p2p/matching.py
+# Selection of disjoint p2p matches among the candidate pairs.
+
+import numpy as np
+
+from typing import List
+from collections import defaultdict
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+from src.orders.intent import IntentData
+from src.utils.maths import calculate_surplus
+
+
+def match_surplus(match: List[IntentData]) -> int:
+    """Sum of the surplus of the users of a p2p match (a pair or a ring), each paid by the next one."""
+    return sum(calculate_surplus(match[(position + 1) % len(match)].source_amount, intent.min_receive_amount)
+               for position, intent in enumerate(match))
+
+
+def greedy_matching(p2p_matches: List[List[IntentData]]) -> List[List[IntentData]]:
+    """
+    Select disjoint matches greedily, by decreasing surplus.
+
+    E.g., [(1,2), (3,4), (2,5)] -> [(1,2), (3,4)], where (1,2) has the best overall surplus.
+
+    Args:
+        p2p_matches (List[List[IntentData]]): The candidate pairs of intents.
+
+    Returns:
+        List[List[IntentData]]: The selected matches, sorted by decreasing surplus.
+    """
+    processed_intent_ids = set()
+    selected = []
+
+    for match in sorted(p2p_matches, key=match_surplus, reverse=True):
+        intent_a, intent_b = match
+        if intent_a.intent_id in processed_intent_ids or intent_b.intent_id in processed_intent_ids:
+            continue
+        selected.append(match)
+        processed_intent_ids.update({intent_a.intent_id, intent_b.intent_id})
+
+    return selected
+
+
+def optimal_matching(p2p_matches: List[List[IntentData]]) -> List[List[IntentData]]:
+    """
+    Select the disjoint matches with the highest total surplus (maximum-weight matching).
+
+    A 1-hop match always pairs an A->B intent with a B->A intent, so the candidates
+    form one bipartite graph per token pair, each solved exactly as a sparse assignment
+    problem (see `_solve_bipartite`). Among the selections with the highest surplus,
+    the one with the most matches is kept.
+
+    Args:
+        p2p_matches (List[List[IntentData]]): The candidate pairs of intents.
+
+    Returns:
+        List[List[IntentData]]: The selected matches, sorted by decreasing surplus.
+    """
+    # Split the candidates by token pair, orienting every match as (A->B, B->A)
+    graphs = defaultdict(list)
+    for intent_a, intent_b in p2p_matches:
+        if intent_a.source_token_id > intent_b.source_token_id:
+            intent_a, intent_b = intent_b, intent_a
+        graphs[(intent_a.source_token_id, intent_b.source_token_id)].append([intent_a, intent_b])
+
+    selected = []
+    for edges in graphs.values():
+        selected.extend(_solve_bipartite(edges))
+
+    selected.sort(key=match_surplus, reverse=True)
+    return selected
+
+
+def _solve_bipartite(edges: list) -> list:
+    """
+    Maximum-weight matching of one bipartite graph of candidate matches.
+
+    Every left intent gets a dummy partner of its own, so that a full matching always
+    exists and an unmatched intent is explicit, and only the candidates are stored
+    (a sparse graph). A candidate weighs its surplus plus a bonus: the bonuses of all
+    the matches add up to less than 1, so they only break ties between selections of
+    equal (integer) surplus, e.g., keeping the candidates without any surplus.
+    """
+    left, right = {}, {}
+    rows, columns, weights = [], [], []
+    for intent_a, intent_b in edges:
+        rows.append(left.setdefault(id(intent_a), len(left)))
+        columns.append(right.setdefault(id(intent_b), len(right)))
+        weights.append(match_surplus((intent_a, intent_b)))
+    edge_index = {(row, column): k for k, (row, column) in enumerate(zip(rows, columns))}
+
+    # Weights must not be zero, or they would not be edges: dummy partners weigh 1
+    bonus = 1 / (2 * (len(left) + 1))
+    dummies = np.arange(len(left))
+    graph = csr_matrix((np.concatenate([np.asarray(weights, dtype=np.float64) + 1 + bonus, np.ones(len(left))]),
+                        (np.concatenate([rows, dummies]), np.concatenate([columns, len(right) + dummies]))),
+                       shape=(len(left), len(right) + len(left)))
+
+    matched_rows, matched_columns = min_weight_full_bipartite_matching(graph, maximize=True)
+    return [edges[edge_index[(row, column)]]
+            for row, column in zip(matched_rows.tolist(), matched_columns.tolist()) if column < len(right)]
@@ -0,0 +1,289 @@
+# -*- encoding: utf-8 -*-
+# src/p2p/partial_fill.py
+# Partial-fill p2p matching: per-pair intent books crossed at a uniform price.
+
+
+import math
+import time
+
+from bisect import insort
+from fractions import Fraction
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+from src.agents.base import AgentBase
+from src.orders.intent import IntentData
+
+
+# A fill of an intent: (intent, source amount given, destination amount received)
+Fill = Tuple[IntentData, int, int]
+
+
+def split_pro_rata(total: int, weights: List[int]) -> List[int]:
+    """
+    Split an integer amount proportionally to some weights, by largest remainder.
+
+    Args:
+        total (int): The amount to split.
+        weights (List[int]): The weights of the shares.
+
+    Returns:
+        List[int]: The shares, adding up to `total`.
+    """
+    weight = sum(weights)
+    if not weight:
+        return [0] * len(weights)
+
+    shares, remainders = [], []
+    for i, w in enumerate(weights):
+        share, remainder = divmod(total * w, weight)
+        shares.append(share)
+        remainders.append((remainder, i))
+
+    for _, i in sorted(remainders, reverse=True)[:total - sum(shares)]:
+        shares[i] += 1
+    return shares
+
+
+class IntentBook:
+    """
+    Book of the partial-fill intents of a token pair.
+
+    Intents selling the base token (asks) are sorted by increasing limit price, and
+    intents selling the quote token (bids) by decreasing limit price, where prices
+    are in quote token per base token. The book is crossed at a uniform price: every
+    ask at or below it and every bid at or above it trades at that price.
+    """
+
+    def __init__(self, base_token: int, quote_token: int) -> None:
+        """
+        Initialize the IntentBook.
+
+        Args:
+            base_token (int): The id of the base token.
+            quote_token (int): The id of the quote token.
+        """
+        self.base_token = base_token
+        self.quote_token = quote_token
+        self.asks = []
+        self.bids = []
+
+    #####################################################
+    #                  Private methods
+    #####################################################
+
+    @staticmethod
+    def ask_price(intent: IntentData) -> Fraction:
+        """Lowest price (quote per base) an intent selling the base token accepts."""
+        return Fraction(intent.min_receive_amount, intent.source_amount)
+
+    @staticmethod
+    def bid_price(intent: IntentData) -> Fraction:
+        """Highest price (quote per base) an intent selling the quote token accepts."""
+        return Fraction(intent.source_amount, max(intent.min_receive_amount, 1))
+
+    def clearing_price(self) -> Tuple[Optional[Fraction], int, int]:
+        """
+        Find the uniform price maximizing the traded volume of base token.
+
+        Taking the k cheapest asks and the l most generous bids, the price can be anywhere
+        between the highest of these asks and the lowest of these bids. For every k, the
+        most bids are taken and the price that trades the most is kept: the one where supply
+        and demand meet, if any, or else the one closest to it.
+
+        Returns:
+            Fraction, int, int: The price, the number of asks and the number of bids crossed.
+                                The price is None when the book does not cross.
+        """
+        best = (0, None, 0, 0)
+        supply = 0
+        bid_prices = [price for price, _ in self.bids]
+
+        # Quote paid by the l most generous bids
+        paid = [0]
+        for _, intent in self.bids:
+            paid.append(paid[-1] + intent.source_amount)
+
+        l = len(self.bids)
+        for k, (low, intent) in enumerate(self.asks, start=1):
+            supply += intent.source_amount
+            while l and bid_prices[l - 1] < low:
+                l -= 1
+            if not l:
+                break
+
+            high, demand = bid_prices[l - 1], paid[l]
+            crossing = Fraction(demand, supply)
+            if crossing >= high:
+                price, volume = (low + high) / 2, supply
+            elif crossing >= low:
+                price, volume = crossing, supply
+            else:
+                price, volume = low, demand / low
+
+            if volume > best[0]:
+                best = (volume, price, k, l)
+
+        return best[1:]
+
+    @staticmethod
+    def allocate(asks: List[IntentData], bids: List[IntentData], price: Fraction) -> List[Fill]:
+        """
+        Fill the crossed intents at a uniform price.
+
+        The short side of the book is fully filled, and the long side is filled pro-rata to
+        the source amounts of its intents. Each side receives what the other side gives,
+        split pro-rata to what it gives.
+
+        Args:
+            asks (List[IntentData]): The crossed intents selling the base token.
+            bids (List[IntentData]): The crossed intents selling the quote token.
+            price (Fraction): The clearing price, in quote token per base token.
+
+        Returns:
+            List[Fill]: The fills of the asks, then of the bids.
+        """
+        supply = sum(intent.source_amount for intent in asks)
+        demand = sum(intent.source_amount for intent in bids)
+
+        if supply * price <= demand:
+            base_volume, quote_volume = supply, math.floor(supply * price)
+        else:
+            base_volume, quote_volume = math.floor(demand / price), demand
+
+        fills = []
+        for side, given_volume, received_volume in ((asks, base_volume, quote_volume),
+                                                    (bids, quote_volume, base_volume)):
+            given = split_pro_rata(given_volume, [intent.source_amount for intent in side])
+            received = split_pro_rata(received_volume, given)
+            fills.extend(zip(side, given, received))
+        return fills
+
+    @staticmethod
+    def fillable(fill: Fill) -> bool:
+        """Checks if a fill gives something and respects the limit price of its intent."""
+        intent, given, received = fill
+        return given > 0 and received * intent.source_amount >= intent.min_receive_amount * given
+
+    #####################################################
+    #                  Public methods
+    #####################################################
+
+    def add(self, intent: IntentData) -> None:
+        """Add an intent of the pair to its side of the book."""
+        if intent.source_token_id == self.base_token:
+            insort(self.asks, (self.ask_price(intent), intent), key=lambda item: item[0])
+        else:
+            insort(self.bids, (self.bid_price(intent), intent), key=lambda item: -item[0])
+
+    def cross(self) -> List[Fill]:
+        """
+        Cross the book at its clearing price.
+
+        Rounding the fills to integer amounts may leave the marginal intents slightly below
+        their limit price. These intents are taken out of the book and the book is crossed
+        again, until every fill respects its limit price.
+
+        Returns:
+            List[Fill]: The fills of the crossed intents, fully or partially filled.
+        """
+        while True:
+            price, k, l = self.clearing_price()
+            if price is None:
+                return []
+
+            asks = [intent for _, intent in self.asks[:k]]
+            bids = [intent for _, intent in self.bids[:l]]
+            fills = self.allocate(asks, bids, price)
+
+            rejected = {id(intent) for intent, given, received in fills if not self.fillable((intent, given, received))}
+            if not rejected:
+                return fills
+
+            self.asks = [item for item in self.asks if id(item[1]) not in rejected]
+            self.bids = [item for item in self.bids if id(item[1]) not in rejected]
+
+
+class PartialFill:
+
+    def __init__(self, time_limit: Optional[float] = None):
+        """
+        Initialize the PartialFill strategy.
+
+        Args:
+            time_limit (float, optional): Seconds to cross all the books of the batch. None for no limit.
+        """
+        self.time_limit = time_limit
+        self.deadline = None
+
+    #####################################################
+    #                  Private methods
+    #####################################################
+
+    @staticmethod
+    def build_books(intents: List[IntentData]) -> Dict[Tuple[int, int], IntentBook]:
+        """
+        Build the books of the partial-fill intents, one per token pair.
+
+        Args:
+            intents (List[IntentData]): The intents of the batch.
+
+        Returns:
+            Dict: (base token id, quote token id) -> IntentBook, the base token being the lowest id of the pair.
+        """
+        books = {}
+        for intent in intents:
+            if not intent.partial_fill:
+                continue
+            pair = tuple(sorted((intent.source_token_id, intent.destination_token_id)))
+            if pair not in books:
+                books[pair] = IntentBook(*pair)
+            books[pair].add(intent)
+        return books
+
+    @staticmethod
+    def residual(intent: IntentData, given: int) -> Optional[IntentData]:
+        """
+        The part of an intent left unfilled, keeping its limit price.
+
+        Args:
+            intent (IntentData): The partially filled intent.
+            given (int): The source amount already filled.
+
+        Returns:
+            IntentData: The residual intent, or None if the intent was fully filled.
+        """
+        remaining = intent.source_amount - given
+        if remaining <= 0:
+            return None
+        return replace(intent,
+                       source_amount=remaining,
+                       min_receive_amount=-(-intent.min_receive_amount * remaining // intent.source_amount))
+
+    #####################################################
+    #                  Public methods
+    #####################################################
+
+    def run(self, agent: AgentBase) -> List[Fill]:
+        """
+        P2P partial-fill strategy: crossing a book per token pair at a uniform price.
+
+        Only the intents allowing partial fills are considered. Each book is crossed at
+        the price trading the most volume (see `IntentBook.clearing_price`), the short side
+        of the book being fully filled and the long side pro-rata. Past `time_limit`, the
+        books left are not crossed.
+
+        Args:
+            agent (AgentBase): The agent whose intents are to be matched.
+
+        Returns:
+            List[Fill]: The (intent, source amount given, destination amount received) fills.
+        """
+        if self.time_limit is not None:
+            self.deadline = time.monotonic() + self.time_limit
+
+        fills = []
+        for book in self.build_books(agent.batch.intents).values():
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                break
+            fills.extend(book.cross())
+        return fills
@@ -4,13 +4,14 @@
 
 import os
 import json
+import asyncio
 
 from typing import Dict, Any
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from src.protocol_server.utils.file_operations import load_data, save_data
+from src.protocol_server.utils.file_operations import load_data, load_raw_data, save_data
 
 
 app = FastAPI()
@@ -23,6 +24,59 @@ SOLUTIONS_FILE_PATH = os.path.join(os.path.dirname(__file__), "orderbook/solutio
 # Mount the static directory
 app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), name="static")
 
+# Websocket subscribers, by topic
+SUBSCRIBERS: Dict[str, set] = {}
+
+# Set (and replaced) every time a new batch is posted, to wake up long-polls
+BATCH_UPDATED = {"event": asyncio.Event()}
+
+# Upper bound for the long-poll wait requested by the clients
+MAX_LONG_POLL_SECONDS = 60
+
+
+def batch_etag() -> str:
+    """Return a cheap validator of the current batch, from the batch file metadata."""
+    try:
+        stat = os.stat(BATCHES_FILE_PATH)
+    except FileNotFoundError:
+        return '"empty"'
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def prefers_json(accept: str) -> bool:
+    """Whether an Accept header ranks application/json strictly above text/html (e.g., agents, not browsers)."""
+    quality = {}
+    for media_range in accept.split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        quality[media_type.lower()] = max(q, quality.get(media_type.lower(), 0.0))
+
+    json_q = quality.get("application/json", quality.get("application/*", quality.get("*/*", 0.0)))
+    html_q = quality.get("text/html", quality.get("text/*", quality.get("*/*", 0.0)))
+    return json_q > html_q
+
+
+def notify_batch_update():
+    """Wake up the requests long-polling for a new batch."""
+    event = BATCH_UPDATED["event"]
+    BATCH_UPDATED["event"] = asyncio.Event()
+    event.set()
+
+
+async def publish(topic: str, data: Dict[str, Any]):
+    """Push data to every websocket subscribed to a topic."""
+    for websocket in list(SUBSCRIBERS.get(topic, ())):
+        try:
+            await websocket.send_json({"topic": topic, "data": data})
+        except Exception:
+            SUBSCRIBERS[topic].discard(websocket)
+
 
 @app.get("/")
 def say_hi(request: Request):
@@ -32,12 +86,41 @@ def say_hi(request: Request):
 
 # API for the batches endpoint
 @app.get("/batches")
-def get_orderbook(request: Request):
-    """Get all items."""
+async def get_orderbook(request: Request, wait: float = 0):
+    """
+    Get all items.
+
+    Supports conditional requests: if the If-None-Match header matches the current
+    ETag, a 304 with no body is returned. With `wait` > 0, the request is held
+    until a new batch is posted or `wait` seconds have passed (long-polling).
+
+    Clients preferring application/json in their Accept header (i.e., agents) get
+    the raw JSON of the batch, served as stored; browsers get the HTML page.
+    """
     try:
+        if_none_match = request.headers.get("If-None-Match")
+        updated = BATCH_UPDATED["event"]
+        etag = batch_etag()
+
+        if if_none_match == etag and wait > 0:
+            try:
+                await asyncio.wait_for(updated.wait(), timeout=min(wait, MAX_LONG_POLL_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+            etag = batch_etag()
+
+        headers = {"ETag": etag, "Vary": "Accept"}
+        if if_none_match == etag:
+            return Response(status_code=304, headers=headers)
+
+        if prefers_json(request.headers.get("Accept", "")):
+            return Response(content=load_raw_data(BATCHES_FILE_PATH), media_type="application/json",
+                            headers=headers)
+
         data = load_data(BATCHES_FILE_PATH)
         pretty_data = json.dumps(data, indent=4)
-        return templates.TemplateResponse("batches.html", {"request": request, "data": pretty_data})
+        return templates.TemplateResponse("batches.html", {"request": request, "data": pretty_data},
+                                          headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -49,6 +132,9 @@ async def post_solutions(request: Request):
         body = await request.json()
         # Save data to the file
         save_data(BATCHES_FILE_PATH,body)
+        # Push the new batch to the subscribers
+        notify_batch_update()
+        await publish("batches", body)
         # Build the full URL of the endpoint
         full_url = str(request.url)
         return JSONResponse(content={"message": f"Data successfully posted at {full_url}"}, status_code=201) 
@@ -84,3 +170,28 @@ async def post_solutions(request: Request):
         raise HTTPException(status_code=400, detail=f"Error decoding JSON: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
+# Websocket API for the batches topic
+@app.websocket("/ws")
+async def subscribe(websocket: WebSocket):
+    """Subscribe to a topic, e.g., {"method": "subscribe", "topic": "batches"}."""
+    await websocket.accept()
+    request = await websocket.receive_json()
+    topic = request.get("topic")
+    await websocket.send_json({"result": "subscribed", "topic": topic})
+
+    # Send the batch currently in the orderbook, if any
+    if topic == "batches":
+        data = load_data(BATCHES_FILE_PATH)
+        if data:
+            await websocket.send_json({"topic": topic, "data": data})
+
+    SUBSCRIBERS.setdefault(topic, set()).add(websocket)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        SUBSCRIBERS[topic].discard(websocket)
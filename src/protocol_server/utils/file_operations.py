@@ -22,6 +22,14 @@ def load_data(file_path: str) -> Dict[str, Any]:
             raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 
+def load_raw_data(file_path: str) -> bytes:
+    """Load the raw bytes of a given JSON file path, to serve them without decoding."""
+    if not os.path.exists(file_path):
+        return b"{}"
+    with open(file_path, "rb") as file:
+        return file.read()
+
+
 def save_data(file_path: str, data: Dict[str, Any]):
     """Save data overwriting on a given JSON file path."""
     with open(file_path, "w") as file:
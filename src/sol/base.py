@@ -10,7 +10,9 @@ from solders.pubkey import Pubkey
 from solders.keypair import Keypair
 from solana.rpc.api import Client
 from solana.rpc.async_api import AsyncClient
-from src.utils.config import load_config, log_debug
+from src.utils.config import load_config
+from src.utils.limits import RATE_LIMITS
+from src.utils.logging import log_debug
 
 
 class SolanaBase:
@@ -18,6 +20,7 @@ class SolanaBase:
     def __init__(self, config: dict = None, is_async: bool = False) -> None:
 
         self.config = config or load_config()
+        RATE_LIMITS.configure(self.config)
         self.rpc_https = self.config['SOLANA_RPC_HTTPS']
         self.privkey = self.config['WALLET_PRIVATE_KEY']
 
@@ -0,0 +1,202 @@
+# -*- encoding: utf-8 -*-
+# src/utils/breakers.py
+# Process-wide circuit breakers and adaptive timeouts, one per host.
+
+import time
+import httpx
+
+from collections import deque
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from src.utils.logging import log_error, log_info
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+
+class LatencyWindow:
+    """Latencies of the last `size` requests, with their percentiles."""
+
+    def __init__(self, size: int = 256) -> None:
+        self.latencies = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self.latencies)
+
+    def observe(self, latency: float) -> None:
+        """Record the latency of a request."""
+        self.latencies.append(latency)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Return a percentile (0 to 100) of the latencies, or None if there are none."""
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(int(len(latencies) * percentile / 100), len(latencies) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker and adaptive timeout of the requests to a host.
+
+    The circuit opens after `failure_threshold` consecutive failures (errors, timeouts or
+    5xx responses): requests then fail fast with a `CircuitOpenError`, instead of waiting
+    for a sick host. After `cooldown` seconds, the circuit is half-open: a single probe
+    request is let through, closing the circuit if it succeeds, or opening it again.
+
+    Once `min_samples` requests succeeded, their read timeout adapts to the recent latency
+    of the host: `timeout_multiplier` times its 99th percentile, at least `min_timeout`,
+    and never more than the configured timeout.
+
+    Attributes:
+        state (str): 'closed', 'open' or 'half-open'.
+        failures (int): Consecutive failures.
+        opened (int): Times the circuit opened.
+        rejected (int): Requests failed fast while the circuit was open.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, host: str = '', failure_threshold: int = 5, cooldown: float = 5,
+                 timeout_multiplier: float = 4, min_timeout: float = 0.5, min_samples: int = 20) -> None:
+        """
+        Initialize a closed CircuitBreaker.
+
+        Args:
+            host (str, optional): The host, for the logs.
+            failure_threshold (int, optional): Consecutive failures opening the circuit. 0 never opens it.
+            cooldown (float, optional): Seconds before probing a host whose circuit is open.
+            timeout_multiplier (float, optional): Read timeout, in multiples of the 99th percentile latency. 0 disables adaptive timeouts.
+            min_timeout (float, optional): Shortest adaptive read timeout, in seconds.
+            min_samples (int, optional): Latencies needed before adapting the timeout.
+        """
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.min_samples = min_samples
+        self.latencies = LatencyWindow()
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+        self.opened = 0
+        self.rejected = 0
+
+    def _open(self) -> None:
+        if self.state != self.OPEN:
+            self.opened += 1
+            log_error(f'Circuit to {self.host} is open after {self.failures} failure(s): '
+                      f'failing fast for {self.cooldown}s.')
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probing = False
+
+    def allow(self) -> bool:
+        """Check whether a request may be sent, taking the probe of a half-open circuit."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                self.rejected += 1
+                return False
+            self.state = self.HALF_OPEN
+
+        if self.state == self.HALF_OPEN:
+            if self.probing:
+                self.rejected += 1
+                return False
+            self.probing = True
+        return True
+
+    def record_success(self, latency: float) -> None:
+        """Record a request answered after `latency` seconds, closing the circuit."""
+        self.latencies.observe(latency)
+        self.failures = 0
+        if self.state != self.CLOSED:
+            log_info(f'Circuit to {self.host} is closed again.')
+        self.state = self.CLOSED
+        self.probing = False
+
+    def record_failure(self) -> None:
+        """Record a failed request, opening the circuit past the threshold or on a failed probe."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (0 < self.failure_threshold <= self.failures):
+            self._open()
+
+    def release(self) -> None:
+        """Forget a request given up by its caller, before it succeeded or failed."""
+        self.probing = False
+
+    def timeout(self, default: float) -> float:
+        """Return the read timeout of the next request, given the configured one."""
+        if self.timeout_multiplier <= 0 or len(self.latencies) < self.min_samples:
+            return default
+        return min(default, max(self.min_timeout, self.timeout_multiplier * self.latencies.percentile(99)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the state of the circuit, its openings and rejected requests, and the 99th percentile latency."""
+        return {
+            'state': self.state,
+            'opened': self.opened,
+            'rejected': self.rejected,
+            'p99_latency': self.latencies.percentile(99),
+        }
+
+
+class CircuitBreakers:
+    """
+    Registry of the circuit breakers of the hosts (venues, oracles, orderbook).
+
+    Attributes:
+        failure_threshold (int): Consecutive failures opening a circuit (0 never opens it).
+        cooldown (float): Seconds before probing a host whose circuit is open.
+        timeout_multiplier (float): Adaptive read timeout, in multiples of the 99th percentile latency (0 disables it).
+        min_timeout (float): Shortest adaptive read timeout, in seconds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 5, timeout_multiplier: float = 4,
+                 min_timeout: float = 0.5) -> None:
+        """Initialize a CircuitBreakers registry without breakers."""
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def configure(self, config: dict) -> None:
+        """
+        Set the thresholds from the configuration, for the breakers created afterwards.
+
+        Args:
+            config (dict): The configuration, see `load_config`.
+        """
+        self.failure_threshold = config['CIRCUIT_FAILURE_THRESHOLD']
+        self.cooldown = config['CIRCUIT_COOLDOWN_SECONDS']
+        self.timeout_multiplier = config['HTTP_ADAPTIVE_TIMEOUT_MULTIPLIER']
+        self.min_timeout = config['HTTP_ADAPTIVE_TIMEOUT_MIN_SECONDS']
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Return the breaker of the host of a URL, creating it on first use."""
+        host = urlsplit(url).netloc
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            breaker = self.breakers[host] = CircuitBreaker(host, self.failure_threshold, self.cooldown,
+                                                           self.timeout_multiplier, self.min_timeout)
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the metrics of the breaker of each host."""
+        return {host: breaker.stats() for host, breaker in self.breakers.items()}
+
+    def reset(self) -> None:
+        """Forget the breakers, closing every circuit."""
+        self.breakers.clear()
+
+
+# The circuit breakers shared by the whole process
+BREAKERS = CircuitBreakers()
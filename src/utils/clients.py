@@ -0,0 +1,285 @@
+# -*- encoding: utf-8 -*-
+# src/utils/clients.py
+# Process-wide registry of pooled HTTP clients, one per host.
+
+import time
+import httpx
+import asyncio
+import weakref
+import importlib.util
+
+from typing import AsyncIterator, Callable, Dict
+from urllib.parse import urlsplit
+
+from src.utils.limits import RATE_LIMITS
+from src.utils.breakers import BREAKERS, CircuitBreaker, CircuitOpenError
+from src.utils.logging import log_debug, log_error
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Body of a response, calling `release` once it is closed (i.e., its connection is free again)."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]) -> None:
+        self.stream = stream
+        self.release = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            if self.release is not None:
+                self.release()
+                self.release = None
+
+
+def _rate_limited(response: httpx.Response) -> bool:
+    """Check whether a response tells that the host's rate limit was exceeded."""
+    return response.status_code == 429 or (response.status_code == 503 and 'Retry-After' in response.headers)
+
+
+def _guard(request: httpx.Request, default_timeout: float) -> CircuitBreaker:
+    """
+    Take the go-ahead of the circuit breaker of the host of a request, adapting its read timeout.
+
+    Only requests keeping the client's timeout get an adaptive one: those setting their own
+    (e.g., long polls) keep it.
+
+    Raises:
+        CircuitOpenError: If the circuit of the host is open.
+    """
+    breaker = BREAKERS.breaker(str(request.url))
+    if not breaker.allow():
+        raise CircuitOpenError(f'Circuit to {request.url.host} is open', request=request)
+    timeouts = request.extensions.get('timeout')
+    if timeouts and timeouts.get('read') == default_timeout:
+        request.extensions['timeout'] = dict(timeouts, read=breaker.timeout(default_timeout))
+    return breaker
+
+
+def _observe(breaker: CircuitBreaker, response: httpx.Response, latency: float) -> None:
+    """Record the outcome of a request in the circuit breaker of its host: server errors count as failures."""
+    if response.status_code >= 500 and not _rate_limited(response):
+        breaker.record_failure()
+    else:
+        breaker.record_success(latency)
+
+
+class _PacedTransport(httpx.HTTPTransport):
+    """
+    Transport pacing its requests with the token bucket of their host, retrying the rate-limited
+    ones (see `RateLimiter`), behind the circuit breaker of their host (see `CircuitBreaker`).
+    """
+
+    def __init__(self, timeout: float = None, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.timeout = timeout
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        for attempt in range(RATE_LIMITS.max_retries + 1):
+            RATE_LIMITS.bucket(url).acquire_sync()
+            breaker = _guard(request, self.timeout)
+            start = time.monotonic()
+            try:
+                response = super().handle_request(request)
+            except httpx.TransportError:
+                breaker.record_failure()
+                raise
+            except BaseException:
+                breaker.release()
+                raise
+            _observe(breaker, response, time.monotonic() - start)
+
+            if not _rate_limited(response) or attempt == RATE_LIMITS.max_retries:
+                return response
+            response.close()
+            seconds = RATE_LIMITS.backoff(url, attempt, response.headers.get('Retry-After'))
+            log_debug(f'Rate limit exceeded at {request.url.host}, retrying in {seconds:.2f}s...')
+
+
+class _GatedTransport(httpx.AsyncHTTPTransport):
+    """
+    Transport letting at most `max_in_flight` requests into its connection pool at once.
+
+    The pool of httpcore checks every connection and every queued request each time
+    a request starts or ends, so it slows down as requests queue up in it (e.g., all
+    the quotes of a large batch sent at once). Extra requests wait on a semaphore instead.
+    Requests are also paced with the token bucket of their host, and the rate-limited
+    ones are retried (see `RateLimiter`), behind the circuit breaker of their host
+    (see `CircuitBreaker`).
+    """
+
+    def __init__(self, max_in_flight: int, timeout: float = None, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.gate = asyncio.Semaphore(max_in_flight)
+        self.timeout = timeout
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        # Waiting at the gate can be cancelled (e.g., a hedge that lost), so the breaker's
+        # go-ahead (maybe its only probe) is only taken once through it
+        await self.gate.acquire()
+        try:
+            breaker = _guard(request, self.timeout)
+        except BaseException:
+            self.gate.release()
+            raise
+        start = time.monotonic()
+        try:
+            response = await super().handle_async_request(request)
+        except httpx.TransportError:
+            self.gate.release()
+            breaker.record_failure()
+            raise
+        except BaseException:
+            self.gate.release()
+            breaker.release()
+            raise
+        _observe(breaker, response, time.monotonic() - start)
+        response.stream = _ReleasingStream(response.stream, self.gate.release)
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        for attempt in range(RATE_LIMITS.max_retries + 1):
+            await RATE_LIMITS.bucket(url).acquire()
+            response = await self._send(request)
+            if not _rate_limited(response) or attempt == RATE_LIMITS.max_retries:
+                return response
+            await response.aclose()
+            seconds = RATE_LIMITS.backoff(url, attempt, response.headers.get('Retry-After'))
+            log_debug(f'Rate limit exceeded at {request.url.host}, retrying in {seconds:.2f}s...')
+
+
+class HttpClients:
+    """
+    Registry of shared HTTP clients, each keeping a pool of connections to one host.
+
+    Requests to the same host (e.g., every quote sent to a venue) reuse the
+    connections of the same client, kept alive between requests, instead of
+    paying for a new TCP (and TLS) handshake, and for a new SSL context, each
+    time. Each host gets its own pool, so a slow venue cannot exhaust the
+    connections of the others. Async requests beyond `max_connections` wait
+    for a free connection outside of the pool (see `_GatedTransport`).
+
+    Async clients are bound to the event loop that created them, so they are
+    kept per loop (e.g., `asyncio.run` in tests, or the agent's own loop).
+
+    Attributes:
+        max_connections (int): Maximum open connections per host.
+        max_keepalive_connections (int): Maximum idle connections kept alive per host.
+        keepalive_expiry (float): Seconds an idle connection is kept alive.
+        http2 (bool): Whether to negotiate HTTP/2 (needs the `h2` package).
+        timeout (float): Seconds before a request times out.
+    """
+
+    def __init__(self, max_connections: int = 16, max_keepalive_connections: int = 16,
+                 keepalive_expiry: float = 30, http2: bool = False, timeout: float = 10) -> None:
+        """Initialize an empty HttpClients registry."""
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        self.timeout = timeout
+
+        self.clients: Dict[str, httpx.Client] = {}
+        self.async_clients = weakref.WeakKeyDictionary()
+
+    ###########################
+    #     Private methods     #
+    ###########################
+
+    @staticmethod
+    def _host(url: str) -> str:
+        """Return the origin (scheme, host and port) of a URL, which keys its pool."""
+        parts = urlsplit(url)
+        return f'{parts.scheme}://{parts.netloc}'
+
+    def _limits(self) -> httpx.Limits:
+        """Return the limits of the pool of a new client."""
+        if self.http2 and importlib.util.find_spec('h2') is None:
+            log_error('HTTP_HTTP2 is set, but the h2 package is not installed: falling back to HTTP/1.1')
+            self.http2 = False
+
+        return httpx.Limits(max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive_connections,
+                            keepalive_expiry=self.keepalive_expiry)
+
+    ###############################
+    #     Public methods          #
+    ###############################
+
+    def configure(self, config: dict) -> None:
+        """
+        Set the pool limits from the configuration.
+
+        Clients already created keep their limits until they are closed. The rate limits
+        and circuit breakers of the hosts are set as well (see `RateLimiter` and `CircuitBreakers`).
+
+        Args:
+            config (dict): The configuration, see `load_config`.
+        """
+        self.max_connections = config['HTTP_MAX_CONNECTIONS']
+        self.max_keepalive_connections = config['HTTP_MAX_KEEPALIVE_CONNECTIONS']
+        self.keepalive_expiry = config['HTTP_KEEPALIVE_SECONDS']
+        self.http2 = config['HTTP_HTTP2']
+        self.timeout = config['HTTP_TIMEOUT_SECONDS']
+        RATE_LIMITS.configure(config)
+        BREAKERS.configure(config)
+
+    def get(self, url: str) -> httpx.Client:
+        """
+        Return the (blocking) client of the host of a URL, creating it on first use.
+
+        Args:
+            url (str): A URL of the host.
+
+        Returns:
+            httpx.Client: The shared client.
+        """
+        host = self._host(url)
+        client = self.clients.get(host)
+        if client is None or client.is_closed:
+            log_debug(f'Opening a connection pool to {host}')
+            transport = _PacedTransport(self.timeout, limits=self._limits(), http2=self.http2)
+            client = self.clients[host] = httpx.Client(transport=transport, timeout=self.timeout)
+        return client
+
+    def get_async(self, url: str) -> httpx.AsyncClient:
+        """
+        Return the async client of the host of a URL for the running event loop, creating it on first use.
+
+        Args:
+            url (str): A URL of the host.
+
+        Returns:
+            httpx.AsyncClient: The shared client.
+        """
+        clients = self.async_clients.setdefault(asyncio.get_running_loop(), {})
+        host = self._host(url)
+        client = clients.get(host)
+        if client is None or client.is_closed:
+            log_debug(f'Opening an async connection pool to {host}')
+            transport = _GatedTransport(self.max_connections, self.timeout, limits=self._limits(),
+                                         http2=self.http2)
+            client = clients[host] = httpx.AsyncClient(transport=transport, timeout=self.timeout)
+        return client
+
+    def close(self) -> None:
+        """Close the blocking clients and their connections."""
+        for client in self.clients.values():
+            client.close()
+        self.clients.clear()
+
+    async def aclose(self) -> None:
+        """Close the async clients of the running event loop and their connections."""
+        clients = self.async_clients.pop(asyncio.get_running_loop(), {})
+        for client in clients.values():
+            await client.aclose()
+
+
+# The registry shared by the whole process
+HTTP_CLIENTS = HttpClients()
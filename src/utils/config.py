@@ -34,6 +34,7 @@ def load_config() -> dict:
     config['LOG_LEVEL'] = os.getenv('LOG_LEVEL')
     config['SOLANA_NETWORK'] = os.getenv('SOLANA_NETWORK')
     config['SOLANA_RPC_HTTPS'] = os.getenv('SOLANA_RPC_HTTPS')
+    config['SOLANA_RPC_WSS'] = os.getenv('SOLANA_RPC_WSS') or (config['SOLANA_RPC_HTTPS'] or '').replace('http', 'ws', 1)
     config['TX_EXPLORER'] = os.getenv('TX_EXPLORER')
     config['URANI_ORDERBOOK_HTTPS_URL'] = os.getenv('URANI_ORDERBOOK_HTTPS_URL')
     config['URANI_ORDERBOOK_WS_URL'] = os.getenv('URANI_ORDERBOOK_WS_URL')
@@ -46,6 +47,17 @@ def load_config() -> dict:
     config['MULDER_TYPE_OF_CONNECTION'] = os.getenv('MULDER_TYPE_OF_CONNECTION')
     config['MULDER_UPDATE_SECONDS'] = int(os.getenv('MULDER_UPDATE_SECONDS'))
     config['MULDER_MAX_INSTANCES'] = int(os.getenv('MULDER_MAX_INSTANCES'))
+    config['MULDER_PIPELINE_DEPTH'] = int(os.getenv('MULDER_PIPELINE_DEPTH', 2))
+    config['MULDER_POLL_MIN_SECONDS'] = float(os.getenv('MULDER_POLL_MIN_SECONDS', 0.05))
+    config['MULDER_LONG_POLL_SECONDS'] = float(os.getenv('MULDER_LONG_POLL_SECONDS', 0))
+    config['MULDER_BATCH_DEADLINE_SECONDS'] = float(os.getenv('MULDER_BATCH_DEADLINE_SECONDS', 5))
+    config['MULDER_STREAM_BATCHES'] = os.getenv('MULDER_STREAM_BATCHES', 'true').lower() in ['true', '1', 'yes']
+
+    # P2P
+    config['P2P_MATCHING_ENGINE'] = os.getenv('P2P_MATCHING_ENGINE', 'greedy')
+    config['P2P_RING_MAX_HOPS'] = int(os.getenv('P2P_RING_MAX_HOPS', 3))
+    config['P2P_PARTIAL_FILL'] = os.getenv('P2P_PARTIAL_FILL', 'true').lower() in ['true', '1', 'yes']
+    config['P2P_AUCTION_PRICE_CANDIDATES'] = int(os.getenv('P2P_AUCTION_PRICE_CANDIDATES', 16))
 
     # Liquidity Providers Endpoints
     config['JUPITER_HTTPS'] = os.getenv('JUPITER_HTTPS')
@@ -97,12 +109,44 @@ def load_config() -> dict:
     config['SPACER_FILE'] = os.getenv('SPACER_FILE')
     config['WEBSOCKET_DELAY'] = os.getenv('WEBSOCKET_DELAY')
     config['WEBSOCKET_TIMEOUT'] = os.getenv('WEBSOCKET_TIMEOUT')
-    config['RATE_LIMIT_MAX_RETRIES'] = os.getenv('RATE_LIMIT_MAX_RETRIES')
-    config['RATE_LIMIT_DELAY'] = os.getenv('RATE_LIMIT_DELAY')
+    config['RATE_LIMIT_MAX_RETRIES'] = int(os.getenv('RATE_LIMIT_MAX_RETRIES', 5))
+    config['RATE_LIMIT_DELAY'] = float(os.getenv('RATE_LIMIT_DELAY', 5))
+    config['RATE_LIMIT_RPS'] = float(os.getenv('RATE_LIMIT_RPS', 0))
+    config['RATE_LIMIT_BURST'] = float(os.getenv('RATE_LIMIT_BURST', 10))
+    config['RATE_LIMIT_HOST_RPS'] = {
+        host.strip(): float(rate) for host, _, rate in
+        (pair.partition('=') for pair in os.getenv('RATE_LIMIT_HOST_RPS', '').split(',') if pair.strip())
+    }
     config['SWAP_RETRIES'] = os.getenv('SWAP_RETRIES')
     config['SWAP_SLEEP_TIME'] = os.getenv('SWAP_SLEEP_TIME')
     config['ACCEPTABLE_SLIPPAGE'] = os.getenv('ACCEPTABLE_SLIPPAGE')
+    config['QUOTE_MAX_ATTEMPTS'] = int(os.getenv('QUOTE_MAX_ATTEMPTS', 3))
+    config['QUOTE_RETRY_BUDGET'] = float(os.getenv('QUOTE_RETRY_BUDGET', 0.2))
+    config['QUOTE_BACKOFF_SECONDS'] = float(os.getenv('QUOTE_BACKOFF_SECONDS', 0.1))
+    config['QUOTE_BACKOFF_MAX_SECONDS'] = float(os.getenv('QUOTE_BACKOFF_MAX_SECONDS', 2))
+    config['QUOTE_CACHE_TTL_SECONDS'] = float(os.getenv('QUOTE_CACHE_TTL_SECONDS', 2))
+    config['QUOTE_CACHE_MAX_ENTRIES'] = int(os.getenv('QUOTE_CACHE_MAX_ENTRIES', 4096))
+    config['QUOTE_CACHE_MAX_SLOT_AGE'] = int(os.getenv('QUOTE_CACHE_MAX_SLOT_AGE', 5))
+    config['QUOTE_CACHE_BUCKET_BPS'] = float(os.getenv('QUOTE_CACHE_BUCKET_BPS', 0))
+    config['QUOTE_HEDGE_PERCENTILE'] = float(os.getenv('QUOTE_HEDGE_PERCENTILE', 95))
+    config['QUOTE_HEDGE_BUDGET'] = float(os.getenv('QUOTE_HEDGE_BUDGET', 0.05))
+    config['ROUTING_NETTING'] = os.getenv('ROUTING_NETTING', 'true').lower() in ['true', '1', 'yes']
+    config['ROUTING_VENUES'] = [venue.strip().lower() for venue in os.getenv('ROUTING_VENUES', 'jupiter').split(',') if venue.strip()]
+    config['ROUTING_QUORUM'] = int(os.getenv('ROUTING_QUORUM', 0))
+    config['ROUTING_TIMEOUT_SECONDS'] = float(os.getenv('ROUTING_TIMEOUT_SECONDS', 0.5))
+    config['ROUTING_LOCAL_QUOTES'] = os.getenv('ROUTING_LOCAL_QUOTES', 'false').lower() in ['true', '1', 'yes']
+    config['ROUTING_LOCAL_SCREEN_BPS'] = float(os.getenv('ROUTING_LOCAL_SCREEN_BPS', 100))
+    config['ROUTING_POOLS'] = [pool.strip().split(':') for pool in os.getenv('ROUTING_POOLS', '').split(',') if pool.strip()]
     config['COMPUTER_UNIT_PRICE'] = os.getenv('COMPUTER_UNIT_PRICE')
+    config['HTTP_MAX_CONNECTIONS'] = int(os.getenv('HTTP_MAX_CONNECTIONS', 16))
+    config['HTTP_MAX_KEEPALIVE_CONNECTIONS'] = int(os.getenv('HTTP_MAX_KEEPALIVE_CONNECTIONS', 16))
+    config['HTTP_KEEPALIVE_SECONDS'] = float(os.getenv('HTTP_KEEPALIVE_SECONDS', 30))
+    config['HTTP_HTTP2'] = os.getenv('HTTP_HTTP2', 'false').lower() in ['true', '1', 'yes']
+    config['HTTP_TIMEOUT_SECONDS'] = float(os.getenv('HTTP_TIMEOUT_SECONDS', 10))
+    config['HTTP_ADAPTIVE_TIMEOUT_MULTIPLIER'] = float(os.getenv('HTTP_ADAPTIVE_TIMEOUT_MULTIPLIER', 4))
+    config['HTTP_ADAPTIVE_TIMEOUT_MIN_SECONDS'] = float(os.getenv('HTTP_ADAPTIVE_TIMEOUT_MIN_SECONDS', 0.5))
+    config['CIRCUIT_FAILURE_THRESHOLD'] = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+    config['CIRCUIT_COOLDOWN_SECONDS'] = float(os.getenv('CIRCUIT_COOLDOWN_SECONDS', 5))
 
     # Check for missing values
     for key, value in config.items():
@@ -112,6 +156,8 @@ def load_config() -> dict:
     assert config['SOLANA_NETWORK'] in ['mainnet', 'devnet', 'testnet']
     assert config['MULDER_TYPE_OF_CONNECTION'] in ['HTTP', 'WS', 'ASYNC_HTTP', 'PUBSUB']
     assert config['LOG_LEVEL'] in ['info', 'error', 'debug']
+    assert config['P2P_MATCHING_ENGINE'] in ['greedy', 'optimal', 'auction']
+    assert config['QUOTE_MAX_ATTEMPTS'] >= 1
 
     set_logging(config['LOG_LEVEL'])
     return config
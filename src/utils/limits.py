@@ -0,0 +1,220 @@
+# -*- encoding: utf-8 -*-
+# src/utils/limits.py
+# Process-wide rate limiter, pacing the requests sent to each host with a token bucket.
+
+import time
+import random
+import asyncio
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+# Longest pause honored from a Retry-After header, in seconds
+MAX_RETRY_AFTER = 60
+
+
+def jittered_backoff(attempt: int, base: float, cap: float) -> float:
+    """Return a 'full jitter' exponential backoff delay for a retry attempt (starting at 0)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class RetryBudget:
+    """
+    Bound the total number of retries shared by a group of requests.
+
+    Retrying every failed request independently can multiply the load on a venue
+    that is already struggling. A budget caps the retries of, e.g., a whole batch.
+    """
+
+    def __init__(self, retries: int) -> None:
+        self.retries = retries
+
+    def spend(self) -> bool:
+        """Take one retry from the budget, if any is left."""
+        if self.retries <= 0:
+            return False
+        self.retries -= 1
+        return True
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header, given in seconds or as an HTTP date.
+
+    Args:
+        value (str): The header, if any.
+
+    Returns:
+        float: The seconds to wait (at most `MAX_RETRY_AFTER`), or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0), MAX_RETRY_AFTER)
+
+
+class TokenBucket:
+    """
+    Token bucket pacing the requests to a host at `rate` per second, with bursts of `burst`.
+
+    Each request takes a token, and waits for it if the bucket is empty. Tokens are
+    reserved in order, so concurrent requests are spread evenly instead of retrying
+    in a loop. The bucket can also be paused, e.g. for the Retry-After of a 429.
+
+    Attributes:
+        waits (int): Requests that had to wait for a token.
+        waited (float): Total seconds waited.
+        limited (int): Responses telling that the host's rate limit was exceeded.
+    """
+
+    def __init__(self, rate: float = 0, burst: float = 1) -> None:
+        """
+        Initialize a full TokenBucket.
+
+        Args:
+            rate (float, optional): Tokens added per second. 0 does not pace the requests.
+            burst (float, optional): Capacity of the bucket.
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self.paused_until = 0.0
+
+        self.waits = 0
+        self.waited = 0.0
+        self.limited = 0
+
+    def reserve(self) -> float:
+        """Take a token, returning the seconds to wait before using it."""
+        now = time.monotonic()
+        wait = 0.0
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate) - 1
+            self.stamp = now
+            if self.tokens < 0:
+                wait = -self.tokens / self.rate
+        wait = max(wait, self.paused_until - now)
+        if wait > 0:
+            self.waits += 1
+            self.waited += wait
+        return wait
+
+    def refund(self) -> None:
+        """Give back the token of a request that gave up waiting."""
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every request for `seconds`."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        """Wait for a token."""
+        wait = self.reserve()
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.refund()
+                raise
+
+    def acquire_sync(self) -> None:
+        """Wait for a token, blocking the caller."""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """
+    Rate limiter keeping a token bucket per host (e.g., the Solana RPC, or a venue).
+
+    Requests are paced up front, at `rate` per second by default, or at the rate given for
+    their host in `host_rates`. A response telling that the limit was exceeded pauses the
+    whole host, for its Retry-After if any, or else for a jittered exponential backoff
+    from `delay` seconds, and the request is retried up to `max_retries` times.
+
+    Attributes:
+        rate (float): Requests per second to each host (0 not to pace them).
+        burst (float): Requests sent at once before pacing starts.
+        host_rates (Dict[str, float]): Rates of specific hosts, by host name.
+        max_retries (int): Retries of a rate-limited request.
+        delay (float): Base backoff, in seconds, when a host does not send a Retry-After.
+    """
+
+    def __init__(self, rate: float = 0, burst: float = 1, host_rates: Dict[str, float] = None,
+                 max_retries: int = 5, delay: float = 5) -> None:
+        """Initialize a RateLimiter without buckets."""
+        self.rate = rate
+        self.burst = burst
+        self.host_rates = host_rates or {}
+        self.max_retries = max_retries
+        self.delay = delay
+
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def configure(self, config: dict) -> None:
+        """
+        Set the rates and retries from the configuration.
+
+        Buckets already created keep their rate until they are reset.
+
+        Args:
+            config (dict): The configuration, see `load_config`.
+        """
+        self.rate = config['RATE_LIMIT_RPS']
+        self.burst = config['RATE_LIMIT_BURST']
+        self.host_rates = config['RATE_LIMIT_HOST_RPS']
+        self.max_retries = config['RATE_LIMIT_MAX_RETRIES']
+        self.delay = config['RATE_LIMIT_DELAY']
+
+    def bucket(self, url: str) -> TokenBucket:
+        """Return the bucket of the host of a URL, creating it on first use."""
+        host = urlsplit(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = TokenBucket(self.host_rates.get(host.split(':')[0], self.rate), self.burst)
+        return bucket
+
+    def backoff(self, url: str, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Pause the host of a URL after it rate limited a request.
+
+        Args:
+            url (str): The URL of the rate-limited request.
+            attempt (int): The attempt that was rate limited, starting at 0.
+            retry_after (str, optional): The Retry-After header of the response.
+
+        Returns:
+            float: The seconds the host is paused for.
+        """
+        seconds = parse_retry_after(retry_after)
+        if seconds is None:
+            seconds = jittered_backoff(attempt, self.delay, self.delay * 2 ** self.max_retries)
+        bucket = self.bucket(url)
+        bucket.limited += 1
+        bucket.pause(seconds)
+        return seconds
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return the metrics of each host: requests that waited, seconds waited and rate-limited responses."""
+        return {host: {'waits': bucket.waits, 'waited': bucket.waited, 'limited': bucket.limited}
+                for host, bucket in self.buckets.items()}
+
+    def reset(self) -> None:
+        """Forget the buckets, e.g. after a change of rates."""
+        self.buckets.clear()
+
+
+# The rate limiter shared by the whole process
+RATE_LIMITS = RateLimiter()
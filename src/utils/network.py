@@ -3,21 +3,27 @@
 # Helper functions for network operations.
 
 
-import time
+import html
 import ujson
 import httpx
 import asyncio
 import websockets
 
 from functools import wraps
-from bs4 import BeautifulSoup
+from typing import List, Union
 from urllib.parse import urljoin
 from solana.exceptions import SolanaRpcException
 
 from src.utils.config import load_config
+from src.utils.clients import HTTP_CLIENTS
+from src.utils.limits import RATE_LIMITS
 from src.utils.logging import log_debug, log_error, exit_with_error
 
 
+# Ask for the raw JSON of the batches, still accepting the HTML page from older orderbooks
+BATCH_ACCEPT_HEADERS = {'Accept': 'application/json, text/html;q=0.5'}
+
+
 async def get_async_sleep(sleep_time) -> None:
     """Async sleep function."""
     await asyncio.sleep(int(sleep_time))
@@ -43,63 +49,71 @@ def format_price(value: float) -> str:
     return "{:.2f}".format(round(value, 2))
 
 
-def get_request(url: str) -> dict:
-    """Sends a GET request to the given URL."""
+def get_request(url: str, headers: dict = None) -> dict:
+    """Sends a GET request to the given URL, through the shared client of its host."""
     try:
-        return httpx.get(url)
+        return HTTP_CLIENTS.get(url).get(url, headers=headers)
     except httpx.HTTPStatusError as e:
         log_error(f'Coud not connect to {url}: {e}')
 
+
+def extract_code_block(page: str) -> str:
+    """Return the unescaped text of the first `<code>` block of an HTML page, or None if there is none."""
+    start = page.find('<code>')
+    end = page.find('</code>', start)
+    if start < 0 or end < 0:
+        return None
+    return html.unescape(page[start + len('<code>'):end])
+
+
 def html_to_json(response: httpx.Response):
     """
     Process the HTTP response based on its content type. If the content type is JSON, 
-    format and print it. If the content type is HTML, extract and convert JSON from 
-    HTML to a formatted JSON string.
+    decode its raw bytes directly. If the content type is HTML, extract and decode 
+    the JSON of its `<code>` block.
 
     Args:
         response (httpx.Response): The HTTP response object to process.
+
+    Raises:
+        ValueError: If the body cannot be decoded, e.g., it is truncated, has no code
+                    block, or has an unknown content type.
     """
     content_type = response.headers.get('Content-Type', '')
 
     if 'application/json' in content_type:
-        # Convert the response to JSON
+        # Decode the body as is, without going through its text
         try:
-            data = response.json()
-            return data
-
-        except ujson.JSONDecodeError:
-            exit_with_error("Error decoding JSON.")
+            return get_fast_decoded_rpc_response(response.content)
+        except ujson.JSONDecodeError as e:
+            raise ValueError(f"Error decoding JSON: {e}") from e
     
     elif 'text/html' in content_type:
-        # Parse the HTML content and extract the JSON
-        soup = BeautifulSoup(response.text, 'html.parser')
-        code_block = soup.find('code')
-        if code_block:
-            try:
-                json_text = code_block.get_text(strip=True)
-                data = ujson.loads(json_text)
-                return data
-            except ujson.JSONDecodeError:
-                exit_with_error("Error decoding JSON from HTML.")
-        else:
-            exit_with_error("No JSON code block found in the HTML response.")
+        # The JSON is the (escaped) content of the page's code block
+        json_text = extract_code_block(response.text)
+        if json_text is None:
+            raise ValueError("No JSON code block found in the HTML response.")
+        try:
+            return ujson.loads(json_text)
+        except ujson.JSONDecodeError as e:
+            raise ValueError(f"Error decoding JSON from HTML: {e}") from e
     else:
-        exit_with_error("Received an unknown content type:", content_type)
-        exit_with_error(response.text)
+        raise ValueError(f"Received an unknown content type: {content_type}")
 
 
 def post_request(url, data=None, headers=None) -> dict:
-    """Wrapper for httpx package to handle POST requests."""
+    """Wrapper for httpx package to handle POST requests, through the shared client of the host."""
     if headers is None:
         headers = {'Content-Type': 'application/json'}
 
+    client = HTTP_CLIENTS.get(url)
     try:
         # If data is a dictionary or list, use the json parameter
         if isinstance(data, (dict, list)):
-            response = httpx.post(url, json=data, headers=headers)
+            response = client.post(url, json=data, headers=headers)
         else:
             # If data is a string, ensure it's valid JSON and use content parameter
-            response = httpx.post(url, content=data, headers=headers)
+            response = client.post(url, content=data, headers=headers)
     except httpx.HTTPStatusError as e:
         exit_with_error(f'Could not connect to {url}: {e}')
 
@@ -110,26 +124,37 @@ def post_request(url, data=None, headers=None) -> dict:
 
 
 async def get_async_request(url: str) -> dict:
-    """Wrapper for httpx.get() with error handling."""
+    """Wrapper for httpx.get() with error handling, through the shared client of the host."""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            return response.json()
+        response = await HTTP_CLIENTS.get_async(url).get(url)
+        return get_fast_decoded_rpc_response(response.content)
     except httpx.HTTPStatusError as e:
         log_error(f'Could not connect to {url}: {e}')
 
 
+async def get_async_response(url: str, headers: dict = None, params: dict = None,
+                             timeout: float = None, client: httpx.AsyncClient = None) -> httpx.Response:
+    """
+    Send a GET request asynchronously and return the full response.
+
+    Unlike `get_async_request`, the status code and headers are kept, which is 
+    needed for conditional requests. A client can be passed instead of the shared
+    client of the host.
+    """
+    client = client or HTTP_CLIENTS.get_async(url)
+    return await client.get(url, headers=headers, params=params, timeout=timeout)
+
+
 async def post_async_request(url: str, data: dict) -> dict:
-    """Wrapper for httpx.post() with error handling."""
+    """Wrapper for httpx.post() with error handling, through the shared client of the host."""
     try:
-      async with httpx.AsyncClient() as client:
-          response = await client.post(
-              url,
-              headers={"Content-Type": "application/json"},
-              json=data  # Use the `json` parameter to automatically set the content type
-          )
-          response.raise_for_status()  # Raises an exception for 4xx/5xx responses
-          return response.json()  # Parse JSON response
+        response = await HTTP_CLIENTS.get_async(url).post(
+            url,
+            headers={"Content-Type": "application/json"},
+            json=data  # Use the `json` parameter to automatically set the content type
+        )
+        response.raise_for_status()  # Raises an exception for 4xx/5xx responses
+        return response.json()  # Parse JSON response
     except httpx.HTTPStatusError as e:
         # Handle HTTP errors (e.g., 4xx, 5xx)
         return {"error": str(e)}
@@ -137,49 +162,92 @@ async def post_async_request(url: str, data: dict) -> dict:
         # Handle other possible exceptions
         return {"error": str(e)}
 
+
+def _retry_after(error: SolanaRpcException) -> str:
+    """Return the Retry-After header of the HTTP error behind a Solana RPC exception, if any."""
+    response = getattr(error.__cause__, 'response', None)
+    return response.headers.get('Retry-After') if response is not None else None
+
+
 def rate_limited() -> callable:
-    """Decorator to handle rate limiting in the Solana API."""
+    """
+    Decorator pacing the Solana RPC calls of a wrapper, and retrying the rate-limited ones.
 
-    RATE_LIMIT_MAX_RETRIES = 5
-    RATE_LIMIT_DELAY = 5
+    Each call first waits for a token of the bucket of the RPC host (see `RateLimiter`).
+    A call failing with an HTTP status error pauses the host for its Retry-After, if any,
+    or else for a jittered backoff from `RATE_LIMIT_DELAY`, and is retried up to
+    `RATE_LIMIT_MAX_RETRIES` times. Both blocking and async methods are supported.
+    """
 
     def decorator(client):
+        if asyncio.iscoroutinefunction(client):
+            @wraps(client)
+            async def async_wrapper(self, *args, **kwargs):
+                for attempt in range(RATE_LIMITS.max_retries + 1):
+                    await RATE_LIMITS.bucket(self.rpc_https).acquire()
+                    try:
+                        return await client(self, *args, **kwargs)
+                    except SolanaRpcException as e:
+                        if 'HTTPStatusError' not in e.error_msg:
+                            raise
+                        seconds = RATE_LIMITS.backoff(self.rpc_https, attempt, _retry_after(e))
+                        log_debug(f'Rate limit exceeded in {client.__name__}, retrying in {seconds:.2f}s...')
+                log_debug('Rate limit error. Skipping this iteration.')
+            return async_wrapper
+
         @wraps(client)
-        def wrapper(*args, **kwargs):
-            for _ in range(RATE_LIMIT_MAX_RETRIES):
+        def wrapper(self, *args, **kwargs):
+            for attempt in range(RATE_LIMITS.max_retries + 1):
+                RATE_LIMITS.bucket(self.rpc_https).acquire_sync()
                 try:
-                    return client(*args, **kwargs)
+                    return client(self, *args, **kwargs)
                 except SolanaRpcException as e:
-                    if 'HTTPStatusError' in e.error_msg:
-                        log_debug(f'Rate limit exceeded in {client.__name__}')
-                        log_debug(f'Retrying in {RATE_LIMIT_DELAY}s...')
-                        time.sleep(RATE_LIMIT_DELAY)
-                    else:
+                    if 'HTTPStatusError' not in e.error_msg:
                         raise
+                    seconds = RATE_LIMITS.backoff(self.rpc_https, attempt, _retry_after(e))
+                    log_debug(f'Rate limit exceeded in {client.__name__}, retrying in {seconds:.2f}s...')
             log_debug('Rate limit error. Skipping this iteration.')
         return wrapper
     return decorator
 
 
-async def ws_subscribe(url: str, subscription_request: dict, callback: callable, timeout: int = None, config: dict = None) -> None:
-    """Subscribe to a websocket endpoint."""
+async def ws_subscribe(url: str, subscription_request: Union[dict, List[dict]], callback: callable, timeout: int = None, config: dict = None) -> None:
+    """
+    Subscribe to a websocket endpoint.
+
+    Each message is awaited through `callback` before the next one is read, so a
+    slow consumer applies backpressure on the socket. Closed connections are
+    propagated to the caller (e.g., `ws_reloop`) so that it can reconnect.
+
+    A list of subscription requests is sent on the same connection (e.g., one Solana
+    `accountSubscribe` per account). Their responses may then arrive between the
+    notifications, so they are passed to `callback` with the other messages.
+    """
 
     if not timeout:
         config = config or load_config()
         timeout = int(config['WEBSOCKET_TIMEOUT'])
 
     async with websockets.connect(url) as ws:
-        await ws.send(ujson.dumps(subscription_request))
-        subscription_response = await ws.recv()
-        log_debug(subscription_response)
+        if isinstance(subscription_request, list):
+            for request in subscription_request:
+                await ws.send(ujson.dumps(request))
+        else:
+            await ws.send(ujson.dumps(subscription_request))
+            subscription_response = await ws.recv()
+            log_debug(subscription_response)
 
         while True:
             try:
                 message = await asyncio.wait_for(ws.recv(), timeout=timeout)
-                message = ujson.loads(message)
-                task = asyncio.create_task(callback(message))
-                await task
+            except asyncio.TimeoutError:
+                log_debug(f'No message from {url} in the last {timeout}s')
+                continue
 
+            try:
+                await callback(ujson.loads(message))
+            except websockets.ConnectionClosed:
+                raise
             except Exception as e:
                 log_error(f'Error in websocket subscription: {e}')
                 continue
@@ -199,9 +267,9 @@ async def ws_reloop(stream: callable, tag: str, websocket_delay: int = None, con
         except (websockets.ConnectionClosedError, websockets.ConnectionClosedOK) as e:
             log_error(f'Websocket connection closed: {e}. Reconecting...')
             await asyncio.sleep(websocket_delay)
-        except ConnectionError as e:
-            log_error(f'An error has occurred with {tag} websocket: {e}')
-            break
+        except (OSError, websockets.InvalidHandshake, asyncio.TimeoutError) as e:
+            log_error(f'An error has occurred with {tag} websocket: {e}. Reconnecting in {websocket_delay}s...')
+            await asyncio.sleep(websocket_delay)
 
 
 async def ws_publish(url: str, message: dict, config: dict = None) -> None:
@@ -0,0 +1,230 @@
+# tests/test_agents.py
+
+import ujson
+import asyncio
+import websockets
+
+from types import SimpleNamespace
+from src.agents.base import AgentBase
+from src.orders.batch import BatchData
+from src.utils.clients import HTTP_CLIENTS
+from tests.test_liquidity import make_config
+from tests.test_network import start_venue
+
+
+def make_agent_config(**overrides) -> dict:
+    """A configuration of an agent fetching batches from a local orderbook."""
+    return make_config('http://127.0.0.1:1', **{
+        'URANI_ORDERBOOK_HTTPS_URL': 'http://127.0.0.1:1/', 'URANI_ORDERBOOK_WS_URL': 'ws://127.0.0.1:1',
+        'URANI_BATCHES_HTTP_ENDPOINT': 'batches', 'URANI_SOLUTION_HTTP_ENDPOINT': 'solutions',
+        'URANI_BATCHES_SUB_TOPIC': 'batches', 'URANI_SOLUTIONS_SUB_TOPIC': 'solutions',
+        'MULDER_UPDATE_SECONDS': 0, 'MULDER_MAX_INSTANCES': 1, 'MULDER_TYPE_OF_CONNECTION': 'async_http',
+        'MULDER_PIPELINE_DEPTH': 1, 'MULDER_POLL_MIN_SECONDS': 0.001, 'MULDER_LONG_POLL_SECONDS': 0,
+        'MULDER_BATCH_DEADLINE_SECONDS': 0, 'MULDER_STREAM_BATCHES': False,
+        'WEBSOCKET_TIMEOUT': '10', 'WEBSOCKET_DELAY': '1',
+        **overrides})
+
+
+class StubAgent(AgentBase):
+    """
+    Agent fetching the batches of a stub feed, and recording what it solves and posts.
+
+    A batch id in `failing` makes the corresponding stage raise. The solver waits for
+    `solving` to be set, so tests can hold it.
+    """
+
+    name = 'Stub'
+
+    def __init__(self, batches: list, failing: set = (), **overrides) -> None:
+        super().__init__(make_agent_config(**overrides))
+        self.feed = list(batches)
+        self.failing = set(failing)
+        self.solving = asyncio.Event()
+        self.solving.set()
+        self.solved, self.posted = [], []
+        self.closed = False
+
+    async def next_batch(self, batch_id: str) -> BatchData:
+        if not self.feed:
+            await asyncio.Event().wait()
+        name = self.feed.pop(0)
+        if name == 'fetch-error':
+            raise ConnectionError('orderbook unreachable')
+        batch = BatchData()
+        batch.batch_id = name
+        return batch
+
+    async def solve_order(self) -> None:
+        await self.solving.wait()
+        if f'solve:{self.batch.batch_id}' in self.failing:
+            raise ValueError('no solution')
+        self.solved.append(self.batch.batch_id)
+
+    async def post_solution_http_async(self, batch: BatchData = None) -> dict:
+        if f'post:{batch.batch_id}' in self.failing:
+            raise ConnectionError('orderbook unreachable')
+        self.posted.append(batch.batch_id)
+        return {}
+
+    async def close_feeds(self) -> None:
+        self.closed = True
+        await super().close_feeds()
+
+
+async def until(condition, timeout: float = 3) -> None:
+    """Wait until a condition holds."""
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise TimeoutError
+
+
+async def run_until(agent: AgentBase, condition) -> None:
+    """Run the daemon of an agent until a condition holds, then stop it."""
+    daemon = asyncio.create_task(agent.run_daemon())
+    try:
+        await until(condition)
+    finally:
+        daemon.cancel()
+        await asyncio.gather(daemon, return_exceptions=True)
+
+
+def test_daemon_survives_failing_stages():
+    agent = StubAgent(['1', 'fetch-error', '2', '3', '4'], failing={'solve:2', 'post:3'})
+    asyncio.run(run_until(agent, lambda: agent.posted == ['1', '4']))
+
+    # Each batch goes through the stages in order, and a failure only drops its own batch
+    assert agent.solved == ['1', '3', '4']
+    assert agent.batches_seen == 4
+    assert agent.closed
+
+
+def test_daemon_fetching_is_throttled_by_the_solver():
+    agent = StubAgent([str(i) for i in range(10)], MULDER_PIPELINE_DEPTH=2)
+    agent.solving.clear()
+
+    async def hold():
+        daemon = asyncio.create_task(agent.run_daemon())
+        try:
+            # One batch in the solver, two queued and one waiting for room in the queue
+            await until(lambda: agent.batches_seen == 4)
+            await asyncio.sleep(0.05)
+            fetched = agent.batches_seen
+            agent.solving.set()
+            await until(lambda: len(agent.posted) == 10)
+        finally:
+            daemon.cancel()
+            await asyncio.gather(daemon, return_exceptions=True)
+        return fetched, daemon
+
+    fetched, daemon = asyncio.run(hold())
+    assert fetched == 4
+    assert agent.posted == [str(i) for i in range(10)]
+    assert daemon.cancelled() and agent.closed
+
+
+async def start_orderbook(batch: dict):
+    """
+    Start a local stand-in for the orderbook, serving the current batch over HTTP and on the batches topic.
+
+    As the orderbook, each subscription is confirmed and sent the current batch. `orderbook.publish(batch)`
+    sends a new batch to the subscribers, `orderbook.drop()` closes their connections, and subscriptions
+    are refused while `orderbook.down` is set. The HTTP requests are recorded in `orderbook.http.requests`.
+    """
+    orderbook = SimpleNamespace(current=batch, down=False, subscriptions=0, sockets=set())
+
+    async def handle_ws(ws):
+        if orderbook.down:
+            await ws.close()
+            return
+        request = ujson.loads(await ws.recv())
+        orderbook.subscriptions += 1
+        orderbook.sockets.add(ws)
+        try:
+            await ws.send(ujson.dumps({'result': 'subscribed', 'topic': request['topic']}))
+            await ws.send(ujson.dumps({'topic': request['topic'], 'data': orderbook.current}))
+            await ws.wait_closed()
+        finally:
+            orderbook.sockets.discard(ws)
+
+    async def publish(batch):
+        orderbook.current = batch
+        for ws in list(orderbook.sockets):
+            await ws.send(ujson.dumps({'topic': 'batches', 'data': batch}))
+
+    async def drop():
+        for ws in list(orderbook.sockets):
+            await ws.close()
+
+    async def close():
+        orderbook.ws.close()
+        orderbook.http.server.close()
+
+    orderbook.publish, orderbook.drop, orderbook.close = publish, drop, close
+    orderbook.http = await start_venue(handler=lambda query: (200, {}, orderbook.current))
+    orderbook.ws = await websockets.serve(handle_ws, '127.0.0.1', 0)
+    orderbook.ws_url = f'ws://127.0.0.1:{orderbook.ws.sockets[0].getsockname()[1]}/'
+    return orderbook
+
+
+def order_batch(batch_id: str) -> dict:
+    return {'batch_id': batch_id, 'orders': [{'id': batch_id}]}
+
+
+async def subscribed_agent(orderbook, **overrides) -> AgentBase:
+    """An agent fetching batches from the stand-in orderbook over websocket."""
+    return StubAgent([], **{'URANI_ORDERBOOK_HTTPS_URL': orderbook.http.url,
+                            'URANI_ORDERBOOK_WS_URL': orderbook.ws_url,
+                            'MULDER_TYPE_OF_CONNECTION': 'ws', **overrides})
+
+
+def test_batch_subscription_drops_batches_sent_again_on_reconnect():
+
+    async def subscribe():
+        orderbook = await start_orderbook(order_batch('1'))
+        agent = await subscribed_agent(orderbook, MULDER_UPDATE_SECONDS=3)
+        try:
+            first = await asyncio.wait_for(agent.fetch_batch(), 5)
+
+            # The orderbook sends its current batch again to the new subscription
+            await orderbook.drop()
+            await until(lambda: agent.batch_subscriber.duplicates == 1, timeout=5)
+            await orderbook.publish(order_batch('2'))
+            second = await asyncio.wait_for(agent.fetch_batch(), 5)
+            return first, second, orderbook.subscriptions, orderbook.http.requests
+        finally:
+            await agent.close_feeds()
+            await orderbook.close()
+            await HTTP_CLIENTS.aclose()
+
+    first, second, subscriptions, polls = asyncio.run(subscribe())
+    assert (first['batch_id'], second['batch_id']) == ('1', '2')
+    assert subscriptions == 2
+    assert polls == []
+
+
+def test_batches_are_polled_while_the_subscription_is_down():
+
+    async def fall_back():
+        orderbook = await start_orderbook(order_batch('1'))
+        orderbook.down = True
+        agent = await subscribed_agent(orderbook, MULDER_UPDATE_SECONDS=0.05)
+        try:
+            polled = await asyncio.wait_for(agent.fetch_batch(), 5)
+            polls = len(orderbook.http.requests)
+
+            # Once subscribed again, the batch already polled is not received twice
+            orderbook.down = False
+            await until(lambda: agent.batch_subscriber.duplicates == 1, timeout=5)
+            await orderbook.publish(order_batch('2'))
+            pushed = await asyncio.wait_for(agent.fetch_batch(), 5)
+            return polled, pushed, polls, len(orderbook.http.requests)
+        finally:
+            await agent.close_feeds()
+            await orderbook.close()
+            await HTTP_CLIENTS.aclose()
+
+    polled, pushed, polls, polls_after = asyncio.run(fall_back())
+    assert (polled['batch_id'], pushed['batch_id']) == ('1', '2')
+    assert polls >= 1 and polls_after == polls
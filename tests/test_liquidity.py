@@ -0,0 +1,697 @@
+# tests/test_liquidity.py
+
+import re
+import time
+import ujson
+import base58
+import base64
+import pytest
+import asyncio
+import numpy as np
+import websockets
+
+from types import SimpleNamespace
+from solders.keypair import Keypair
+from src.agents.aleph import Aleph
+from src.liquidity.amm import (MAX_TICK, MIN_TICK, AmmSimulator, ConcentratedLiquidityPool,
+                                ConstantProductPool)
+from src.liquidity.base import HedgePolicy, QuoteCache
+from src.liquidity.jupiter import JupiterWrapper
+from src.liquidity.pools import PoolStore
+from src.liquidity.router import QuoteRouter
+from src.liquidity.venues import load_venues
+from src.orders.quote import QuoteData
+from src.utils.clients import HTTP_CLIENTS
+from tests.test_network import quote_for, start_venue
+from tests.test_p2p import make_intent
+
+
+def make_config(venue_url: str, **overrides) -> dict:
+    """A configuration quoting from a local stand-in venue, with a throwaway wallet."""
+    config = {
+        'SOLANA_RPC_HTTPS': 'http://127.0.0.1:1',
+        'WALLET_PRIVATE_KEY': base58.b58encode(bytes(Keypair())).decode(),
+        'JUPITER_HTTPS': venue_url, 'JUPITER_QUOTE_ENDPOINT': 'quote', 'JUPITER_SWAP_ENDPOINT': 'swap',
+        'ACCEPTABLE_SLIPPAGE': '50', 'SWAP_RETRIES': '5', 'SWAP_SLEEP_TIME': '10',
+        'HTTP_MAX_CONNECTIONS': 16, 'HTTP_MAX_KEEPALIVE_CONNECTIONS': 16, 'HTTP_KEEPALIVE_SECONDS': 30,
+        'HTTP_HTTP2': False, 'HTTP_TIMEOUT_SECONDS': 10,
+        'RATE_LIMIT_RPS': 0, 'RATE_LIMIT_BURST': 10, 'RATE_LIMIT_HOST_RPS': {}, 'RATE_LIMIT_MAX_RETRIES': 5,
+        'RATE_LIMIT_DELAY': 5,
+        'HTTP_ADAPTIVE_TIMEOUT_MULTIPLIER': 4, 'HTTP_ADAPTIVE_TIMEOUT_MIN_SECONDS': 0.5,
+        'CIRCUIT_FAILURE_THRESHOLD': 5, 'CIRCUIT_COOLDOWN_SECONDS': 5,
+        'QUOTE_CACHE_TTL_SECONDS': 2, 'QUOTE_CACHE_MAX_ENTRIES': 4096, 'QUOTE_CACHE_MAX_SLOT_AGE': 5,
+        'QUOTE_CACHE_BUCKET_BPS': 0, 'QUOTE_HEDGE_PERCENTILE': 95, 'QUOTE_HEDGE_BUDGET': 0.05,
+    }
+    config.update(overrides)
+    return config
+
+
+def make_aleph(venue_url: str, intents: list, **overrides) -> Aleph:
+    """An Aleph agent routing a batch of intents through a local stand-in venue."""
+    config = make_config(venue_url, **{
+        'URANI_ORDERBOOK_HTTPS_URL': 'http://127.0.0.1:1', 'URANI_ORDERBOOK_WS_URL': 'ws://127.0.0.1:1',
+        'URANI_BATCHES_HTTP_ENDPOINT': 'batches', 'URANI_SOLUTION_HTTP_ENDPOINT': 'solutions',
+        'URANI_BATCHES_SUB_TOPIC': 'batches', 'URANI_SOLUTIONS_SUB_TOPIC': 'solutions',
+        'MULDER_UPDATE_SECONDS': 1, 'MULDER_MAX_INSTANCES': 1, 'MULDER_TYPE_OF_CONNECTION': 'http',
+        'MULDER_PIPELINE_DEPTH': 1, 'MULDER_POLL_MIN_SECONDS': 1, 'MULDER_LONG_POLL_SECONDS': 0,
+        'MULDER_BATCH_DEADLINE_SECONDS': 0, 'MULDER_STREAM_BATCHES': False,
+        'P2P_MATCHING_ENGINE': 'greedy', 'P2P_RING_MAX_HOPS': 3, 'P2P_PARTIAL_FILL': False,
+        'P2P_AUCTION_PRICE_CANDIDATES': 64, 'QUOTE_MAX_ATTEMPTS': 1, 'QUOTE_RETRY_BUDGET': 0,
+        'QUOTE_BACKOFF_SECONDS': 0, 'QUOTE_BACKOFF_MAX_SECONDS': 0, 'ROUTING_NETTING': True,
+        'ROUTING_VENUES': ['jupiter'], 'ROUTING_QUORUM': 0, 'ROUTING_TIMEOUT_SECONDS': 0.5,
+        'ROUTING_LOCAL_QUOTES': False, 'ROUTING_LOCAL_SCREEN_BPS': 100, 'ROUTING_POOLS': [],
+        **overrides})
+    aleph = Aleph(config)
+    aleph.batch.intents = intents
+    return aleph
+
+
+def make_quote(amount: int, out_amount: int, slot: int = 100) -> dict:
+    return {'inputMint': 'SOL_MINT', 'inAmount': str(amount), 'outputMint': 'USDC_MINT',
+            'outAmount': str(out_amount), 'otherAmountThreshold': str(out_amount * 99 // 100),
+            'contextSlot': slot}
+
+
+def test_quote_cache_expires_by_time_and_slot():
+    cache = QuoteCache(ttl=60, max_entries=2, max_slot_age=5)
+    key = cache.key('SOL_MINT', 'USDC_MINT', 10**9, 50)
+
+    assert cache.get(key, 10**9) is None
+    cache.put(key, make_quote(10**9, 150 * 10**6), latency=0.2)
+    cache.put(cache.key('SOL_MINT', 'USDC_MINT', 1, 50), {'error': 'no route'}, latency=0.1)
+    assert cache.get(key, 10**9)['outAmount'] == str(150 * 10**6)
+    assert len(cache) == 1
+
+    # A quote whose slot falls behind the current slot is refetched
+    cache.observe_slot(104)
+    assert cache.get(key, 10**9) is not None
+    cache.observe_slot(106)
+    assert cache.get(key, 10**9) is None
+
+    # So is a quote older than the TTL, and the least recently used quote is evicted
+    cache.ttl = 0.01
+    cache.put(key, make_quote(10**9, 150 * 10**6, slot=106), latency=0.2)
+    time.sleep(0.02)
+    assert cache.get(key, 10**9) is None
+    cache.ttl = 60
+    for amount in (1, 2, 3):
+        cache.put(cache.key('SOL_MINT', 'USDC_MINT', amount, 50), make_quote(amount, amount, slot=106), 0)
+
+    assert cache.stats() == {'entries': 2, 'hits': 2, 'misses': 3, 'hit_rate': 0.4, 'stale': 2,
+                             'evictions': 1, 'saved_seconds': 0.4}
+
+
+def test_quote_cache_buckets_amounts():
+    cache = QuoteCache(ttl=60, bucket_bps=10)
+    key = cache.key('SOL_MINT', 'USDC_MINT', 10**9, 50)
+    cache.put(key, make_quote(10**9, 150 * 10**6), latency=0.2)
+
+    # Amounts within the bucket share the quote, rescaled to the amount asked
+    close = 10**9 + 10**5
+    assert cache.key('SOL_MINT', 'USDC_MINT', close, 50) == key
+    quote = cache.get(key, close)
+    assert (quote['inAmount'], quote['outAmount']) == (str(close), str(150 * close // 1000))
+    assert cache.key('SOL_MINT', 'USDC_MINT', 2 * 10**9, 50) != key
+
+
+def test_get_quote_serves_identical_quotes_from_cache():
+
+    async def quotes():
+        venue = await start_venue()
+        try:
+            jupiter = JupiterWrapper(make_config(venue.url))
+            intents = [make_intent(i, 'SOL', 'USDC', 10**9, 10**8) for i in range(3)]
+            intents.append(make_intent(3, 'SOL', 'USDC', 2 * 10**9, 10**8))
+            results = [await jupiter.get_quote(intent) for intent in intents]
+        finally:
+            await HTTP_CLIENTS.aclose()
+            venue.server.close()
+        return results, venue.requests, jupiter.quote_cache.stats()
+
+    results, requests, stats = asyncio.run(quotes())
+    assert [quote['outAmount'] for quote in results] == ['150000000'] * 3 + ['300000000']
+    assert len(requests) == 2
+    assert (stats['hits'], stats['misses']) == (2, 2)
+
+
+def test_concurrent_identical_quotes_share_one_request():
+
+    async def quotes():
+        venue = await start_venue(latency=0.05)
+        try:
+            jupiter = JupiterWrapper(make_config(venue.url, QUOTE_CACHE_TTL_SECONDS=0))
+            intents = [make_intent(i, 'SOL', 'USDC', 10**9, 10**8) for i in range(10)]
+            intents.append(make_intent(10, 'SOL', 'USDC', 2 * 10**9, 10**8))
+            tasks = [asyncio.create_task(jupiter.get_quote(intent)) for intent in intents]
+
+            # A caller giving up does not cancel the request shared with the others
+            await asyncio.sleep(0.01)
+            tasks[0].cancel()
+            results = await asyncio.gather(*tasks[1:])
+            in_flight = dict(jupiter.in_flight)
+
+            # Once every caller gives up, the request is cancelled
+            lonely = asyncio.create_task(jupiter.get_quote(make_intent(11, 'SOL', 'USDC', 3 * 10**9, 10**8)))
+            await asyncio.sleep(0.01)
+            task = next(iter(jupiter.in_flight.values()))[0]
+            lonely.cancel()
+            await asyncio.gather(lonely, return_exceptions=True)
+            await asyncio.sleep(0)
+        finally:
+            await HTTP_CLIENTS.aclose()
+            venue.server.close()
+        return results, venue.requests, jupiter.coalesced, in_flight, task.cancelled(), jupiter.in_flight
+
+    results, requests, coalesced, in_flight, cancelled, left = asyncio.run(quotes())
+    assert [quote['outAmount'] for quote in results] == ['150000000'] * 9 + ['300000000']
+    assert len(requests) == 3
+    assert coalesced == 9
+    assert in_flight == {} and left == {}
+    assert cancelled
+
+
+def test_routing_nets_same_direction_intents():
+    intents = [make_intent(i, 'SOL', 'USDC', (i + 1) * 10**9, (i + 1) * 14 * 10**7) for i in range(8)]
+    intents += [make_intent(i, 'USDC', 'SOL', (i + 1) * 10**6, (i + 1) * 10**5) for i in range(8, 11)]
+    # Asks more than the venue pays: rejected from the swap, then dropped on its own
+    intents.append(make_intent(11, 'SOL', 'USDC', 10**9, 16 * 10**7))
+
+    async def route(netting):
+        venue = await start_venue()
+        try:
+            aleph = make_aleph(venue.url, list(intents), ROUTING_NETTING=netting)
+            await aleph.routing()
+        finally:
+            await HTTP_CLIENTS.aclose()
+            venue.server.close()
+        return aleph.batch.solutions, venue.requests
+
+    solutions, requests = asyncio.run(route(True))
+    # One quote per direction, then the swap without the rejected intent, and the rejected intent alone
+    assert len(requests) == 4
+    assert len(solutions) == 11
+    by_address = {solution.source_address: solution for solution in solutions.values()}
+    for intent in intents[:11]:
+        solution = by_address[intent.source_address]
+        assert solution.source_amount == intent.source_amount
+        assert solution.destination_amount >= intent.min_receive_amount
+    assert sum(by_address[intent.source_address].destination_amount for intent in intents[:8]) == 36 * 15 * 10**7
+
+    # Without netting, a quote per intent (the rejected intent sells as much as the first one)
+    solutions, requests = asyncio.run(route(False))
+    assert len(requests) == 11
+    assert len(solutions) == 11
+
+
+
+def test_batch_past_its_deadline_is_not_routed():
+    intents = [make_intent(1, 'SOL', 'USDC', 100, 1000), make_intent(2, 'USDC', 'SOL', 1000, 90),
+               make_intent(3, 'SOL', 'USDC', 10**9, 10**8)]
+
+    async def solve():
+        venue = await start_venue()
+        try:
+            aleph = make_aleph(venue.url, [])
+            aleph.batch = aleph.prepare_batch({'batch_id': '7', 'deadline': time.time() - 1}, '0')
+            aleph.batch.intents = list(intents)
+            await aleph.solve_order()
+        finally:
+            await HTTP_CLIENTS.aclose()
+            venue.server.close()
+        return aleph.batch, venue.requests
+
+    batch, requests = asyncio.run(solve())
+    # The p2p match found is kept, but no time is spent quoting the intent left
+    assert batch.batch_id == '7' and batch.expired()
+    assert sorted(solution.source_address for solution in batch.solutions.values()) == ['Wallet_1', 'Wallet_2']
+    assert [intent.intent_id for intent in batch.intents] == ['3']
+    assert requests == []
+
+
+def test_routing_is_cut_short_at_the_batch_deadline():
+    intents = [make_intent(1, 'SOL', 'USDC', 10**9, 10**8), make_intent(2, 'SOL', 'USDC', 2 * 10**9, 2 * 10**8)]
+
+    async def route():
+        # The quote of the second intent would arrive after the deadline
+        venue = await start_venue(latency=lambda query: 1 if query['amount'] == [str(2 * 10**9)] else 0)
+        try:
+            aleph = make_aleph(venue.url, list(intents), ROUTING_NETTING=False, ROUTING_TIMEOUT_SECONDS=5,
+                               MULDER_BATCH_DEADLINE_SECONDS=0.3)
+            aleph.batch = aleph.prepare_batch({'batch_id': '7'}, '0')
+            aleph.batch.intents = list(intents)
+            start = time.monotonic()
+            await aleph.routing()
+            elapsed = time.monotonic() - start
+        finally:
+            await HTTP_CLIENTS.aclose()
+            venue.server.close()
+        return aleph.batch, elapsed
+
+    batch, elapsed = asyncio.run(route())
+    assert elapsed < 0.9
+    assert [solution.source_address for solution in batch.solutions.values()] == ['Wallet_1']
+
+
+
+def test_quotes_are_retried_within_the_batch_budget():
+    # The venue fails the first quote of intent 1, and every quote of intent 2
+    intents = [make_intent(i, 'SOL', 'USDC', i * 10**9, i * 10**8) for i in (1, 2, 3)]
+
+    def flaky(query):
+        amount = int(query['amount'][0]) // 10**9
+        if failures.get(amount):
+            failures[amount] -= 1
+            return 500, {}, {'error': 'unavailable'}
+        return quote_for(query)
+
+    async def quote(**overrides):
+        failures.update({1: 1, 2: 3})
+        venue = await start_venue(handler=flaky)
+        try:
+            aleph = make_aleph(venue.url, list(intents), **{'QUOTE_MAX_ATTEMPTS': 3, **overrides})
+            quotes = await aleph.get_quotes()
+        finally:
+            await HTTP_CLIENTS.aclose()
+            venue.server.close()
+        counts = [sum(f'amount={i * 10**9}' in target for target in venue.requests) for i in (1, 2, 3)]
+        return sorted(intent.intent_id for intent, _ in quotes), counts
+
+    failures = {}
+    # A retry for each intent in the batch: 1 is quoted on its second attempt, and 2 dropped after its third
+    assert asyncio.run(quote(QUOTE_RETRY_BUDGET=1)) == (['1', '3'], [2, 3, 1])
+    # No retry left in the budget: both failing intents are dropped after their first attempt
+    assert asyncio.run(quote(QUOTE_RETRY_BUDGET=0)) == (['3'], [1, 1, 1])
+    # An intent is always quoted at least once
+    assert asyncio.run(quote(QUOTE_MAX_ATTEMPTS=0, QUOTE_RETRY_BUDGET=1)) == (['3'], [1, 1, 1])
+
+
+def paying(percent: int):
+    """A stand-in venue handler quoting `percent` hundredths of output token per input token."""
+    def handler(query: dict) -> tuple:
+        status, headers, quote = quote_for(query)
+        return status, headers, dict(quote, outAmount=str(int(quote['inAmount']) * percent // 100))
+    return handler
+
+
+def test_router_keeps_the_best_quote_of_the_venues():
+
+    async def route(timeout, **latencies):
+        handlers = {'fair': paying(15), 'best': paying(16), 'failing': lambda query: (500, {}, {'error': 'no route'})}
+        venues = {name: await start_venue(handler, latencies.get(name, 0)) for name, handler in handlers.items()}
+        try:
+            router = QuoteRouter({name: JupiterWrapper(make_config(venue.url)) for name, venue in venues.items()},
+                                 timeout=timeout)
+            quotes = [await router.get_quote(make_intent(i, 'SOL', 'USDC', (i + 1) * 10**9, 10**8)) for i in range(4)]
+        finally:
+            await HTTP_CLIENTS.aclose()
+            for venue in venues.values():
+                venue.server.close()
+        return quotes, router.stats()
+
+    # Waiting for every venue, the best price wins, and the failing venue is skipped
+    quotes, stats = asyncio.run(route(timeout=1, best=0.02))
+    assert [quote['outAmount'] for quote in quotes] == [str((i + 1) * 16 * 10**7) for i in range(4)]
+    assert (stats['best']['wins'], stats['best']['win_rate'], stats['fair']['wins']) == (4, 1.0, 0)
+    assert (stats['failing']['errors'], stats['failing']['quotes']) == (4, 0)
+    assert stats['best']['mean_latency'] >= 0.02
+
+    # Past the timeout, the quotes in hand are kept, and the slow venue is abandoned
+    quotes, stats = asyncio.run(route(timeout=0.05, best=0.3))
+    assert [quote['outAmount'] for quote in quotes] == [str((i + 1) * 15 * 10**7) for i in range(4)]
+    assert (stats['fair']['win_rate'], stats['best']['late'], stats['best']['quotes']) == (1.0, 4, 0)
+
+    # Only venues with a quote wrapper can be enabled
+    assert list(load_venues(make_config('http://127.0.0.1:1', ROUTING_VENUES=['jupiter']))) == ['jupiter']
+    with pytest.raises(ValueError):
+        load_venues(make_config('http://127.0.0.1:1', ROUTING_VENUES=['jupiter', 'drift']))
+
+
+def venue_config(name: str, venue_url: str, quote_endpoint: str = 'quote') -> dict:
+    """A configuration quoting a venue of `VENUES` from a local stand-in."""
+    prefix = name.upper()
+    return make_config('http://127.0.0.1:1', ROUTING_VENUES=[name], **{
+        f'{prefix}_HTTPS': venue_url, f'{prefix}_QUOTE_ENDPOINT': quote_endpoint, f'{prefix}_SWAP_ENDPOINT': 'swap'})
+
+
+def raydium_reply(query: dict) -> tuple:
+    """Answer as Raydium's Trade API, with 0.16 output token per input token."""
+    if query['inputMint'] == ['BONK_MINT']:
+        return 200, {}, {'id': '1', 'success': False, 'version': 'V1', 'msg': 'ROUTE_NOT_FOUND'}
+    amount = int(query['amount'][0])
+    return 200, {}, {'id': '1', 'success': True, 'version': 'V1', 'data': {
+        'swapType': 'BaseIn', 'inputMint': query['inputMint'][0], 'inputAmount': str(amount),
+        'outputMint': query['outputMint'][0], 'outputAmount': str(amount * 16 // 100),
+        'otherAmountThreshold': str(amount * 16 // 100 * 995 // 1000), 'slippageBps': 50,
+        'priceImpactPct': 0.01, 'referrerAmount': '0',
+        'routePlan': [{'poolId': 'POOL', 'inputMint': query['inputMint'][0], 'outputMint': query['outputMint'][0],
+                       'feeMint': query['inputMint'][0], 'feeRate': 25, 'feeAmount': '0'}]}}
+
+
+def test_raydium_quotes_are_mapped_to_quote_data():
+
+    async def quote():
+        raydium, jupiter = await start_venue(raydium_reply), await start_venue()
+        try:
+            config = venue_config('raydium', raydium.url, 'compute/swap-base-in')
+            config.update(JUPITER_HTTPS=jupiter.url, ROUTING_VENUES=['jupiter', 'raydium'])
+            router = QuoteRouter(load_venues(config))
+            best = await router.get_quote(make_intent(1, 'SOL', 'USDC', 10**9, 10**8))
+            await router.get_quote(make_intent(2, 'BONK', 'USDC', 10**9, 10**8))
+        finally:
+            await HTTP_CLIENTS.aclose()
+            raydium.server.close()
+            jupiter.server.close()
+        return best, raydium.requests, router.stats()
+
+    best, requests, stats = asyncio.run(quote())
+    # Raydium pays more than the Jupiter stand-in, and its reply is read as any other quote
+    assert requests[0].startswith('/compute/swap-base-in?inputMint=SOL_MINT&outputMint=USDC_MINT&amount=1000000000')
+    assert 'txVersion=V0' in requests[0]
+    quote = QuoteData.from_dict(best)
+    assert (quote.in_amount, quote.out_amount, quote.other_amount_threshold) == ('1000000000', '160000000', '159200000')
+    assert best['swapResponse']['data']['outputAmount'] == '160000000'
+    # A reply without a route counts as an error of the venue, and Jupiter's quote is kept
+    assert (stats['raydium']['wins'], stats['raydium']['errors'], stats['jupiter']['wins']) == (1, 1, 1)
+
+
+def test_amm_venues_are_quoted_on_their_own_pools():
+    dexes = {'orca': ['Whirlpool'], 'meteora': ['Meteora DLMM,Meteora'], 'phoenix': ['Phoenix'],
+             'lifinity': ['Lifinity V2']}
+
+    async def quote(name):
+        venue = await start_venue(lambda query: quote_for(query) if query.get('dexes') == dexes[name]
+                                  else (400, {}, {'error': 'unknown dexes'}))
+        try:
+            wrapper = load_venues(venue_config(name, venue.url))[name]
+            return await wrapper.get_quote(make_intent(1, 'SOL', 'USDC', 10**9, 10**8))
+        finally:
+            await HTTP_CLIENTS.aclose()
+            venue.server.close()
+
+    for name in dexes:
+        assert QuoteData.from_dict(asyncio.run(quote(name))).out_amount == '150000000'
+
+
+def test_hedge_policy_adapts_its_delay_within_budget():
+    hedge = HedgePolicy(percentile=90, budget=0.1, window=100, min_samples=10)
+    for latency in range(1, 10):
+        hedge.observe(latency / 100)
+    assert hedge.delay() is None
+
+    for latency in range(10, 101):
+        hedge.observe(latency / 100)
+    assert hedge.delay() == 0.91
+
+    # At most one request out of ten is hedged
+    hedge.requests = 25
+    assert [hedge.spend() for _ in range(3)] == [True, True, False]
+    assert HedgePolicy(percentile=0).delay() is None
+
+
+def test_slow_quote_is_hedged():
+    slow = set()
+
+    def latency(query: dict) -> float:
+        # The first request for an amount of 30 SOL is stuck, its duplicate is not
+        amount = query['amount'][0]
+        if amount == str(30 * 10**9) and amount not in slow:
+            slow.add(amount)
+            return 2
+        return 0.005
+
+    async def quotes():
+        venue = await start_venue(latency=latency)
+        try:
+            jupiter = JupiterWrapper(make_config(venue.url, QUOTE_CACHE_TTL_SECONDS=0, QUOTE_HEDGE_BUDGET=0.1))
+            timings = []
+            for i in range(1, 41):
+                start = time.monotonic()
+                quote = await jupiter.get_quote(make_intent(i, 'SOL', 'USDC', i * 10**9, 10**8))
+                timings.append(time.monotonic() - start)
+                assert quote['outAmount'] == str(i * 15 * 10**7)
+        finally:
+            await HTTP_CLIENTS.aclose()
+            venue.server.close()
+        return timings, venue.requests, jupiter.hedge.stats()
+
+    timings, requests, stats = asyncio.run(quotes())
+    assert max(timings) < 1
+    assert len(requests) == 41
+    assert (stats['requests'], stats['hedges'], stats['hedge_wins']) == (40, 1, 1)
+
+
+def test_amm_pools_compute_output_amounts():
+    amounts = np.array([0, 1, 10**6, 10**9, 10**12])
+    cp = ConstantProductPool('CP', 'SOL_MINT', 'USDC_MINT', 10**13, 15 * 10**11, fee_bps=25)
+    expected = [(15 * 10**11) * (a * 9975 // 10000) // (10**13 + a * 9975 // 10000) for a in amounts.tolist()]
+    assert np.all(np.abs(cp.amounts_out(amounts, 'SOL_MINT') - expected) <= 1)
+
+    # A full-range position behaves as a constant-product pool of the same liquidity
+    liquidity, sqrt_price = 10**12, np.sqrt(0.15)
+    full = ConcentratedLiquidityPool('CL', 'SOL_MINT', 'USDC_MINT', sqrt_price, liquidity,
+                                     [MIN_TICK, MAX_TICK], [liquidity, -liquidity], fee_bps=30)
+    virtual = ConstantProductPool('CP', 'SOL_MINT', 'USDC_MINT', liquidity / sqrt_price, liquidity * sqrt_price,
+                                  fee_bps=30)
+    for mint in ('SOL_MINT', 'USDC_MINT'):
+        assert np.all(np.abs(full.amounts_out(amounts, mint) - virtual.amounts_out(amounts, mint)) <= 1)
+
+    # A narrow position cannot fill more than its range, and a second one deepens the book
+    tick = int(np.log(0.15) / np.log(1.0001))
+    narrow = ConcentratedLiquidityPool('CL', 'SOL_MINT', 'USDC_MINT', sqrt_price, liquidity,
+                                       [tick - 100, tick + 100], [liquidity, -liquidity], fee_bps=0)
+    outs = narrow.amounts_out(amounts, 'SOL_MINT')
+    assert np.isnan(outs[-1]) and np.all(np.diff(outs[:-1]) > 0)
+    deeper = ConcentratedLiquidityPool('CL', 'SOL_MINT', 'USDC_MINT', sqrt_price, 2 * liquidity,
+                                       [tick - 10000, tick - 100, tick + 100, tick + 10000],
+                                       [liquidity, liquidity, -liquidity, -liquidity], fee_bps=0)
+    outs = deeper.amounts_out(amounts, 'SOL_MINT')
+    assert not np.isnan(outs[-1]) and np.all(np.diff(outs) > 0)
+
+
+def test_amm_simulator_quotes_like_a_venue():
+    simulator = AmmSimulator([
+        ConstantProductPool('Shallow', 'SOL_MINT', 'USDC_MINT', 10**12, 15 * 10**10, slot=7),
+        ConstantProductPool('Deep', 'USDC_MINT', 'SOL_MINT', 15 * 10**13, 10**15, slot=9),
+    ])
+    intents = [make_intent(i, 'SOL', 'USDC', (i + 1) * 10**9, 10**8) for i in range(5)]
+    intents.append(make_intent(5, 'SOL', 'BONK', 10**9, 1))
+
+    quotes = simulator.quotes(intents)
+    assert quotes[-1] is None
+    for intent, quote in zip(intents, quotes[:-1]):
+        assert quote == {**simulator.quote(intent), 'timeTaken': quote['timeTaken']}
+        data = QuoteData.from_dict(quote)
+        assert (data.in_amount, data.context_slot) == (str(intent.source_amount), 9)
+        assert quote['routePlan'][0]['swapInfo']['ammKey'] == 'Deep'
+        assert int(quote['otherAmountThreshold']) == int(quote['outAmount']) * 9950 // 10000
+
+    # The simulator can be routed like a venue
+    quote = asyncio.run(QuoteRouter({'amm': simulator}).get_quote(intents[0]))
+    assert quote['outAmount'] == quotes[0]['outAmount']
+    with pytest.raises(ValueError):
+        simulator.quote(intents[-1])
+
+
+def test_routing_pre_screens_intents_on_the_local_pools():
+    intents = [
+        make_intent(0, 'SOL', 'USDC', 10**9, 14 * 10**7),
+        # Short of what the pool pays by more than ROUTING_LOCAL_SCREEN_BPS, then by less
+        make_intent(1, 'SOL', 'USDC', 2 * 10**9, 304 * 10**6),
+        make_intent(2, 'SOL', 'USDC', 3 * 10**9, 453 * 10**6),
+        # Without a local pool
+        make_intent(3, 'SOL', 'BONK', 10**9, 10**9),
+    ]
+
+    async def route(local_quotes):
+        venue = await start_venue()
+        try:
+            aleph = make_aleph(venue.url, list(intents), ROUTING_NETTING=False, ROUTING_LOCAL_QUOTES=local_quotes)
+            aleph.pool_store = PoolStore('http://127.0.0.1:1', 'ws://127.0.0.1:1', AmmSimulator([
+                ConstantProductPool('CP', 'SOL_MINT', 'USDC_MINT', 10**15, 15 * 10**13)]))
+            await aleph.routing()
+        finally:
+            await HTTP_CLIENTS.aclose()
+            venue.server.close()
+        return aleph.batch.solutions, venue.requests
+
+    solutions, requests = asyncio.run(route(True))
+    assert len(requests) == 3 and len(solutions) == 1
+    assert sum('BONK_MINT' in target for target in requests) == 1
+    solutions, requests = asyncio.run(route(False))
+    assert len(requests) == 4 and len(solutions) == 1
+
+    store = PoolStore('http://127.0.0.1:1', 'ws://127.0.0.1:1')
+    store.watch_pools([['whirlpool', 'Whirlpool', 'Ticks'], ['constant_product', 'CP', 'VaultA', 'VaultB', '30']])
+    assert sorted(store.decoders) == ['Ticks', 'VaultA', 'VaultB', 'Whirlpool']
+    with pytest.raises(ValueError):
+        store.watch_pools([['stableswap', 'Pool']])
+
+
+async def start_rpc(accounts: dict, slot: int = 100):
+    """
+    Start a local stand-in for the Solana RPC, over HTTP (getMultipleAccounts) and websocket (accountSubscribe).
+
+    `rpc.set(address, data)` moves to the next slot and notifies the subscribers of the account,
+    and `rpc.drop()` closes the websocket connections. The RPC records the accounts of its HTTP requests.
+    """
+    rpc = SimpleNamespace(accounts=dict(accounts), slot=slot, loads=[], subscribers={}, sockets=set())
+
+    def account(address):
+        data = rpc.accounts.get(address)
+        return None if data is None else {'data': [base64.b64encode(data).decode(), 'base64'], 'executable': False,
+                                          'lamports': 1, 'owner': 'Owner', 'rentEpoch': 0, 'space': len(data)}
+
+    async def handle_http(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = int(re.search(rb'content-length: *(\d+)', head, re.I).group(1))
+                request = ujson.loads(await reader.readexactly(length))
+                rpc.loads.append(request['params'][0])
+                body = ujson.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': {
+                    'context': {'slot': rpc.slot}, 'value': [account(address) for address in request['params'][0]]}})
+                writer.write(f'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             f'Content-Length: {len(body)}\r\n\r\n{body}'.encode())
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_ws(ws):
+        rpc.sockets.add(ws)
+        try:
+            async for message in ws:
+                request = ujson.loads(message)
+                subscription = len(rpc.subscribers) + 1
+                rpc.subscribers[subscription] = (ws, request['params'][0])
+                await ws.send(ujson.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': subscription}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            rpc.sockets.discard(ws)
+
+    async def set_account(address, data):
+        rpc.slot += 1
+        rpc.accounts[address] = data
+        for subscription, (ws, subscribed) in list(rpc.subscribers.items()):
+            if subscribed == address and ws.open:
+                await ws.send(ujson.dumps({'jsonrpc': '2.0', 'method': 'accountNotification', 'params': {
+                    'subscription': subscription,
+                    'result': {'context': {'slot': rpc.slot}, 'value': account(address)}}}))
+
+    async def drop():
+        for ws in list(rpc.sockets):
+            await ws.close()
+
+    rpc.set, rpc.drop = set_account, drop
+    rpc.http = await asyncio.start_server(handle_http, '127.0.0.1', 0)
+    rpc.ws = await websockets.serve(handle_ws, '127.0.0.1', 0)
+    rpc.url = f'http://127.0.0.1:{rpc.http.sockets[0].getsockname()[1]}/'
+    rpc.ws_url = f'ws://127.0.0.1:{rpc.ws.sockets[0].getsockname()[1]}/'
+    return rpc
+
+
+def token_account(mint: bytes, amount: int) -> bytes:
+    return mint + bytes(32) + amount.to_bytes(8, 'little') + bytes(93)
+
+
+def whirlpool(mint_a: bytes, mint_b: bytes, sqrt_price: float, liquidity: int, tick: int) -> bytes:
+    data = bytearray(653)
+    data[41:43], data[45:47] = (64).to_bytes(2, 'little'), (3000).to_bytes(2, 'little')
+    data[49:65], data[65:81] = liquidity.to_bytes(16, 'little'), int(sqrt_price * 2**64).to_bytes(16, 'little')
+    data[81:85], data[101:133], data[181:213] = tick.to_bytes(4, 'little', signed=True), mint_a, mint_b
+    return bytes(data)
+
+
+def tick_array(start_tick: int, nets: dict) -> bytes:
+    data = bytearray(9988)
+    data[8:12] = start_tick.to_bytes(4, 'little', signed=True)
+    for offset, net in nets.items():
+        at = 12 + offset * 113
+        data[at] = 1
+        data[at + 1:at + 17] = net.to_bytes(16, 'little', signed=True)
+    return bytes(data)
+
+
+def test_pool_store_follows_account_updates():
+    sol, usdc = bytes([1]) * 32, bytes([2]) * 32
+    sol_mint, usdc_mint = base58.b58encode(sol).decode(), base58.b58encode(usdc).decode()
+    sqrt_price, liquidity = np.sqrt(0.15), 10**12
+    tick = int(np.log(0.15) / np.log(1.0001))
+    start = (tick // (88 * 64)) * 88 * 64
+    accounts = {
+        'VaultA': token_account(sol, 10**13), 'VaultB': token_account(usdc, 15 * 10**11),
+        'Whirlpool': whirlpool(sol, usdc, sqrt_price, liquidity, tick),
+        'Ticks': tick_array(start, {0: liquidity, 87: -liquidity}),
+    }
+    config = {'WEBSOCKET_TIMEOUT': '10', 'WEBSOCKET_DELAY': '1'}
+
+    async def follow():
+        rpc = await start_rpc(accounts)
+        store = PoolStore(rpc.url, rpc.ws_url, config=config)
+        store.watch_constant_product('CP', 'VaultA', 'VaultB', fee_bps=25)
+        store.watch_whirlpool('Whirlpool', ['Ticks'])
+
+        def pool(address):
+            return next(pool for pool in store.simulator.pools_for(sol_mint, usdc_mint) if pool.address == address)
+
+        async def until(condition):
+            for _ in range(300):
+                if condition():
+                    return
+                await asyncio.sleep(0.01)
+            raise TimeoutError
+
+        try:
+            assert await store.load() == 4
+            assert (pool('CP').reserve_a, pool('CP').reserve_b, pool('CP').slot) == (10**13, 15 * 10**11, 100)
+            assert (pool('Whirlpool').fee_bps, pool('Whirlpool').liquidity) == (30, liquidity)
+            assert list(pool('Whirlpool').ticks) == [start, start + 87 * 64]
+            expected = ConcentratedLiquidityPool('Whirlpool', sol_mint, usdc_mint, sqrt_price, liquidity,
+                                                 [start, start + 87 * 64], [liquidity, -liquidity], fee_bps=30)
+            amounts = [10**6, 10**9]
+            assert np.allclose(pool('Whirlpool').amounts_out(amounts, sol_mint),
+                               expected.amounts_out(amounts, sol_mint))
+
+            # Updates are pushed once subscribed, and stamped with their slot
+            store.start()
+            await until(lambda: len(store.subscriptions) == 4 and store.reload.done())
+            await rpc.set('VaultA', token_account(sol, 2 * 10**13))
+            await until(lambda: pool('CP').slot == 101)
+            assert (pool('CP').reserve_a, store.slot) == (2 * 10**13, 101)
+            assert not store.update('VaultA', {'data': [base64.b64encode(token_account(sol, 1)).decode()]}, 100)
+
+            # Updates missed while reconnecting are caught up by reloading the accounts
+            await rpc.drop()
+            await rpc.set('VaultB', token_account(usdc, 3 * 10**12))
+            await until(lambda: store.connections == 2 and len(store.subscriptions) == 4 and store.reload.done())
+            assert (pool('CP').reserve_b, pool('CP').slot) == (3 * 10**12, 102)
+        finally:
+            await store.close()
+            await HTTP_CLIENTS.aclose()
+            rpc.http.close()
+            rpc.ws.close()
+        return store.stats(), rpc.loads
+
+    stats, loads = asyncio.run(follow())
+    assert len(loads) == 3 and sorted(loads[0]) == sorted(accounts)
+    assert (stats['accounts'], stats['pools'], stats['stale'], stats['errors']) == (4, 2, 1, 0)
+
+
+def test_pool_store_reloads_once_per_connection():
+    """Test that a new subscription cancels the reload of the previous connection still running."""
+
+    async def resubscribe():
+        store = PoolStore('http://127.0.0.1:1', 'ws://127.0.0.1:1')
+        reloads = []
+        for subscription in (10, 11):
+            store.requests, store.subscriptions = {1: 'Account'}, {}
+            await store._on_message({'jsonrpc': '2.0', 'id': 1, 'result': subscription})
+            reloads.append(store.reload)
+        await asyncio.gather(*reloads, return_exceptions=True)
+        return reloads
+
+    first, second = asyncio.run(resubscribe())
+    assert first.cancelled()
+    assert not second.cancelled() and second.result() == 0
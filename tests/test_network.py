@@ -0,0 +1,270 @@
+# tests/test_network.py
+
+import time
+import httpx
+import ujson
+import asyncio
+
+from types import SimpleNamespace
+from solana.exceptions import SolanaRpcException
+from urllib.parse import parse_qs, urlsplit
+from src.utils.breakers import BREAKERS, CircuitBreaker, CircuitOpenError
+from src.utils.clients import HttpClients, HTTP_CLIENTS
+from src.utils.limits import RATE_LIMITS, TokenBucket, parse_retry_after
+from src.utils.network import get_async_request, get_request, rate_limited
+
+
+def quote_for(query: dict) -> tuple:
+    """Answer a quote request with a quote of 0.15 output token per input token."""
+    amount = int(query.get('amount', ['1000000000'])[0])
+    quote = {'inputMint': query.get('inputMint', ['SOL_MINT'])[0], 'inAmount': str(amount),
+             'outputMint': query.get('outputMint', ['USDC_MINT'])[0], 'outAmount': str(amount * 15 // 100),
+             'otherAmountThreshold': '0', 'swapMode': 'ExactIn', 'slippageBps': 50, 'platformFee': None,
+             'priceImpactPct': '0', 'routePlan': [], 'contextSlot': 100, 'timeTaken': 0.001}
+    return 200, {}, quote
+
+
+async def start_venue(handler=quote_for, latency=0):
+    """
+    Start a local stand-in for a venue over HTTP/1.1, keeping connections alive.
+
+    Each request is answered after `latency` seconds (or `latency(query)`) by `handler(query)`,
+    returning the status, extra headers and JSON body. The venue records its connections and requests.
+    """
+    venue = SimpleNamespace(connections=0, requests=[], server=None, url=None)
+
+    async def handle(reader, writer):
+        venue.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                target = head.split(b' ', 2)[1].decode()
+                venue.requests.append(target)
+                query = parse_qs(urlsplit(target).query)
+                await asyncio.sleep(latency(query) if callable(latency) else latency)
+                status, headers, body = handler(query)
+                body = ujson.dumps(body).encode()
+                extra = ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+                writer.write(f'HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n{extra}'
+                             f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    venue.server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    venue.url = f'http://127.0.0.1:{venue.server.sockets[0].getsockname()[1]}/'
+    return venue
+
+
+def test_quotes_reuse_pooled_connections():
+
+    async def quotes():
+        venue = await start_venue()
+        try:
+            client = HTTP_CLIENTS.get_async(venue.url)
+            assert HTTP_CLIENTS.get_async(venue.url + 'quote?amount=1') is client
+            assert HTTP_CLIENTS.get_async('http://127.0.0.1:1/quote') is not client
+
+            for amount in range(1, 6):
+                quote = await get_async_request(f'{venue.url}quote?amount={amount * 100}')
+                assert quote['outAmount'] == str(amount * 15)
+        finally:
+            await HTTP_CLIENTS.aclose()
+            venue.server.close()
+        return venue.connections, client.is_closed
+
+    # Sequential quotes share a single kept-alive connection, and are closed with the registry
+    assert asyncio.run(quotes()) == (1, True)
+
+
+def test_pool_bounds_connections_per_host():
+    clients = HttpClients(max_connections=4, max_keepalive_connections=4)
+
+    async def quotes():
+        venue = await start_venue(latency=0.01)
+        try:
+            client = clients.get_async(venue.url)
+            responses = await asyncio.gather(*(client.get(venue.url) for _ in range(40)))
+        finally:
+            await clients.aclose()
+            venue.server.close()
+        return [response.status_code for response in responses], venue.connections
+
+    # Concurrent requests beyond the pool wait for a free connection
+    statuses, connections = asyncio.run(quotes())
+    assert statuses == [200] * 40
+    assert connections == 4
+
+
+def test_token_bucket_paces_requests():
+    bucket = TokenBucket(rate=100, burst=2)
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits[:2] == [0, 0]
+    # Each request past the burst waits for one more token
+    assert [round(wait, 2) for wait in waits[2:]] == [0.01, 0.02, 0.03]
+
+    bucket.pause(1)
+    assert bucket.reserve() > 0.9
+    assert TokenBucket().reserve() == 0
+
+    assert parse_retry_after('2') == 2
+    assert parse_retry_after('3600') == 60
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert parse_retry_after('soon') is None and parse_retry_after(None) is None
+
+
+def test_rate_limited_requests_honor_retry_after():
+    limited = []
+
+    def handler(query: dict) -> tuple:
+        # Every other request is rate limited, for 0.1s
+        limited.append(len(limited) % 2 == 0)
+        if limited[-1]:
+            return 429, {'Retry-After': '0.1'}, {'error': 'Too many requests'}
+        return quote_for(query)
+
+    async def quotes():
+        venue = await start_venue(handler)
+        try:
+            start = time.monotonic()
+            quote = await get_async_request(f'{venue.url}quote?amount=100')
+            elapsed = time.monotonic() - start
+            response = await asyncio.to_thread(get_request, f'{venue.url}quote?amount=200')
+        finally:
+            await HTTP_CLIENTS.aclose()
+            HTTP_CLIENTS.close()
+            venue.server.close()
+        return quote, elapsed, response.json(), RATE_LIMITS.stats()[venue.url.split('/')[2]], venue.requests
+
+    quote, elapsed, sync_quote, stats, requests = asyncio.run(quotes())
+    assert (quote['outAmount'], sync_quote['outAmount']) == ('15', '30')
+    assert elapsed >= 0.1
+    assert len(requests) == 4
+    assert stats['limited'] == 2 and stats['waits'] == 2
+
+
+def test_rate_limited_rpc_calls_are_retried():
+
+    class Rpc:
+        rpc_https = 'http://rpc.test'
+        calls = 0
+
+        def answer(self):
+            # The first call is rate limited by the RPC, for 0.05s
+            self.calls += 1
+            if self.calls == 1:
+                request = httpx.Request('POST', self.rpc_https)
+                response = httpx.Response(429, headers={'Retry-After': '0.05'}, request=request)
+                error = httpx.HTTPStatusError('Too many requests', request=request, response=response)
+                raise SolanaRpcException(error, self.answer, None, request) from error
+            return 100
+
+        @rate_limited()
+        def get_slot(self):
+            return self.answer()
+
+        @rate_limited()
+        async def get_slot_async(self):
+            return self.answer()
+
+    start = time.monotonic()
+    assert Rpc().get_slot() == 100
+    assert asyncio.run(Rpc().get_slot_async()) == 100
+    assert time.monotonic() - start >= 0.1
+    assert RATE_LIMITS.stats()['rpc.test']['limited'] == 2
+
+
+def test_circuit_breaker_opens_and_probes():
+    breaker = CircuitBreaker('venue', failure_threshold=2, cooldown=0.05, min_timeout=0.01)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN and not breaker.allow()
+
+    # After the cooldown, a single probe is let through, and its failure opens the circuit again
+    time.sleep(0.05)
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == breaker.OPEN
+    time.sleep(0.05)
+    assert breaker.allow()
+    breaker.record_success(0.01)
+    assert breaker.state == breaker.CLOSED and breaker.allow()
+    assert (breaker.opened, breaker.rejected) == (2, 2)
+
+    # The read timeout follows the recent latency, once enough requests were answered
+    assert breaker.timeout(10) == 10
+    for _ in range(20):
+        breaker.record_success(0.01)
+    assert breaker.timeout(10) == 0.04
+    assert breaker.timeout(0.02) == 0.02
+
+
+def test_request_cancelled_at_the_gate_keeps_no_probe():
+    clients = HttpClients(max_connections=1, max_keepalive_connections=1)
+
+    async def probe():
+        venue = await start_venue()
+        breaker = BREAKERS.breaker(venue.url)
+        try:
+            client = clients.get_async(venue.url)
+            # A streamed response holds the only connection until it is closed
+            async with client.stream('GET', f'{venue.url}quote?amount=1'):
+                # The circuit is half-open: the next request is its probe
+                breaker.state, breaker.opened_at, breaker.cooldown = breaker.OPEN, 0, 0
+                waiting = asyncio.ensure_future(client.get(f'{venue.url}quote?amount=2'))
+                await asyncio.sleep(0.05)
+                waiting.cancel()
+                await asyncio.gather(waiting, return_exceptions=True)
+            response = await client.get(f'{venue.url}quote?amount=3')
+        finally:
+            await clients.aclose()
+            venue.server.close()
+            BREAKERS.reset()
+        return response.status_code, breaker.state, breaker.rejected
+
+    # The request cancelled while waiting for a connection did not take the probe
+    assert asyncio.run(probe()) == (200, 'closed', 0)
+
+
+def test_sick_venue_times_out_early_then_fails_fast():
+    sick = SimpleNamespace(value=False)
+
+    async def quotes():
+        venue = await start_venue(latency=lambda query: 5 if sick.value else 0.005)
+        defaults = BREAKERS.failure_threshold, BREAKERS.cooldown, BREAKERS.min_timeout
+        BREAKERS.failure_threshold, BREAKERS.cooldown, BREAKERS.min_timeout = 3, 0.2, 0.05
+        errors = []
+        try:
+            for amount in range(20):
+                await get_async_request(f'{venue.url}quote?amount={amount}')
+
+            # Requests time out after a multiple of the usual latency, instead of the client's timeout
+            sick.value = True
+            start = time.monotonic()
+            for amount in range(5):
+                try:
+                    await get_async_request(f'{venue.url}quote?amount={amount}')
+                except httpx.HTTPError as e:
+                    errors.append(type(e))
+            elapsed = time.monotonic() - start
+            sent = len(venue.requests)
+
+            # Once the venue recovers, a probe closes the circuit after the cooldown
+            sick.value = False
+            await asyncio.sleep(0.2)
+            quote = await get_async_request(f'{venue.url}quote?amount=100')
+        finally:
+            BREAKERS.failure_threshold, BREAKERS.cooldown, BREAKERS.min_timeout = defaults
+            await HTTP_CLIENTS.aclose()
+            venue.server.close()
+        return errors, elapsed, sent, quote, BREAKERS.stats()[venue.url.split('/')[2]]
+
+    errors, elapsed, sent, quote, stats = asyncio.run(quotes())
+    assert errors == [httpx.ReadTimeout] * 3 + [CircuitOpenError] * 2
+    assert elapsed < 1
+    assert sent == 23
+    assert quote['outAmount'] == '15'
+    assert (stats['state'], stats['opened'], stats['rejected']) == ('closed', 1, 2)
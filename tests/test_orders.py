@@ -0,0 +1,266 @@
+# tests/test_orders.py
+
+import html
+import httpx
+import ujson
+import asyncio
+import numpy as np
+import pytest
+
+from dataclasses import asdict
+from src.orders.batch import BatchData
+from src.orders.columnar import IntentBatch
+from src.orders.feeds import BatchPoller
+from src.orders.intent import IntentData
+from src.orders.quote import QuoteData
+from src.orders.solution import SolutionData
+from src.orders.stream import IntentStream
+from src.orders.tokens import TOKENS
+from src.protocol_server import _server
+from src.protocol_server.utils.file_operations import save_data
+from src.utils.network import html_to_json
+from tests.test_p2p import make_intent
+
+
+def test_intent_batch_round_trip():
+    intents = [
+        make_intent(1, 'SOL', 'USDC', 10**9, 150 * 10**6, partial_fill=True),
+        make_intent(2, 'USDC', 'SOL', 300 * 10**6, 2 * 10**9),
+        make_intent(3, 'JUP', 'SOL', 5 * 10**9, 10**7),
+    ]
+    orders = {'orders': {intent.intent_id: asdict(intent) for intent in intents}}
+
+    batch = BatchData()
+    batch.parse_intent_instance(orders)
+    columns = IntentBatch.from_orders(orders)
+
+    assert columns.to_intents() == batch.intents
+    assert IntentBatch.from_intents(intents).to_intents() == intents
+    sol, usdc, jup = (TOKENS.ids[f'{symbol}_MINT'] for symbol in ('SOL', 'USDC', 'JUP'))
+    assert columns.source_token.tolist() == [sol, usdc, jup]
+    assert columns.destination_token.tolist() == [usdc, sol, sol]
+    assert columns.source_amount.dtype == np.uint64
+
+
+def test_intent_batch_vectorized_operations():
+    intents = [
+        make_intent(1, 'SOL', 'USDC', 10**9, 150 * 10**6, partial_fill=True),
+        make_intent(2, 'USDC', 'SOL', 300 * 10**6, 2 * 10**9),
+        make_intent(3, 'SOL', 'USDC', 2 * 10**9, 310 * 10**6),
+        make_intent(4, 'JUP', 'SOL', 5 * 10**9, 10**7, partial_fill=True),
+    ]
+    columns = IntentBatch.from_intents(intents)
+
+    sol, usdc, jup = (TOKENS.ids[f'{symbol}_MINT'] for symbol in ('SOL', 'USDC', 'JUP'))
+    groups = columns.pair_groups()
+    assert {pair: rows.tolist() for pair, rows in groups.items()} == {(sol, usdc): [0, 2], (usdc, sol): [1], (jup, sol): [3]}
+    assert np.allclose(columns.limit_prices(), [0.15, 2 * 10**9 / (300 * 10**6), 0.155, 0.002])
+
+    selected = columns.where(columns.partial_fill)
+    assert len(selected) == 2
+    assert [intent.intent_id for intent in selected.to_intents()] == ['1', '4']
+    assert selected[1] == intents[3]
+
+
+def test_token_registry_interns_mints_across_batches():
+    first = make_intent(1, 'POPCAT', 'MEW', 10**9, 10**6)
+    second = make_intent(2, 'MEW', 'POPCAT', 10**6, 10**9)
+
+    # Tokens keep their ids from one batch to the next, and their strings are shared
+    assert first.source_token_id == second.destination_token_id == TOKENS.ids['POPCAT_MINT']
+    assert first.source_mint_address is second.destination_mint_address is TOKENS.mint(first.source_token_id)
+    assert TOKENS.symbol(first.source_token_id) == 'POPCAT'
+    assert TOKENS.decimals[first.source_token_id] == 9
+    assert TOKENS.decimals[first.destination_token_id] == 6
+
+    tokens = len(TOKENS)
+    make_intent(3, 'POPCAT', 'MEW', 10**9, 10**6)
+    assert len(TOKENS) == tokens
+
+    quote = QuoteData(input_mint='POPCAT_' + 'MINT', in_amount='1000000000', output_mint='MEW_MINT',
+                      out_amount='1100000', other_amount_threshold='0', swap_mode='ExactIn', slippage_bps=50,
+                      platform_fee=None, price_impact_pct='0', route_plan=[], context_slot=1, time_taken=0.1)
+    assert quote.input_token_id == first.source_token_id
+    assert SolutionData.from_quote(quote, first).destination_token_id == first.destination_token_id
+
+
+def test_order_models_are_slotted_and_round_trip():
+    intents = [make_intent(1, 'SOL', 'USDC', 10**9, 150 * 10**6, partial_fill=True),
+               make_intent(2, 'USDC', 'SOL', 300 * 10**6, 2 * 10**9)]
+
+    parsed = IntentData.from_orders([intent.to_dict() for intent in intents])
+    assert parsed == intents
+    assert [intent.source_token_id for intent in parsed] == [intent.source_token_id for intent in intents]
+    assert parsed[0].to_dict() == asdict(intents[0])
+
+    solution = SolutionData.from_fill(intents[0], 10**9, 160 * 10**6)
+    quote = QuoteData.from_dict({'inputMint': 'SOL_MINT', 'inAmount': '1000000000', 'outputMint': 'USDC_MINT',
+                                 'outAmount': '160000000', 'otherAmountThreshold': '0', 'swapMode': 'ExactIn',
+                                 'slippageBps': 50, 'platformFee': None, 'priceImpactPct': '0', 'routePlan': [],
+                                 'contextSlot': 1, 'timeTaken': 0.1})
+    assert QuoteData.from_dict(quote.to_dict()).to_dict() == quote.to_dict()
+    for model in (parsed[0], solution, quote):
+        assert not hasattr(model, '__dict__')
+
+    # Orders with unexpected keys are rejected as by the constructor
+    with pytest.raises(TypeError):
+        IntentData.from_orders([{**intents[0].to_dict(), 'unexpected': 1}])
+
+
+async def chunked(text, size):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+def test_intent_stream_matches_batch_parsing():
+    intents = [make_intent(i, 'SOL', 'USDC', 10**9 + i, 150 * 10**6, partial_fill=i % 2 == 0) for i in range(20)]
+    orders = {intent.intent_id: asdict(intent) for intent in intents}
+    orders['bad_amount'] = {**asdict(intents[0]), 'source_amount': -1}
+    orders['missing'] = {'intent_id': 'missing'}
+    body = ujson.dumps({'batch_id': 7, 'orders': orders, 'deadline': 12.5}, indent=2)
+    page = f'<html><body><pre><code>{html.escape(body)}</code></pre></body></html>'
+
+    expected = BatchData()
+    expected.parse_intent_instance(ujson.loads(body))
+    assert expected.intents == intents
+    assert [key for key, _ in expected.quarantined] == ['bad_amount', 'missing']
+
+    for text, is_html in ((body, False), (page, True)):
+        for size in (1, 7, 64, len(text)):
+            batch = BatchData()
+            fields = asyncio.run(batch.parse_intent_stream(chunked(text, size), html=is_html))
+            assert batch.intents == expected.intents
+            assert batch.quarantined == expected.quarantined
+            assert fields == {'batch_id': 7, 'deadline': 12.5}
+
+    # Intents arrive as soon as they are complete, and a truncated body is reported
+    stream = IntentStream()
+    half = body.index('"1": {')
+    assert [intent.intent_id for intent in stream.feed(body[:half])] == ['0']
+    with pytest.raises(ValueError):
+        stream.close()
+
+
+def test_batches_endpoint_negotiates_raw_json(tmp_path, monkeypatch):
+    intents = [make_intent(i, 'SOL', 'USDC', 10**9, 150 * 10**6) for i in range(3)]
+    data = {'batch_id': 'b1', 'orders': {intent.intent_id: asdict(intent) for intent in intents}}
+    monkeypatch.setattr(_server, 'BATCHES_FILE_PATH', str(tmp_path / 'batch.json'))
+    save_data(_server.BATCHES_FILE_PATH, data)
+
+    async def fetch():
+        transport = httpx.ASGITransport(app=_server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://orderbook') as client:
+            page = await client.get('/batches', headers={'Accept': 'text/html,*/*;q=0.8'})
+            poller = BatchPoller('http://orderbook/batches')
+            poller.client = client
+            fields, batch = await poller.get_batch()
+            raw = await client.get('/batches', headers={'Accept': 'application/json'})
+            return page, fields, batch, raw
+
+    page, fields, batch, raw = asyncio.run(fetch())
+
+    # Browsers still get the page, agents get the stored JSON as is
+    assert page.headers['Content-Type'].startswith('text/html')
+    assert html_to_json(page) == data
+    assert raw.headers['Content-Type'] == 'application/json'
+    assert raw.headers['Vary'] == 'Accept'
+    assert html_to_json(raw) == data
+    assert fields == {'batch_id': 'b1'}
+    assert batch.intents == intents
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """Body breaking off after its first bytes."""
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+
+    async def __aiter__(self):
+        yield self.body[:10]
+        raise httpx.ReadError('connection reset')
+
+
+def batch_endpoint(batches: list, broken: set = (), truncated: set = ()):
+    """
+    An orderbook publishing `batches` in turn, each with its ETag, on the poll after the previous one was fetched.
+
+    Batches whose index is in `broken` break off the first time they are sent, and those
+    in `truncated` are sent cut in half (as a complete response) the first time.
+    """
+    endpoint = {'current': 0, 'polls': []}
+
+    def handle(request):
+        etag = f'"{endpoint["current"]}"'
+        endpoint['polls'].append((request.headers.get('If-None-Match'), etag))
+        if request.headers.get('If-None-Match') == etag:
+            endpoint['current'] = min(endpoint['current'] + 1, len(batches) - 1)
+            return httpx.Response(304)
+        body = ujson.dumps(batches[endpoint['current']]).encode()
+        headers = {'ETag': etag, 'Content-Type': 'application/json'}
+        if endpoint['current'] in broken:
+            broken.discard(endpoint['current'])
+            return httpx.Response(200, headers=headers, stream=BrokenStream(body))
+        if endpoint['current'] in truncated:
+            truncated.discard(endpoint['current'])
+            return httpx.Response(200, headers=headers, content=body[:len(body) // 2])
+        return httpx.Response(200, headers=headers, content=body)
+
+    return endpoint, httpx.MockTransport(handle)
+
+
+def make_batch(batch_id: int) -> dict:
+    return {'batch_id': batch_id, 'orders': {
+        str(batch_id): asdict(make_intent(batch_id, 'SOL', 'USDC', 10**9, 150 * 10**6))}}
+
+
+def test_batch_poller_fetches_new_batches_only():
+    endpoint, transport = batch_endpoint([make_batch(i) for i in range(3)], broken={2})
+
+    async def poll():
+        async with httpx.AsyncClient(transport=transport) as client:
+            poller = BatchPoller('http://orderbook/batches', min_interval=0.001, max_interval=0.01)
+            poller.client = client
+            return [(await poller.get())['batch_id'] for _ in range(3)], poller.etag
+
+    batch_ids, etag = asyncio.run(asyncio.wait_for(poll(), 5))
+    assert batch_ids == [0, 1, 2]
+    assert etag == '"2"'
+    # Unchanged batches cost a 304, and the batch that broke off is fetched again
+    assert endpoint['polls'] == [(None, '"0"'), ('"0"', '"0"'), ('"0"', '"1"'), ('"1"', '"1"'),
+                                 ('"1"', '"2"'), ('"1"', '"2"')]
+
+
+def test_batch_poller_fetches_again_a_batch_that_fails_to_parse():
+    endpoint, transport = batch_endpoint([make_batch(i) for i in range(3)], broken={2}, truncated={1})
+
+    async def poll():
+        async with httpx.AsyncClient(transport=transport) as client:
+            poller = BatchPoller('http://orderbook/batches', min_interval=0.001, max_interval=0.01)
+            poller.client = client
+            return [(fields, batch.intents) for fields, batch in [await poller.get_batch() for _ in range(3)]]
+
+    batches = asyncio.run(asyncio.wait_for(poll(), 5))
+    assert [fields['batch_id'] for fields, _ in batches] == [0, 1, 2]
+    assert [[intent.intent_id for intent in intents] for _, intents in batches] == [['0'], ['1'], ['2']]
+    # The truncated batch and the batch that broke off are polled again without their ETag
+    assert [poll for poll in endpoint['polls'] if poll[0] != poll[1]] == [
+        (None, '"0"'), ('"0"', '"1"'), ('"0"', '"1"'), ('"1"', '"2"'), ('"1"', '"2"')]
+
+
+def test_batch_poller_polls_again_a_batch_that_fails_to_decode():
+    endpoint, transport = batch_endpoint([make_batch(i) for i in range(2)], truncated={1})
+
+    async def poll():
+        async with httpx.AsyncClient(transport=transport) as client:
+            poller = BatchPoller('http://orderbook/batches', min_interval=0.001, max_interval=0.01)
+            poller.client = client
+            return [(await poller.get())['batch_id'] for _ in range(2)]
+
+    # The truncated batch is dropped instead of exiting, and fetched again without its ETag
+    assert asyncio.run(asyncio.wait_for(poll(), 5)) == [0, 1]
+    assert [poll for poll in endpoint['polls'] if poll[0] != poll[1]] == [(None, '"0"'), ('"0"', '"1"'), ('"0"', '"1"')]
+
+    for response in (httpx.Response(200, headers={'Content-Type': 'text/html'}, text='<html></html>'),
+                     httpx.Response(200, headers={'Content-Type': 'text/plain'}, text='{}')):
+        with pytest.raises(ValueError):
+            html_to_json(response)
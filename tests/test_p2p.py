@@ -0,0 +1,256 @@
+# tests/test_p2p.py
+
+import random
+
+from types import SimpleNamespace
+from src.orders.batch import BatchData
+from src.orders.intent import IntentData
+from src.orders.solution import SolutionData
+from src.p2p.level_one import LevelOne
+from src.p2p.level_n import LevelN
+from src.p2p.partial_fill import PartialFill
+from src.p2p.auction import BatchAuction
+from src.p2p.matching import greedy_matching, optimal_matching, match_surplus
+
+
+def make_intent(intent_id, source, destination, source_amount, min_receive_amount, partial_fill=False):
+    """Create an intent trading `source` for `destination`."""
+    return IntentData(
+        intent_id=str(intent_id),
+        source_token=source,
+        source_mint_address=f'{source}_MINT',
+        source_address=f'Wallet_{intent_id}',
+        source_amount=source_amount,
+        destination_token=destination,
+        destination_mint_address=f'{destination}_MINT',
+        destination_address=f'Wallet_{intent_id}',
+        min_receive_amount=min_receive_amount,
+        partial_fill=partial_fill,
+        expiration=100,
+        status='pending',
+        source_token_decimals=9,
+        destination_token_decimals=6,
+    )
+
+
+def make_agent(intents):
+    """Create a minimal agent holding a batch of intents."""
+    batch = BatchData()
+    batch.intents = intents
+    return SimpleNamespace(batch=batch)
+
+
+def test_level_one_matches_opposite_intents():
+    """Test that only fully overlapping opposite intents are matched."""
+    intents = [
+        make_intent(1, 'SOL', 'USDC', 100, 1000),
+        make_intent(2, 'USDC', 'SOL', 1000, 90),
+        make_intent(3, 'USDC', 'SOL', 900, 90),     # does not pay enough to 1
+        make_intent(4, 'SOL', 'USDT', 100, 1000),   # no counterparty
+    ]
+    matches = LevelOne().run(make_agent(intents))
+    assert [[a.intent_id, b.intent_id] for a, b in matches] == [['1', '2']]
+
+
+def test_level_one_agrees_with_naive_search():
+    """Test that the indexed search returns the same matches as an all-pairs scan."""
+    rng = random.Random(0)
+    tokens = ['SOL', 'USDC', 'USDT', 'JUP']
+    intents = []
+    for i in range(300):
+        source, destination = rng.sample(tokens, 2)
+        intents.append(make_intent(i, source, destination, rng.randint(1, 100), rng.randint(1, 100)))
+
+    expected = [
+        [intent_1, intent_2]
+        for i, intent_1 in enumerate(intents) for intent_2 in intents[i+1:]
+        if intent_1.source_token == intent_2.destination_token
+        and intent_1.destination_token == intent_2.source_token
+        and LevelOne.both_fillable(intent_1, intent_2)
+    ]
+    assert LevelOne().run(make_agent(intents)) == expected
+
+
+def test_optimal_matching_beats_greedy():
+    """Test that the maximum-weight matching keeps the pairs with the highest total surplus."""
+    intents = [
+        make_intent(1, 'SOL', 'USDC', 100, 1000),
+        make_intent(2, 'SOL', 'USDC', 100, 1005),
+        make_intent(3, 'USDC', 'SOL', 1010, 90),
+        make_intent(4, 'USDC', 'SOL', 1004, 92),
+    ]
+    matches = LevelOne().run(make_agent(intents))
+
+    greedy = greedy_matching(matches)
+    optimal = optimal_matching(matches)
+
+    assert [[a.intent_id, b.intent_id] for a, b in greedy] == [['1', '3']]
+    assert sorted([a.intent_id, b.intent_id] for a, b in optimal) == [['1', '4'], ['2', '3']]
+    assert sum(map(match_surplus, greedy)) == 20
+    assert sum(map(match_surplus, optimal)) == 27
+
+
+def test_optimal_matching_keeps_matches_without_surplus():
+    """Test that a candidate without surplus is matched rather than left out of the selection."""
+    intents = [
+        make_intent(1, 'SOL', 'USDC', 100, 1000),
+        make_intent(2, 'SOL', 'USDC', 100, 1000),
+        make_intent(3, 'USDC', 'SOL', 1005, 100),
+        make_intent(4, 'USDC', 'SOL', 1000, 100),
+    ]
+    # Intent 1 can only be filled by intent 3, which intent 2 may take as well
+    matches = [(intents[0], intents[2]), (intents[1], intents[2]), (intents[1], intents[3])]
+
+    optimal = optimal_matching(matches)
+
+    assert sorted([a.intent_id, b.intent_id] for a, b in optimal) == [['1', '3'], ['2', '4']]
+    assert sum(map(match_surplus, optimal)) == 5
+
+
+def test_level_n_finds_disjoint_rings():
+    """Test that fillable rings are found, and that intents are used by one ring only."""
+    intents = [
+        make_intent(1, 'SOL', 'USDC', 100, 1000),
+        make_intent(2, 'USDC', 'JUP', 1000, 500),
+        make_intent(3, 'JUP', 'SOL', 500, 100),
+        make_intent(4, 'JUP', 'SOL', 600, 100),     # same ring as 3, but 3 comes first
+        make_intent(5, 'USDC', 'JUP', 999, 500),    # does not pay enough to 1
+        make_intent(6, 'SOL', 'USDT', 100, 50),     # no ring through USDT
+    ]
+    rings = LevelN(max_hops=4).run(make_agent(intents))
+    assert [[intent.intent_id for intent in ring] for ring in rings] == [['1', '2', '3']]
+    assert match_surplus(rings[0]) == 0
+
+    assert LevelN(max_hops=2).run(make_agent(intents)) == []
+
+
+def test_level_n_finds_longer_rings():
+    """Test that rings longer than 3 intents are found up to max_hops."""
+    intents = [
+        make_intent(1, 'SOL', 'USDC', 100, 1000),
+        make_intent(2, 'USDC', 'JUP', 1000, 500),
+        make_intent(3, 'JUP', 'BONK', 500, 10**6),
+        make_intent(4, 'BONK', 'SOL', 10**6, 100),
+    ]
+    assert LevelN(max_hops=3).run(make_agent(intents)) == []
+    rings = LevelN(max_hops=4).run(make_agent(intents))
+    assert [[intent.intent_id for intent in ring] for ring in rings] == [['1', '2', '3', '4']]
+
+    solutions = SolutionData.from_ring(rings[0])
+    assert [solution.destination_amount for solution in solutions] == [1000, 500, 10**6, 100]
+
+
+def test_level_n_rings_are_fillable():
+    """Test that every ring found on a random batch is fillable and that rings are disjoint."""
+    rng = random.Random(1)
+    tokens = ['SOL', 'USDC', 'USDT', 'JUP', 'BONK']
+    intents = []
+    for i in range(500):
+        source, destination = rng.sample(tokens, 2)
+        intents.append(make_intent(i, source, destination, rng.randint(50, 100), rng.randint(50, 100)))
+
+    rings = LevelN(max_hops=5).run(make_agent(intents))
+    assert rings
+    for ring in rings:
+        assert 3 <= len(ring) <= 5
+        for position, intent in enumerate(ring):
+            next_intent = ring[(position + 1) % len(ring)]
+            assert intent.destination_mint_address == next_intent.source_mint_address
+            assert next_intent.source_amount >= intent.min_receive_amount
+
+    intent_ids = [intent.intent_id for ring in rings for intent in ring]
+    assert len(intent_ids) == len(set(intent_ids))
+
+
+def test_p2p_searches_stop_at_their_time_limit():
+    """Test that the ring search and the book crossing stop once their time is up."""
+    rng = random.Random(1)
+    tokens = ['SOL', 'USDC', 'USDT', 'JUP', 'BONK']
+    intents = []
+    for i in range(500):
+        source, destination = rng.sample(tokens, 2)
+        intents.append(make_intent(i, source, destination, rng.randint(50, 100), rng.randint(50, 100),
+                                   partial_fill=True))
+
+    assert LevelN(max_hops=5, time_limit=60).run(make_agent(intents))
+    assert LevelN(max_hops=5, time_limit=0).run(make_agent(intents)) == []
+    assert PartialFill(time_limit=60).run(make_agent(intents))
+    assert PartialFill(time_limit=0).run(make_agent(intents)) == []
+
+
+def test_partial_fill_crosses_book_pro_rata():
+    """Test that the long side of a book is filled pro-rata at the clearing price."""
+    intents = [
+        make_intent(1, 'SOL', 'USDC', 100, 1000, partial_fill=True),
+        make_intent(2, 'SOL', 'USDC', 100, 1100, partial_fill=True),
+        make_intent(3, 'USDC', 'SOL', 1500, 120, partial_fill=True),
+        make_intent(4, 'USDC', 'SOL', 1500, 120),                       # all-or-none
+    ]
+    fills = PartialFill().run(make_agent(intents))
+    assert [(intent.intent_id, given, received) for intent, given, received in fills] == [
+        ('1', 68, 750), ('2', 68, 750), ('3', 1500, 136)
+    ]
+
+    residual = PartialFill.residual(intents[1], 68)
+    assert (residual.intent_id, residual.source_amount, residual.min_receive_amount) == ('2', 32, 352)
+    assert PartialFill.residual(intents[2], 1500) is None
+
+
+def test_partial_fill_respects_limits_and_balances():
+    """Test that fills on a random batch respect every limit price and balance each token."""
+    rng = random.Random(2)
+    intents = []
+    for i in range(400):
+        source, destination = rng.sample(['SOL', 'USDC', 'JUP'], 2)
+        source_amount = rng.randint(1, 10**6)
+        intents.append(make_intent(i, source, destination, source_amount,
+                                   int(source_amount * rng.uniform(0.8, 1.25)), partial_fill=True))
+
+    fills = PartialFill().run(make_agent(intents))
+    assert fills
+
+    balances = {}
+    for intent, given, received in fills:
+        assert 0 < given <= intent.source_amount
+        assert received * intent.source_amount >= intent.min_receive_amount * given
+        balances[intent.source_token] = balances.get(intent.source_token, 0) + given
+        balances[intent.destination_token] = balances.get(intent.destination_token, 0) - received
+    assert set(balances.values()) == {0}
+
+
+def test_batch_auction_fills_all_or_none_intents_fully():
+    """Test that intents not allowing partial fills are fully filled by the auction."""
+    intents = [
+        make_intent(1, 'SOL', 'USDC', 100, 1000),
+        make_intent(2, 'USDC', 'SOL', 600, 50, partial_fill=True),
+        make_intent(3, 'USDC', 'SOL', 600, 50, partial_fill=True),
+    ]
+    fills = BatchAuction().run(make_agent(intents))
+    given = {intent.intent_id: (amount, received) for intent, amount, received in fills}
+
+    assert given['1'] == (100, 1100)
+    assert given['2'][0] + given['3'][0] == 1100
+    assert given['2'][1] + given['3'][1] == 100
+
+
+def test_batch_auction_respects_limits_and_balances():
+    """Test that the auction fills on a random batch respect every limit price and balance each token."""
+    rng = random.Random(3)
+    intents = []
+    for i in range(300):
+        source, destination = rng.sample(['SOL', 'USDC', 'JUP'], 2)
+        source_amount = rng.randint(1, 10**6)
+        intents.append(make_intent(i, source, destination, source_amount,
+                                   int(source_amount * rng.uniform(0.8, 1.25)), partial_fill=rng.random() < 0.5))
+
+    fills = BatchAuction().run(make_agent(intents))
+    assert fills
+
+    balances = {}
+    for intent, given, received in fills:
+        assert 0 < given <= intent.source_amount
+        assert intent.partial_fill or given == intent.source_amount
+        assert received * intent.source_amount >= intent.min_receive_amount * given
+        balances[intent.source_token] = balances.get(intent.source_token, 0) + given
+        balances[intent.destination_token] = balances.get(intent.destination_token, 0) - received
+    assert set(balances.values()) == {0}